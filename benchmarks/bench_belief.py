@@ -0,0 +1,127 @@
+"""Compare updates of belief grids per result of an attack or a move.
+
+The per-cell loops of sample/original_player.py are measured against
+BeliefTracker updating one game at a time and N games in one step.
+
+    $ python benchmarks/bench_belief.py [--games 1000]
+"""
+from submarine_py import Field
+from submarine_py.batch import BatchGame, SHIP_TYPES, ATTACK, MOVE
+from submarine_py.belief import BeliefTracker
+import contextlib
+import io
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'sample'))
+
+
+def random_plies(field, n, plies, rng):
+    """return list of (kind, ship, to, result, mover) of random games"""
+    game = BatchGame.random(field, n, rng)
+    w, h = field.width, field.height
+    history = []
+    for _ in range(plies):
+        turn = game.turn.copy()
+        kind = rng.integers(0, 2, n)
+        ship = np.zeros(n, dtype=int)
+        to = rng.integers(0, max(w, h), (n, 2))
+        for g in range(n):
+            alive = np.flatnonzero(game.hp[g, turn[g]] > 0)
+            src = game.position[g, turn[g]]
+            if kind[g] == MOVE:
+                ship[g] = rng.choice(alive)
+                to[g, rng.integers(2)] = src[ship[g], rng.integers(2)]
+            else:
+                to[g] = src[rng.choice(alive)] + rng.integers(-1, 2, 2)
+        result = game.step(kind, ship, to)
+        history.append((kind, ship, to, result, turn))
+    return history
+
+
+def as_info(kind, ship, to, result, turn, g):
+    """return the result dict of the protocol for game g if it is an
+    attack of player 0 or a move of player 1, otherwise None"""
+    if not (result['active'][g] and result['legal'][g]) \
+       or (kind[g] == ATTACK) != (turn[g] == 0):
+        return None
+    if kind[g] == ATTACK:
+        attacked = {"position": to[g].tolist(), "near": [
+            t for s, t in enumerate(SHIP_TYPES) if result['near'][g, s]]}
+        if result['hit'][g] >= 0:
+            attacked["hit"] = SHIP_TYPES[result['hit'][g]]
+        return {"attacked": attacked}
+    return {"moved": {"ship": SHIP_TYPES[ship[g]],
+                      "distance": result['distance'][g].tolist()}}
+
+
+def bench_loops(field, infos, n):
+    from original_player import OriginalPlayer
+    players = [OriginalPlayer() for _ in range(n)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for player in players:
+            player.initialize(field)
+    start = time.perf_counter()
+    for ply in infos:
+        for g, info in ply:
+            if "attacked" in info:
+                players[g].predict_position_attack(info["attacked"])
+            else:
+                players[g].predict_position_motion(info["moved"])
+    return time.perf_counter() - start
+
+
+def bench_single(field, infos, n):
+    trackers = [BeliefTracker(field) for _ in range(n)]
+    opponent = {"opponent": {t: {"hp": 1} for t in SHIP_TYPES}}
+    infos = [[(g, {"result": info, "observation": opponent},
+               "attacked" in info) for g, info in ply] for ply in infos]
+    start = time.perf_counter()
+    for ply in infos:
+        for g, info, mine in ply:
+            trackers[g].update(info, mine)
+    return time.perf_counter() - start
+
+
+def bench_batch(field, history, n):
+    tracker = BeliefTracker(field, n)
+    start = time.perf_counter()
+    for kind, ship, to, result, turn in history:
+        tracker.step(kind, ship, to, result, turn == 0)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="measure updates of belief grids",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--games", type=int, default=1000,
+        help="number of games updated together",
+    )
+    parser.add_argument(
+        "--plies", type=int, default=20,
+        help="number of plies of each game",
+    )
+    parser.add_argument(
+        "--size", type=int, default=5,
+        help="width and height of field",
+    )
+    args = parser.parse_args()
+    field = Field(args.size, args.size)
+    history = random_plies(field, args.games, args.plies,
+                           np.random.default_rng(0))
+    infos = [[(g, info) for g in range(args.games)
+              if (info := as_info(*ply, g)) is not None] for ply in history]
+    updates = sum(map(len, infos))
+    loops = bench_loops(field, infos, args.games)
+    single = bench_single(field, infos, args.games)
+    batch = bench_batch(field, history, args.games)
+    for name, seconds in [('loops', loops), ('single', single),
+                          ('batch', batch)]:
+        print(f'{name:6}: {updates / seconds:12,.0f} updates/s')
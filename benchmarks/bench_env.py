@@ -0,0 +1,67 @@
+"""Measure steps per second of the reinforcement learning environments.
+
+The agent takes uniformly random legal actions, so that the time is
+spent in the environments.
+
+    $ python benchmarks/bench_env.py [--envs 1024]
+"""
+from submarine_py import Field
+from submarine_py.env import SubmarineEnv, VectorEnv
+import time
+import numpy as np
+
+
+def random_legal(mask, rng):
+    keys = rng.random(mask.shape)
+    keys[~mask] = -1
+    return keys.argmax(axis=-1)
+
+
+def bench_single(field, steps, rng):
+    env = SubmarineEnv(field, seed=0)
+    obs, info = env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        obs, reward, terminated, truncated, info = env.step(
+            random_legal(info['action_mask'], rng))
+        if terminated or truncated:
+            obs, info = env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def bench_vector(field, steps, envs, rng):
+    env = VectorEnv(field, envs, seed=0)
+    obs, info = env.reset()
+    start = time.perf_counter()
+    for _ in range(-(-steps // envs)):
+        obs, reward, terminated, truncated, info = env.step(
+            random_legal(info['action_mask'], rng))
+    return -(-steps // envs) * envs / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="measure steps of environments",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--envs", type=int, default=1024,
+        help="number of games of VectorEnv",
+    )
+    parser.add_argument(
+        "--steps", type=int, default=100000,
+        help="number of steps of the agent",
+    )
+    parser.add_argument(
+        "--size", type=int, default=5,
+        help="width and height of field",
+    )
+    args = parser.parse_args()
+    field = Field(args.size, args.size)
+    rng = np.random.default_rng(0)
+    single = bench_single(field, args.steps // 10, rng)
+    vector = bench_vector(field, args.steps, args.envs, rng)
+    for name, rate in [('single', single), ('vector', vector)]:
+        print(f'{name:6}: {rate:12,.0f} steps/s')
@@ -0,0 +1,41 @@
+"""Measure the startup time of a client importing submarine_py.
+
+Reports the median wall time of fresh interpreters running the import,
+next to that of an empty interpreter.
+
+    $ python benchmarks/bench_import.py
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+CLIENT = 'from submarine_py import Player, play_game'
+
+
+def startup(code: str, repeat: int):
+    """return median seconds to run code in a new interpreter"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="measure the startup time of a client",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20,
+        help="number of interpreters to start",
+    )
+    args = parser.parse_args()
+    empty = startup('pass', args.repeat)
+    client = startup(CLIENT, args.repeat)
+    print(f'python: {empty*1000:.1f} ms')
+    print(f'client: {client*1000:.1f} ms (+{(client-empty)*1000:.1f} ms)')
@@ -0,0 +1,109 @@
+"""Measure turns per second of the server game loop.
+
+Two scripted clients attack and move without ever finishing the game,
+so that a game lasts Protocol.turn_limit turns.  Connections are
+replaced by in-memory objects to measure the server side only.
+
+    $ python benchmarks/bench_server.py [--verbose]
+"""
+from submarine_py import Field, Protocol
+from submarine_py import server
+from submarine_py import codec
+from submarine_py import binary
+import contextlib
+import io
+import itertools
+import json
+import time
+
+
+class ScriptedConnection(server.Connection):
+    """server.Connection replaying actions in a cycle without a socket"""
+
+    def __init__(self, name, placement, actions, options=()):
+        self.name = name
+        self.options = set(options)
+        self.alive = True
+        self.pending = None
+        if self.binary:
+            self.placement = binary.encode_placement(placement)[4:]
+            actions = [binary.encode_action(a)[4:] for a in actions]
+        else:
+            self.placement = json.dumps(placement)
+            actions = [json.dumps(a) for a in actions]
+        self.actions = itertools.cycle(actions)
+        self.sent = 0           #: bytes sent
+
+    def _write(self, data):
+        self.sent += len(data)
+
+    def recv_placement(self, timeout=None):
+        if self.binary:
+            return binary.decode_placement(self.placement)
+        return self.placement
+
+    def recv_action(self, timeout=None):
+        if self.binary:
+            return binary.decode_action(next(self.actions))
+        return next(self.actions)
+
+
+def clients(options=()):
+    def script(row, near):
+        return [{"attack": {"to": [1, near]}},
+                {"move": {"ship": "w", "to": [1, row]}},
+                {"attack": {"to": [1, near]}},
+                {"move": {"ship": "w", "to": [0, row]}}]
+    return [
+        ScriptedConnection('p0', {"w": [0, 0], "c": [2, 0], "s": [4, 0]},
+                           script(0, 1), options),
+        ScriptedConnection('p1', {"w": [0, 4], "c": [2, 4], "s": [4, 4]},
+                           script(4, 3), options),
+    ]
+
+
+def bench(games, *, quiet=True, options=()):
+    """return turns per second"""
+    field = Field()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(games):
+            winner, _ = server.play_game(field, clients(options),
+                                         quiet=quiet)
+            assert winner == -1
+    return games * Protocol.turn_limit / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="measure turns per second of the server game loop",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--games", type=int, default=5,
+        help="number of games of Protocol.turn_limit turns",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of measurements, the best one is reported",
+    )
+    parser.add_argument(
+        "--verbose", action='store_true',
+        help="report the field after each turn as the server does",
+    )
+    parser.add_argument(
+        "--codec", choices=['json', 'orjson'], default=None,
+        help="JSON encoder (default: orjson if installed)",
+    )
+    parser.add_argument(
+        "--binary", action='store_true',
+        help="use the binary protocol option",
+    )
+    args = parser.parse_args()
+    codec.use(args.codec)
+    options = [Protocol.binary] if args.binary else []
+    best = max(bench(args.games, quiet=not args.verbose, options=options)
+               for _ in range(args.repeat))
+    print(f'{best:.0f} turns/s ({codec.backend})')
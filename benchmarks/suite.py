@@ -0,0 +1,313 @@
+"""Benchmark suite of the engine, the protocol and the players.
+
+Each case measures operations per second (best of --repeat runs) and
+the results are written as JSON with sorted keys, so that two runs can
+be compared.  A run compared to a saved baseline exits with status 1
+if a case is slower by more than --threshold:
+
+    $ python benchmarks/suite.py --output baseline.json
+    $ python benchmarks/suite.py --compare baseline.json
+
+Cases are selected by substrings of their names with --case, e.g.
+``--case client --case view``; --list shows all cases.
+"""
+from submarine_py import Field, Protocol, Reporter
+from submarine_py import codec, engine, server
+from submarine_py.server import Client, GameControl
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+root = os.path.join(os.path.dirname(__file__), '..')
+sys.path += [os.path.join(root, 'sample'), os.path.join(root, 'tests')]
+from random_player import RandomPlayer  # noqa: E402
+from test_engine import ScriptedPlayer  # noqa: E402
+from test_server import free_port, connect  # noqa: E402
+
+CASES = {}                      #: name -> (setup, unit)
+
+
+def case(name, unit):
+    """register setup(scale) returning a function which runs the case
+    once and returns the number of operations done"""
+    def register(setup):
+        CASES[name] = (setup, unit)
+        return setup
+    return register
+
+
+@case('field.passable', 'calls/s')
+def field_passable(scale):
+    field = Field(5, 5, [[0, 0], [4, 4]])
+    positions = [[x, y] for x in range(-1, 6) for y in range(-1, 6)]
+    rounds = int(2000 * scale)
+
+    def run():
+        for _ in range(rounds):
+            for position in positions:
+                field.passable(position)
+        return rounds * len(positions)
+    return run
+
+
+@case('client.attacked', 'calls/s')
+def client_attacked(scale):
+    field = Field()
+    client = Client(field, {"w": [0, 0], "c": [2, 2], "s": [4, 4]})
+    squares = field.squares
+    rounds = int(2000 * scale)
+
+    def run():
+        for _ in range(rounds):
+            target = client.copy()
+            for square in squares:
+                target.attacked(square)
+        return rounds * len(squares)
+    return run
+
+
+@case('client.move', 'calls/s')
+def client_move(scale):
+    client = Client(Field(), {"w": [0, 0], "c": [2, 2], "s": [4, 4]})
+    rounds = int(20000 * scale)
+
+    def run():
+        for _ in range(rounds):
+            client.move("w", [0, 3])
+            client.move("w", [0, 0])
+        return rounds * 2
+    return run
+
+
+@case('game_control.action', 'turns/s')
+def game_control_action(scale):
+    game = GameControl(Field())
+    game.initialize({"w": [0, 0], "c": [2, 0], "s": [4, 0]},
+                    {"w": [0, 4], "c": [2, 4], "s": [4, 4]})
+    actions = [
+        [json.dumps(a) for a in [{"attack": {"to": [1, near]}},
+                                 {"move": {"ship": "w", "to": [1, row]}},
+                                 {"attack": {"to": [1, near]}},
+                                 {"move": {"ship": "w", "to": [0, row]}}]]
+        for row, near in [(0, 1), (4, 3)]]
+    rounds = int(2000 * scale)
+
+    def run():
+        for _ in range(rounds):
+            for i in range(4):
+                for c in range(2):
+                    game.action(c, actions[c][i])
+        return rounds * 8
+    return run
+
+
+@case('engine.run_game', 'turns/s')
+def engine_run_game(scale):
+    field = Field()
+    games = max(1, int(200 * scale))
+    rng = random.Random(0)
+    pairs = [[RandomPlayer(rng.getrandbits(32)) for _ in range(2)]
+             for _ in range(games)]
+
+    def run():
+        turns = 0
+        for players in pairs:
+            turns += engine.run_game(field, players, parsed=True)[1]
+        return turns
+    return run
+
+
+@case('server.play_game', 'turns/s')
+def server_play_game(scale):
+    from bench_server import clients
+    field = Field()
+    games = max(1, round(scale))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(games):
+                server.play_game(field, clients(), quiet=True)
+        return games * Protocol.turn_limit
+    return run
+
+
+@case('socket.loopback', 'turns/s')
+def socket_loopback(scale):
+    games = max(1, int(50 * scale))
+    players = [ScriptedPlayer('p1'), ScriptedPlayer('p2')]
+
+    def run():
+        port = free_port()
+        host = threading.Thread(target=server.server_main, args=(
+            'localhost', port, games, Field()), kwargs={'quiet': True})
+        with contextlib.redirect_stdout(io.StringIO()):
+            host.start()
+            first = threading.Thread(target=connect, args=(port, players[0]),
+                                     kwargs={'games': games})
+            first.start()
+            connect(port, players[1], games=games)
+            first.join()
+            host.join()
+        # the first mover wins at the 11th turn
+        return games * 11
+    return run
+
+
+@case('reporter.make_view', 'views/s')
+def reporter_make_view(scale):
+    field = Field(5, 5, [[0, 0]])
+    fleet = {"w": {"hp": 3, "position": [1, 1]},
+             "c": {"hp": 1, "position": [3, 2]},
+             "s": {"hp": 1, "position": [4, 4]}}
+    rounds = int(500 * scale)
+
+    def run():
+        for i in range(rounds):
+            Reporter.make_view(field, fleet, [i % 5, 0])
+        return rounds
+    return run
+
+
+@case('original_player.belief', 'updates/s')
+def original_player_belief(scale):
+    from bench_belief import random_plies, as_info
+    from original_player import OriginalPlayer
+    import numpy as np
+    field = Field()
+    n = max(1, int(100 * scale))
+    history = random_plies(field, n, 20, np.random.default_rng(0))
+    infos = [(g, info) for ply in history for g in range(n)
+             if (info := as_info(*ply, g)) is not None]
+    players = [OriginalPlayer() for _ in range(n)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for player in players:
+            player.initialize(field)
+
+    def run():
+        for g, info in infos:
+            if "attacked" in info:
+                players[g].predict_position_attack(info["attacked"])
+            else:
+                players[g].predict_position_motion(info["moved"])
+        return len(infos)
+    return run
+
+
+def measure(setup, scale, repeat):
+    """return the best operations per second of repeat runs"""
+    best = 0.0
+    for _ in range(repeat):
+        run = setup(scale)
+        start = time.perf_counter()
+        count = run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def run_suite(names, *, scale=1.0, repeat=3, log=None):
+    results = {}
+    for name in names:
+        setup, unit = CASES[name]
+        rate = measure(setup, scale, repeat)
+        results[name] = {'rate': round(rate, 1), 'unit': unit}
+        if log:
+            print(f'{name:24} {rate:14,.0f} {unit}', file=log)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'codec': codec.backend,
+            'scale': scale,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """return rows (name, baseline rate, current rate, ratio) of cases in
+    both, and names of the cases slower than 1 - threshold times"""
+    rows, slower = [], []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]['rate']
+        ratio = result['rate'] / base if base else float('inf')
+        rows.append((name, base, result['rate'], ratio))
+        if ratio < 1 - threshold:
+            slower.append(name)
+    return rows, slower
+
+
+def select(patterns):
+    if not patterns:
+        return list(CASES)
+    return [name for name in CASES if any(p in name for p in patterns)]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="run benchmarks and compare with a baseline",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--case", action='append', default=[],
+        help="run only cases whose names contain this (repeatable)",
+    )
+    parser.add_argument(
+        "--list", action='store_true',
+        help="list cases and exit",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of measurements of a case, the best one is reported",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="multiplier of the amount of work of each case",
+    )
+    parser.add_argument(
+        "--output", default=None,
+        help="file to save results as JSON (- for standard output)",
+    )
+    parser.add_argument(
+        "--compare", default=None,
+        help="JSON file of a baseline to compare with",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="slowdown relative to the baseline reported as a regression",
+    )
+    args = parser.parse_args()
+    names = select(args.case)
+    if args.list or not names:
+        for name in CASES:
+            print(name)
+        sys.exit(0 if names else 1)
+    results = run_suite(names, scale=args.scale, repeat=args.repeat,
+                        log=sys.stderr)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == '-':
+        print(text)
+    elif args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, slower = compare(baseline, results, args.threshold)
+        for name, base, rate, ratio in rows:
+            mark = '  SLOWER' if name in slower else ''
+            print(f'{name:24} {base:14,.0f} -> {rate:14,.0f}'
+                  f' {ratio - 1:+7.1%}{mark}')
+        if slower:
+            sys.exit(1)
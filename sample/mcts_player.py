@@ -0,0 +1,52 @@
+from submarine_py import play_game
+from submarine_py.mcts import MCTSPlayer
+import logging
+
+
+def main(host, port, budget=0.1, seed=0, workers=1, games=1, binary=False):
+    with MCTSPlayer(budget, seed=seed, workers=workers) as player:
+        play_game(host, port, player, games=games, binary=binary)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="ISMCTS Player for Submarine Game",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "host",
+        help="Hostname of the server, e.g., localhost",
+    )
+    parser.add_argument(
+        "port",
+        type=int,
+        help="Port of the server, e.g., 2000",
+    )
+    parser.add_argument(
+        "--budget", type=float, default=0.1,
+        help="seconds to think for each action",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Random seed of the player (0 for urandom)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of processes searching in parallel",
+    )
+    parser.add_argument(
+        "--games", type=int, default=1,
+        help="number of games to play (should be consistent with server)",
+    )
+    parser.add_argument(
+        "--binary", action='store_true',
+        help="use the compact binary protocol if the server supports it",
+    )
+    args = parser.parse_args()
+    FORMAT = '%(asctime)s %(levelname)s %(message)s'
+    logging.basicConfig(format=FORMAT, level=logging.INFO, force=True)
+
+    main(args.host, args.port, budget=args.budget, seed=args.seed,
+         workers=args.workers, games=args.games, binary=args.binary)
@@ -171,15 +171,15 @@ class OriginalPlayer(Player):
         攻撃が当たった場合の処理
         """
         if ship_type == 'w':
-            self.enemy_w = position
+            self.enemy_w = list(position)
             self.w_pos_pred = np.full((self.field.width, self.field.height), notExist)
             self.w_pos_pred[position[0]][position[1]] = 1
         elif ship_type == 'c':
-            self.enemy_c = position
+            self.enemy_c = list(position)
             self.c_pos_pred = np.full((self.field.width, self.field.height), notExist)
             self.c_pos_pred[position[0]][position[1]] = 1
         elif ship_type == 's':
-            self.enemy_s = position
+            self.enemy_s = list(position)
             self.s_pos_pred = np.full((self.field.width, self.field.height), notExist)
             self.s_pos_pred[position[0]][position[1]] = 1
 
@@ -286,11 +286,10 @@ class OriginalPlayer(Player):
 
         # 2. 次善策：スコアがプラスの「可能性の高い」マスを探す
         good_positions = []
-        for r in range(self.field.height):
-            for c in range(self.field.width):
-                pos = [c, r]
-                if self.in_attack_range(pos) and self.entire_map[c, r] > 0:
-                    good_positions.append((pos, self.entire_map[c, r]))
+        for pos in self.legal_attacks():
+            c, r = pos
+            if self.entire_map[c, r] > 0:
+                good_positions.append((pos, self.entire_map[c, r]))
 
         if good_positions:
             best_score = max(pos[1] for pos in good_positions)
@@ -300,11 +299,10 @@ class OriginalPlayer(Player):
 
         # 3. 探索的攻撃：スコアが0以上の「まだ可能性のある」マスを探す
         possible_positions = []
-        for r in range(self.field.height):
-            for c in range(self.field.width):
-                pos = [c, r]
-                if self.in_attack_range(pos) and self.entire_map[c, r] > notExist:
-                    possible_positions.append(pos)
+        for pos in self.legal_attacks():
+            c, r = pos
+            if self.entire_map[c, r] > notExist:
+                possible_positions.append(pos)
         
         if possible_positions:
             # 可能性のあるマスからランダムに選んで攻撃
@@ -317,10 +315,8 @@ class OriginalPlayer(Player):
 
         ship_to_move = self.rng.choice(movable_ships)
         
-        move_candidates = []
-        for to in self.field.squares:
-            if ship_to_move.is_reachable(to) and self.overlap(to) is None:
-                 move_candidates.append(to)
+        move_candidates = [to for ship_type, to in self.legal_moves()
+                           if ship_type == ship_to_move.type]
         
         if move_candidates:
             to = self.rng.choice(move_candidates)
@@ -371,9 +367,9 @@ class OriginalPlayer(Player):
 
         report_observation(info["observation"])
     
-def main(host, part):
+def main(host, part, games=1):
     player = OriginalPlayer()
-    play_game(host, part, player)
+    play_game(host, part, player, games=games)
 
 if __name__ == '__main__':
     import argparse
@@ -400,9 +396,7 @@ if __name__ == '__main__':
     level = logging.INFO
     logging.basicConfig(format=FORMAT, level=level)
 
-    for _ in range(args.games):
-        try:
-            main(args.host, args.port)
-        except KeyboardInterrupt:
-            logging.warning('Game interrupted by user')
-            break
\ No newline at end of file
+    try:
+        main(args.host, args.port, games=args.games)
+    except KeyboardInterrupt:
+        logging.warning('Game interrupted by user')
\ No newline at end of file
@@ -25,22 +25,19 @@ class RandomPlayer(Player):
 
         if act == "move":
             ship = self.rng.choice(list(self.ships.values()))
-            to = self.rng.choice(self.field.squares)
-            while not ship.is_reachable(to) or not self.overlap(to) is None:
-                to = self.rng.choice(self.field.squares)
+            moves = [to for ship_type, to in self.legal_moves()
+                     if ship_type == ship.type]
+            if moves:
+                to = self.rng.choice(moves)
+                return json.dumps(self.move(ship.type, to))
 
-            return json.dumps(self.move(ship.type, to))
-        elif act == "attack":
-            to = self.rng.choice(self.field.squares)
-            while not self.in_attack_range(to):
-                to = self.rng.choice(self.field.squares)
+        to = self.rng.choice(self.legal_attacks())
+        return json.dumps(self.attack(to))
 
-            return json.dumps(self.attack(to))
 
-
-def main(host, port, seed=0):
+def main(host, port, seed=0, games=1, binary=False):
     player = RandomPlayer(seed)
-    play_game(host, port, player)
+    play_game(host, port, player, games=games, binary=binary)
 
 
 if __name__ == '__main__':
@@ -71,10 +68,14 @@ if __name__ == '__main__':
         "--games", type=int, default=1,
         help="number of games to play (should be consistent with server)",
     )
+    parser.add_argument(
+        "--binary", action='store_true',
+        help="use the compact binary protocol if the server supports it",
+    )
     args = parser.parse_args()
     FORMAT = '%(asctime)s %(levelname)s %(message)s'
     level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(format=FORMAT, level=level, force=True)
 
-    for _ in range(args.games):
-        main(args.host, args.port, seed=args.seed)
+    main(args.host, args.port, seed=args.seed, games=args.games,
+         binary=args.binary)
@@ -21,6 +21,40 @@ if __name__ == '__main__':
         "--games", type=int, default=1,
         help="number of games",
     )
+    parser.add_argument(
+        "--concurrent", action='store_true',
+        help="pair clients as they connect and run games concurrently",
+    )
+    parser.add_argument(
+        "--max-matches", type=int, default=256,
+        help="number of games running at the same time with --concurrent",
+    )
+    parser.add_argument(
+        "--move-time", type=float, default=None,
+        help="seconds allowed for each move",
+    )
+    parser.add_argument(
+        "--game-time", type=float, default=None,
+        help="seconds allowed for all moves of a player in a game",
+    )
+    parser.add_argument(
+        "--increment", type=float, default=0.0,
+        help="seconds added to the game time after each move",
+    )
+    parser.add_argument(
+        "--replay", default=None,
+        help="file to record games, see python -m submarine_py.replay",
+    )
+    parser.add_argument(
+        "--timings", action='store_true',
+        help="print latencies of the phases of turns at the end"
+        " (not with --concurrent)",
+    )
+    parser.add_argument(
+        "--timings-file", default=None,
+        help="file to write latencies of the phases for each game as JSON"
+        " lines (not with --concurrent)",
+    )
     parser.add_argument(
         "--quiet", action='store_true',
         help="run quietly",
@@ -55,8 +89,20 @@ if __name__ == '__main__':
         logging.debug(f'{rocks}')
     field = submarine_py.Field(args.field_height, args.field_width, rocks)
     logging.debug(f'field is\n{field.to_ascii()}')
-    submarine_py.server_main(
-        args.host, args.port, args.games,
-        field,
-        quiet=args.quiet
-    )
\ No newline at end of file
+    time_control = submarine_py.TimeControl(
+        args.move_time, args.game_time, args.increment)
+    if args.concurrent:
+        submarine_py.async_server_main(
+            args.host, args.port, args.games,
+            field,
+            quiet=args.quiet, max_matches=args.max_matches,
+            time_control=time_control, replay=args.replay
+        )
+    else:
+        submarine_py.server_main(
+            args.host, args.port, args.games,
+            field,
+            quiet=args.quiet, time_control=time_control,
+            replay=args.replay, timings=args.timings,
+            timings_file=args.timings_file
+        )
\ No newline at end of file
@@ -1,16 +1,41 @@
-from .ship import Ship
-from .player_base import Player, play_game
-from .server import server_main, Client
-from .field import Field, Reporter
-from .protocol import Protocol
+"""submarine_py: client library and servers of the submarine game
+
+Names are imported lazily on first access, so that a client importing
+Player and play_game does not load the server, asyncio or tabulate.
+"""
+import importlib
+
+_modules = {
+    'Field': 'field', 'Reporter': 'field',
+    'Ship': 'ship',
+    'Player': 'player_base', 'play_game': 'player_base',
+    'Protocol': 'protocol',
+    'run_game': 'engine',
+    'server_main': 'server', 'Client': 'server',
+    'async_server_main': 'async_server',
+    'TimeControl': 'clock',
+}
 
 __all__ = [
     'Field', 'Ship',
-    'Player', 
+    'Player',
     'Reporter',
-    'Protocol', 'play_game',
+    'Protocol', 'play_game', 'run_game',
     # for sample/server.py
-    'server_main',
+    'server_main', 'async_server_main', 'TimeControl',
     # for internal tests
     'Client'
 ]
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module = importlib.import_module(f'.{_modules[name]}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,336 @@
+"""asyncio based server hosting many games concurrently on one event loop.
+
+The wire protocol is the same line based protocol as in :mod:`server`,
+so clients using :func:`submarine_py.play_game` work unchanged.
+Connected clients are queued after the greeting and paired in arrival
+order; each pair plays one game in its own task.  Clients which
+requested the persistent option go back to the queue after each game.
+"""
+from .field import ReportObserver, Field
+from .protocol import Protocol
+from .server import GameControl
+from . import codec
+from . import binary
+from .replay import GameRecord, ReplayWriter
+import asyncio
+import logging
+import collections
+
+
+class Connection:
+    """a client connected to the asyncio server"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info('peername')
+        self.name = None
+        self.options = set()
+        self.alive = True  #: False after a disconnection or a timeout
+        self.pending = None  # result to be sent with the next status
+
+    def send(self, line: str):
+        """queue one line to the client"""
+        self.writer.write((line + '\n').encode())
+
+    async def _read(self, read, timeout):
+        await self.writer.drain()
+        try:
+            data = await asyncio.wait_for(read, timeout)
+        except asyncio.TimeoutError:
+            self.alive = False
+            raise
+        if not data:
+            self.alive = False
+        return data
+
+    async def recv(self, timeout=None) -> str:
+        """receive one line from the client, or '' when disconnected
+
+        Raises asyncio.TimeoutError if no line arrives in timeout seconds.
+        """
+        line = await self._read(self.reader.readline(), timeout)
+        return line.decode().rstrip()
+
+    @property
+    def binary(self):
+        return Protocol.binary in self.options
+
+    def send_field(self, field_json: str):
+        """(3) queue field information"""
+        if self.binary:
+            self.writer.write(binary.encode_field(field_json))
+        else:
+            self.send(field_json)
+
+    async def recv_placement(self, timeout=None):
+        """(4) receive the initial placement as JSON or as a dict
+
+        Raises asyncio.TimeoutError if it does not arrive in timeout
+        seconds.
+        """
+        if self.binary:
+            payload = await self._read(
+                binary.read_frame_async(self.reader), timeout)
+            return binary.decode_placement(payload)
+        return await self.recv(timeout)
+
+    def send_status(self, status: str):
+        """(5a), (6) queue a status, with the result of the preceding
+        action in the binary mode"""
+        if self.binary:
+            self.writer.write(binary.encode_status(status, self.pending))
+            self.pending = None
+        else:
+            self.send(status)
+
+    def send_result(self, info: dict):
+        """(5c) queue the result of an action, or keep it until the next
+        status in the binary mode"""
+        if self.binary:
+            self.pending = info
+        else:
+            self.send(codec.dumps(info))
+
+    async def recv_action(self, timeout=None):
+        """(5b) receive an action as JSON or as a dict, '' when disconnected
+
+        Raises asyncio.TimeoutError if no action arrives in timeout seconds.
+        """
+        if self.binary:
+            payload = await self._read(
+                binary.read_frame_async(self.reader), timeout)
+            return payload and binary.decode_action(payload)
+        return await self.recv(timeout)
+
+    async def handshake(self):
+        """(2) greet the client and receive options and its name"""
+        self.send(Protocol.greeting)
+        line = await self.recv()
+        requested = []
+        while (option := Protocol.parse_option(line)) is not None:
+            requested.append(option)
+            line = await self.recv()
+        self.name = line
+        if requested:
+            self.options = Protocol.options.intersection(requested)
+            self.send(' '.join([Protocol.accepted, *sorted(self.options)]))
+
+    @property
+    def persistent(self):
+        return Protocol.persistent in self.options
+
+    async def close(self):
+        try:
+            await self.writer.drain()
+            self.writer.close()
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def play_game(field, clients, *, quiet, limit=Protocol.turn_limit,
+                    time_control=None, reporter=None, replay=None):
+    """play one game between two connections to return winner (-1 for draw)
+
+    Returns None when the game is aborted before it starts, by a
+    placement which is invalid or not received in time.
+    time_control (TimeControl) limits the thinking time of each player,
+    including the time for the initial placement.
+    Unless quiet, fields are rendered by reporter (ReportObserver).
+    The game is recorded in replay (ReplayWriter) if given.
+    """
+    names = [cl.name for cl in clients]
+    logging.info(f'start game for {names}')
+    game = GameControl(field)
+    # (3) send field information to both clients
+    field_rep = field.to_json()
+    for cl in clients:
+        cl.send_field(field_rep)
+    # (4) receive initial ship placement
+    clock = time_control.clock() if time_control else None
+    try:
+        ships = await asyncio.gather(*[
+            cl.recv_placement(clock.budget(i) if clock else None)
+            for i, cl in enumerate(clients)])
+    except asyncio.TimeoutError:
+        logging.error(f'initial ship placement timed out {names}')
+        return None
+    logging.debug(f'<< {ships}')
+    try:
+        game.initialize(*ships)
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.error(f'error in initial ship placement {names} {e}')
+        return None
+
+    # (5) main loop of game
+    t = 0
+    c = 0                       # turn to move
+    record = GameRecord(field, ships) if replay else None
+    winner = -1
+    while winner == -1 and t < limit:
+        active, passive = clients[c], clients[1-c]
+        # (5a) notify player to move
+        active.send_status("your turn")
+        passive.send_status("waiting")
+        # (5b) recieve action
+        if clock:
+            clock.start()
+        try:
+            act = await active.recv_action(
+                clock.budget(c) if clock else None)
+        except asyncio.TimeoutError:
+            act = None
+        in_time = clock.stop(c) if clock else True
+        if act not in (None, '') and in_time:
+            info = game.action_info(c, act)
+        else:
+            reason = 'disconnected' if act == '' else 'timed out'
+            logging.error(f'client {names[c]} {reason} at time {t+1}')
+            info = game.forfeit_info(c)
+            act = None
+        if record:
+            record.add(act, info)
+        if clock:
+            info[0]["clock"] = clock.info(c)
+            info[1]["clock"] = clock.info(1-c)
+        # (5c) notify results, encoding each message once
+        active.send_result(info[0])
+        passive.send_result(info[1])
+        if not quiet and reporter:
+            reporter.report_field(game.field, info, c)
+        if "outcome" in info[0]:
+            winner = c if info[0]["outcome"] else 1 - c
+        c = 1 - c
+        t += 1
+
+    if record:
+        replay.write(record.finish(winner))
+    # (6) game ends
+    if winner == -1:
+        for client in clients:
+            client.send_status(Protocol.draw)
+        logging.info(f"draw {names}")
+    else:
+        clients[winner].send_status(Protocol.you_win)
+        clients[1-winner].send_status(Protocol.you_lose)
+        logging.info(f"player {1+winner} {names[winner]} win")
+    return winner
+
+
+class MatchServer:
+    """pair incoming clients and run their games concurrently
+
+    games: number of games to host before stopping (0 for no limit)
+    max_matches: upper bound of games running at the same time
+    time_control: limits of thinking time (TimeControl), if any
+    replay: path of a replay file to record games, if any
+    """
+
+    def __init__(self, field: Field, *, games=0, max_matches=256,
+                 quiet=True, time_control=None, replay=None):
+        self.field = field
+        self.games = games
+        self.quiet = quiet
+        self.time_control = time_control
+        self.reporter = None if quiet else ReportObserver()
+        self.replay = ReplayWriter(replay) if replay else None
+        self.win_count = collections.Counter()
+        self.finished = 0
+        self._slots = asyncio.Semaphore(max_matches)
+        self._waiting = asyncio.Queue()
+        self._matches = set()
+        self._done = asyncio.Event()
+
+    async def accept(self, reader, writer):
+        """(2a), (2b) greet a new client and put it in the waiting queue"""
+        conn = Connection(reader, writer)
+        logging.info(f'player from {conn.addr}')
+        try:
+            await conn.handshake()
+        except ConnectionError:
+            conn.name = None
+        if not conn.name:
+            await conn.close()
+            return
+        await self._waiting.put(conn)
+
+    async def pair(self):
+        """take clients from the queue two by two and start their games"""
+        started = 0
+        while self.games == 0 or started < self.games:
+            first = await self._waiting.get()
+            second = await self._waiting.get()
+            await self._slots.acquire()
+            task = asyncio.create_task(self.run_match([first, second]))
+            self._matches.add(task)
+            task.add_done_callback(self._matches.discard)
+            started += 1
+
+    async def run_match(self, clients):
+        winner = None
+        try:
+            winner = await play_game(self.field, clients, quiet=self.quiet,
+                                     time_control=self.time_control,
+                                     reporter=self.reporter,
+                                     replay=self.replay)
+            if winner is not None and winner >= 0:
+                cl = clients[winner]
+                self.win_count[f'{cl.name}@{cl.addr[0]}'] += 1
+        except ConnectionError as e:
+            logging.error(f'game {[cl.name for cl in clients]} aborted {e}')
+        finally:
+            self._slots.release()
+            self.finished += 1
+            if self.games and self.finished >= self.games:
+                self._done.set()
+            for cl in clients:
+                # a client stays only after a game played to the end
+                if cl.persistent and winner is not None and cl.alive \
+                   and not cl.reader.at_eof() and not self._done.is_set():
+                    await self._waiting.put(cl)
+                else:
+                    await cl.close()
+            if self._done.is_set():
+                # close persistent clients still waiting for a game
+                while not self._waiting.empty():
+                    await self._waiting.get_nowait().close()
+
+    async def start(self, host: str, port: int):
+        """(1) start listening at host:port and return the asyncio server"""
+        self._server = await asyncio.start_server(
+            self.accept, host or None, port, reuse_port=True)
+        self._pairing = asyncio.create_task(self.pair())
+        logging.info(f'waiting client players at {host}:{port}')
+        return self._server
+
+    async def wait_finished(self):
+        """wait until the requested number of games end, then stop"""
+        await self._done.wait()
+        self._pairing.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+        if self.reporter:
+            await asyncio.to_thread(self.reporter.close)
+        if self.replay:
+            self.replay.close()
+        return self.win_count
+
+    async def serve(self, host: str, port: int):
+        await self.start(host, port)
+        return await self.wait_finished()
+
+
+def async_server_main(host: str, port: int, games: int, field: Field, *,
+                      quiet, max_matches=256, time_control=None, replay=None):
+    """run games concurrently; counterpart of server_main"""
+    async def main():
+        server = MatchServer(field, games=games, max_matches=max_matches,
+                             quiet=quiet, time_control=time_control,
+                             replay=replay)
+        return await server.serve(host, port)
+
+    win_count = asyncio.run(main())
+    if games > 1:
+        for name, wins in win_count.items():
+            print(f'{name} win {wins} time(s)')
@@ -0,0 +1,185 @@
+"""Vectorized engine playing many games at once over NumPy arrays.
+
+The state of N games is held as structure of arrays:
+
+- ``position[g, p, s]`` (x, y) of ship type ``SHIP_TYPES[s]`` of player p
+- ``hp[g, p, s]`` remaining HP, 0 for a sunk ship
+- ``turn[g]`` player to move
+
+``BatchGame.step`` applies one action per game with the same rules as
+``GameControl.action``.
+"""
+from .field import Field
+from .protocol import Protocol
+from .ship import Ship
+import numpy as np
+
+SHIP_TYPES = tuple(Ship.MAX_HPS)  #: ship types in the order of axis s
+MAX_HP = np.array([Ship.MAX_HPS[t] for t in SHIP_TYPES], dtype=np.int8)
+ATTACK, MOVE = 0, 1             #: kinds of actions
+
+
+def passable_grid(field: Field):
+    """return boolean array ``grid[x, y]`` of passable squares
+
+    >>> passable_grid(Field(2, 3, [[0, 0]])).astype(int)
+    array([[0, 1],
+           [1, 1],
+           [1, 1]])
+    """
+    grid = np.zeros((field.width, field.height), dtype=bool)
+    for x, y in field.squares:
+        grid[x, y] = True
+    return grid
+
+
+class BatchGame:
+    """N games on the same field played in lockstep
+
+    positions: int array of shape (N, 2, len(SHIP_TYPES), 2)
+    """
+
+    def __init__(self, field: Field, positions, *, limit=Protocol.turn_limit):
+        self.field = field
+        self.grid = passable_grid(field)
+        self.position = np.array(positions, dtype=np.int16)
+        self.n = len(self.position)
+        if self.position.shape != (self.n, 2, len(SHIP_TYPES), 2):
+            raise ValueError(f'unexpected shape {self.position.shape}')
+        x, y = self.position[..., 0], self.position[..., 1]
+        if not self.passable(x, y).all():
+            raise ValueError('position out of field')
+        same = (self.position[:, :, :, None] == self.position[:, :, None])
+        if (same.all(axis=-1).sum(axis=(-1, -2)) != len(SHIP_TYPES)).any():
+            raise ValueError('overlapping positions')
+        self.hp = np.broadcast_to(MAX_HP, (self.n, 2, len(SHIP_TYPES))).copy()
+        self.turn = np.zeros(self.n, dtype=np.int8)
+        self.turns = np.zeros(self.n, dtype=np.int32)
+        self.winner = np.full(self.n, -1, dtype=np.int8)
+        self.done = np.zeros(self.n, dtype=bool)
+        self.limit = limit
+
+    @staticmethod
+    def from_placements(field: Field, placements, **kwargs):
+        """make games from pairs of placements in the JSON format
+
+        >>> game = BatchGame.from_placements(Field(), [(
+        ...     {"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+        ...     {"w": [4, 4], "c": [3, 4], "s": [4, 3]})])
+        >>> game.position[0, 1, 0].tolist()
+        [4, 4]
+        """
+        positions = [[[p[t] for t in SHIP_TYPES] for p in pair]
+                     for pair in placements]
+        return BatchGame(field, positions, **kwargs)
+
+    @staticmethod
+    def random(field: Field, n: int, rng=None, **kwargs):
+        """make n games with uniformly random placements"""
+        rng = rng or np.random.default_rng()
+        squares = np.array(field.squares, dtype=np.int16)
+        k = len(SHIP_TYPES)
+        keys = rng.random((n, 2, len(squares)))
+        chosen = np.argsort(keys, axis=-1)[..., :k]
+        return BatchGame(field, squares[chosen], **kwargs)
+
+    def reset(self, games, rng=None):
+        """restart games (boolean mask or indices) with random placements"""
+        games = np.flatnonzero(np.asarray(games)) \
+            if np.asarray(games).dtype == bool else np.asarray(games)
+        fresh = BatchGame.random(self.field, len(games), rng)
+        self.position[games] = fresh.position
+        self.hp[games] = fresh.hp
+        self.turn[games] = 0
+        self.turns[games] = 0
+        self.winner[games] = -1
+        self.done[games] = False
+
+    def passable(self, x, y):
+        """elementwise Field.passable for arrays of coordinates"""
+        w, h = self.grid.shape
+        inside = (0 <= x) & (x < w) & (0 <= y) & (y < h)
+        return inside & self.grid[np.clip(x, 0, w-1), np.clip(y, 0, h-1)]
+
+    def step(self, kind, ship, to):
+        """apply one action to each unfinished game
+
+        kind: ATTACK or MOVE for each game, shape (N,)
+        ship: index of the ship to move (ignored for attacks), shape (N,)
+        to: target square, shape (N, 2)
+
+        Returns a dict of arrays for the games
+        - 'active': the game was unfinished and the action applied
+        - 'legal': the action was legal
+        - 'hit': index of the ship hit, or -1
+        - 'near': (N, len(SHIP_TYPES)) ships next to the attacked square
+        - 'distance': (N, 2) offset of the moved ship
+        """
+        kind = np.asarray(kind)
+        ship = np.asarray(ship)
+        to = np.asarray(to, dtype=np.int16)
+        g = np.arange(self.n)
+        c = self.turn.astype(np.intp)
+        active = ~self.done
+        tx, ty = to[:, 0], to[:, 1]
+        on_field = self.passable(tx, ty)
+
+        own_pos = self.position[g, c]             # (N, S, 2)
+        own_alive = self.hp[g, c] > 0
+        opp_pos = self.position[g, 1 - c]
+        opp_alive = self.hp[g, 1 - c] > 0
+        delta = np.abs(to[:, None, :] - own_pos).max(axis=-1)
+        in_range = (own_alive & (delta <= 1)).any(axis=1)
+
+        # attack
+        attack = active & (kind == ATTACK)
+        legal_attack = attack & on_field & in_range
+        opp_delta = np.abs(to[:, None, :] - opp_pos).max(axis=-1)
+        at = legal_attack[:, None] & opp_alive & (opp_delta == 0)
+        near = legal_attack[:, None] & opp_alive & (opp_delta == 1)
+        hit = np.where(at.any(axis=1), at.argmax(axis=1), -1)
+        self.hp[g, 1 - c] -= at.astype(self.hp.dtype)
+
+        # move
+        move = active & (kind == MOVE)
+        s = np.clip(ship, 0, len(SHIP_TYPES) - 1).astype(np.intp)
+        src = own_pos[g, s]
+        occupied = (own_alive & (own_pos == to[:, None, :]).all(axis=-1))
+        legal_move = (move & (ship == s) & own_alive[g, s] & on_field
+                      & ((src[:, 0] == tx) | (src[:, 1] == ty))
+                      & ~occupied.any(axis=1))
+        distance = np.where(legal_move[:, None], to - src, 0)
+        self.position[g[legal_move], c[legal_move], s[legal_move]] \
+            = to[legal_move]
+
+        # outcome
+        legal = legal_attack | legal_move
+        sunk = legal_attack & ~(self.hp[g, 1 - c] > 0).any(axis=1)
+        illegal = active & ~legal
+        self.winner[sunk] = c[sunk]
+        self.winner[illegal] = 1 - c[illegal]
+        self.turns[active] += 1
+        self.turn[active] = 1 - self.turn[active]
+        self.done |= sunk | illegal | (self.turns >= self.limit)
+        return {
+            'active': active, 'legal': legal, 'hit': hit, 'near': near,
+            'distance': distance,
+        }
+
+    def observation(self, g: int, c: int):
+        """return the same dict as GameControl.observation for game g"""
+        def fleet(p, me):
+            cond = {}
+            for s, ship_type in enumerate(SHIP_TYPES):
+                if self.hp[g, p, s] > 0:
+                    cond[ship_type] = {"hp": int(self.hp[g, p, s])}
+                    if me:
+                        cond[ship_type]["position"] \
+                            = tuple(self.position[g, p, s].tolist())
+            return cond
+        return {
+            "observation": {
+                "me": fleet(c, True),
+                "opponent": fleet(1 - c, False)
+            }
+        }
@@ -0,0 +1,350 @@
+"""Probability grids of the positions of opponent ships.
+
+A :class:`BeliefTracker` holds, for N games at once, a grid per ship
+type: ``grid[g, s, x, y]`` is the probability that ship ``SHIP_TYPES[s]``
+of the opponent in game g is at (x, y).  The grids of different ships
+are independent (overlaps of ships are not excluded).
+
+The grids are updated by the results seen by a player:
+
+- the result of an own attack: the hit ship is at the attacked square,
+  a ship in "near" is on one of the 8 squares around it, other ships
+  are on neither
+- a move of the opponent: the grid of the moved ship is shifted by the
+  distance
+
+An update of all games is a few array operations, see :meth:`step`,
+which takes the result of :meth:`submarine_py.batch.BatchGame.step`.
+For a single game, :meth:`update` takes the dicts of the protocol::
+
+    tracker = BeliefTracker(field)
+    tracker.update(info, mine=True)
+    tracker.grid[0]
+
+:class:`JointBelief` keeps the joint placements of the ships instead,
+exact on small fields.
+"""
+from .batch import SHIP_TYPES, MAX_HP, ATTACK, MOVE, passable_grid
+from .field import Field
+import math
+import numpy as np
+
+
+class BeliefTracker:
+    """grids of opponent ships in n games on field"""
+
+    def __init__(self, field: Field, n=1):
+        self.field = field
+        self.n = n
+        self.passable = passable_grid(field)
+        self.prior = self.passable / self.passable.sum()
+        self.grid = np.broadcast_to(
+            self.prior, (n, len(SHIP_TYPES)) + self.prior.shape).copy()
+        self.hp = np.broadcast_to(MAX_HP, (n, len(SHIP_TYPES))).copy()
+        # likelihoods[x, y, k]: the attacked square (x, y) (k=0), the 8
+        # squares around it (k=1) and the rest (k=2)
+        w, h = self.prior.shape
+        x, y = np.indices((w, h))
+        dist = np.maximum(np.abs(x[:, :, None, None] - x),
+                          np.abs(y[:, :, None, None] - y))
+        self.likelihoods = np.stack([dist == 0, dist == 1, dist > 1],
+                                    axis=2)
+
+    def attacked(self, games, to, hit, near):
+        """observe results of own attacks in games (index array)
+
+        to: attacked squares, shape (len(games), 2)
+        hit: index of the ship hit, or -1
+        near: (len(games), len(SHIP_TYPES)) ships reported near
+        """
+        to = np.asarray(to)
+        hit = np.asarray(hit)
+        s = np.arange(len(SHIP_TYPES))
+        k = np.where(hit[:, None] == s, 0, np.where(near, 1, 2))
+        grid = self.grid[games]
+        grid *= self.likelihoods[to[:, 0, None], to[:, 1, None], k]
+        hit_games = np.flatnonzero(hit >= 0)
+        self.hp[games[hit_games], hit[hit_games]] -= 1
+        self.grid[games] = self._normalize(grid, self.hp[games])
+
+    def moved(self, games, ship, distance):
+        """observe moves of the opponent in games (index array)
+
+        ship: index of the moved ship, distance: (len(games), 2) offsets
+        """
+        distance = np.asarray(distance)
+        w, h = self.prior.shape
+        x, y = np.indices((w, h))
+        x = x - distance[:, 0, None, None]
+        y = y - distance[:, 1, None, None]
+        inside = (0 <= x) & (x < w) & (0 <= y) & (y < h) & self.passable
+        source = self.grid[games, ship]
+        shifted = source[np.arange(len(games))[:, None, None],
+                         np.clip(x, 0, w - 1), np.clip(y, 0, h - 1)]
+        shifted *= inside
+        self.grid[games, ship] = self._normalize(shifted,
+                                                 self.hp[games, ship])
+
+    def step(self, kind, ship, to, result, mine):
+        """observe a ply of BatchGame in all games
+
+        kind, ship, to: arguments given to BatchGame.step
+        result: its return value
+        mine: whether the player of this tracker made the action, (N,)
+        """
+        legal = result['active'] & result['legal']
+        attack = np.flatnonzero(legal & mine & (np.asarray(kind) == ATTACK))
+        if len(attack):
+            to = np.asarray(to)
+            self.attacked(attack, to[attack], result['hit'][attack],
+                          result['near'][attack])
+        move = np.flatnonzero(legal & ~mine & (np.asarray(kind) == MOVE))
+        if len(move):
+            self.moved(move, np.asarray(ship)[move],
+                       result['distance'][move])
+
+    def update(self, info, mine: bool, g=0):
+        """observe info (dict) seen by the player in game g
+
+        mine: whether info is the result of an action of the player
+
+        This is the same as step() for a single game, with slices
+        instead of index arrays.
+        """
+        grid = self.grid[g]
+        result = info.get("result", {})
+        attacked = result.get("attacked")
+        if mine and attacked:
+            x, y = attacked["position"]
+            k = [0 if attacked.get("hit") == t else
+                 1 if t in attacked["near"] else 2 for t in SHIP_TYPES]
+            grid *= self.likelihoods[x, y, k]
+        moved = result.get("moved")
+        if not mine and moved:
+            s = SHIP_TYPES.index(moved["ship"])
+            dx, dy = moved["distance"]
+            w, h = self.prior.shape
+            shifted = np.zeros_like(grid[s])
+            shifted[max(dx, 0):w + min(dx, 0), max(dy, 0):h + min(dy, 0)] \
+                = grid[s, max(-dx, 0):w - max(dx, 0),
+                       max(-dy, 0):h - max(dy, 0)]
+            grid[s] = shifted * self.passable
+        opponent = info["observation"]["opponent"]
+        self.hp[g] = [opponent[t]["hp"] if t in opponent else 0
+                      for t in SHIP_TYPES]
+        self._normalize(grid, self.hp[g])
+
+    def _normalize(self, grid, hp):
+        """normalize grids (..., width, height) in place to return them,
+        zeroing those of ships with hp <= 0
+
+        A grid contradicted by the observations (e.g. by a wrong prior)
+        restarts from the uniform prior.
+        """
+        total = grid.sum(axis=(-1, -2), keepdims=True)
+        grid /= np.where(total > 0, total, 1.0)
+        empty = total[..., 0, 0] <= 0
+        if empty.any():
+            grid[empty] = self.prior
+        grid[hp <= 0] = 0.0
+        return grid
+
+    def occupancy(self):
+        """return (N, width, height) probability that some ship afloat is
+        at each square, assuming independent ships"""
+        return 1.0 - np.prod(1.0 - self.grid, axis=1)
+
+    def near_probability(self):
+        """return (N, S, width, height) probability that each ship is on
+        the 8 squares around each square"""
+        padded = np.pad(self.grid, ((0, 0), (0, 0), (1, 1), (1, 1)))
+        w, h = self.prior.shape
+        total = -self.grid
+        for dx in range(3):
+            for dy in range(3):
+                total = total + padded[:, :, dx:dx + w, dy:dy + h]
+        return total
+
+    def array(self, g=0):
+        """return the grids of game g as float32 (dataset belief)"""
+        return self.grid[g].astype(np.float32)
+
+
+class JointBelief:
+    """exact posterior over joint placements of the opponent ships
+
+    ``positions[i, s]`` is (x, y) of ship ``SHIP_TYPES[s]`` in hypothesis
+    i, and the hypotheses are equally likely.  Unlike BeliefTracker,
+    ships do not overlap, a "near" report tells exactly which ships are
+    around the attacked square, and an attack of the opponent tells that
+    one of its ships is in range.
+
+    All placements are enumerated if there are at most limit of them.
+    Otherwise samples placements are drawn, and the posterior is
+    approximated by those consistent with the observations; when fewer
+    than a tenth of them survive, new placements are drawn and filtered
+    by the whole history (rejuvenation).
+
+    >>> belief = JointBelief(Field())
+    >>> len(belief), belief.exact
+    (13800, True)
+    """
+
+    def __init__(self, field: Field, *, limit=1_000_000, samples=20000,
+                 rounds=20, rng=None):
+        self.field = field
+        self.passable = passable_grid(field)
+        self.squares = np.argwhere(self.passable).astype(np.int16)
+        self.hp = MAX_HP.astype(int)
+        self.history = []       #: observations as (kind, args, alive)
+        self.samples = samples
+        self.rounds = rounds
+        self.rng = rng or np.random.default_rng()
+        p, k = len(self.squares), len(SHIP_TYPES)
+        self.exact = math.perm(p, k) <= limit
+        self.positions = self._enumerate() if self.exact \
+            else self._draw(samples)
+
+    @staticmethod
+    def from_hypotheses(field: Field, positions, hp, *, rng=None):
+        """return a belief holding given hypotheses, without history"""
+        belief = JointBelief.__new__(JointBelief)
+        belief.field = field
+        belief.passable = passable_grid(field)
+        belief.squares = np.argwhere(belief.passable).astype(np.int16)
+        belief.hp = np.array(hp, dtype=int)
+        belief.history = []
+        belief.samples = len(positions)
+        belief.rounds = 0
+        belief.rng = rng or np.random.default_rng()
+        belief.exact = True
+        belief.positions = positions
+        return belief
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def alive(self):
+        return self.hp > 0
+
+    def _enumerate(self):
+        p, k = len(self.squares), len(SHIP_TYPES)
+        index = np.indices((p,) * k).reshape(k, -1).T
+        distinct = np.ones(len(index), dtype=bool)
+        for a in range(k):
+            for b in range(a + 1, k):
+                distinct &= index[:, a] != index[:, b]
+        return self.squares[index[distinct]]
+
+    def _draw(self, n):
+        keys = self.rng.random((n, len(self.squares)))
+        chosen = np.argsort(keys, axis=1)[:, :len(SHIP_TYPES)]
+        return self.squares[chosen]
+
+    def _filter(self, positions, kind, args, alive):
+        """return positions consistent with an observation, updated by it"""
+        if kind == 'attacked':
+            to, hit, near = args
+            dist = np.abs(positions - np.asarray(to, np.int16)).max(axis=-1)
+            at = np.arange(len(SHIP_TYPES)) == hit
+            ok = ((dist == 0) == at) & ((dist == 1) == near)
+            return positions[(ok | ~alive).all(axis=1)]
+        if kind == 'moved':
+            s, distance = args
+            positions = positions.copy()
+            positions[:, s] += np.asarray(distance, np.int16)
+            x, y = positions[:, s, 0], positions[:, s, 1]
+            w, h = self.passable.shape
+            inside = (0 <= x) & (x < w) & (0 <= y) & (y < h)
+            ok = inside & self.passable[np.clip(x, 0, w - 1),
+                                        np.clip(y, 0, h - 1)]
+            others = alive.copy()
+            others[s] = False
+            same = (positions[:, others] == positions[:, s, None]).all(-1)
+            return positions[ok & ~same.any(axis=1)]
+        # an attack of the opponent from one of its ships
+        to, = args
+        dist = np.abs(positions - np.asarray(to, np.int16)).max(axis=-1)
+        return positions[((dist <= 1) & alive).any(axis=1)]
+
+    def _observe(self, kind, *args):
+        alive = self.alive
+        self.history.append((kind, args, alive))
+        self.positions = self._filter(self.positions, kind, args, alive)
+        if not self.exact and len(self.positions) < self.samples // 10:
+            self.rejuvenate()
+
+    def rejuvenate(self):
+        """draw new placements consistent with the whole history"""
+        found = [self.positions]
+        total = len(self.positions)
+        for _ in range(self.rounds):
+            if total >= self.samples:
+                break
+            positions = self._draw(self.samples)
+            for kind, args, alive in self.history:
+                positions = self._filter(positions, kind, args, alive)
+            found.append(positions)
+            total += len(positions)
+        self.positions = np.concatenate(found)[:self.samples]
+
+    def update(self, info, mine: bool):
+        """observe info (dict) seen by the player
+
+        mine: whether info is the result of an action of the player
+        """
+        result = info.get("result", {})
+        attacked = result.get("attacked")
+        if attacked:
+            if mine:
+                hit = SHIP_TYPES.index(attacked["hit"]) \
+                    if "hit" in attacked else -1
+                near = np.array([t in attacked["near"] for t in SHIP_TYPES])
+                self._observe('attacked', attacked["position"], hit, near)
+            else:
+                self._observe('attack', attacked["position"])
+        moved = result.get("moved")
+        if moved and not mine:
+            self._observe('moved', SHIP_TYPES.index(moved["ship"]),
+                          moved["distance"])
+        opponent = info["observation"]["opponent"]
+        self.hp = np.array([opponent[t]["hp"] if t in opponent else 0
+                            for t in SHIP_TYPES])
+
+    def marginals(self):
+        """return (len(SHIP_TYPES), width, height) probabilities of the
+        position of each ship, zero for sunk ships
+
+        If no hypothesis is left (only when sampling), ships afloat
+        are uniform over the field.
+        """
+        w, h = self.passable.shape
+        k = len(SHIP_TYPES)
+        if not len(self.positions):
+            grid = np.broadcast_to(self.passable / self.passable.sum(),
+                                   (k, w, h)).copy()
+        else:
+            index = (np.arange(k) * w + self.positions[..., 0]) * h \
+                + self.positions[..., 1]
+            grid = np.bincount(index.ravel(), minlength=k * w * h)
+            grid = grid.reshape(k, w, h) / len(self.positions)
+        grid[~self.alive] = 0.0
+        return grid
+
+    def occupancy(self):
+        """return (width, height) probability that a ship is at each
+        square, i.e., that an attack there hits"""
+        return self.marginals().sum(axis=0)
+
+    def sample(self, n, rng=None):
+        """return n hypotheses (n, len(SHIP_TYPES), 2) drawn from the
+        posterior, positions of sunk ships being meaningless"""
+        rng = rng or self.rng
+        if not len(self.positions):
+            return self._draw(n)
+        return self.positions[rng.integers(len(self.positions), size=n)]
+
+    def array(self):
+        """return marginals() as float32 (dataset belief)"""
+        return self.marginals().astype(np.float32)
@@ -0,0 +1,245 @@
+"""Compact binary encoding of messages, the 'binary' protocol option.
+
+After the handshake, a client which requested ``option binary`` and got
+it accepted exchanges length prefixed frames instead of lines::
+
+    frame   = length (uint32, big endian) payload
+    payload = kind (uint8) body
+
+A status frame merges the status line ("your turn", "waiting", "you
+win", ...) with the result of the preceding action, so that a player
+receives one frame per ply instead of two lines.  Its body is::
+
+    flags (uint8)          HAS_INFO | HAS_RESULT | HAS_OUTCOME | WON | HAS_CLOCK
+    result                 if HAS_RESULT
+        kind (uint8)       1 attacked, 2 moved
+        ok (uint8)         0 for an illegal action
+        attacked: x, y (int16), hit (uint8 ship index or 255),
+                  near (uint8 bit mask of ship indices)
+        moved:    ship (uint8), dx, dy (int16)
+    observation            if HAS_INFO
+        me: hp (uint8, 0 for a sunk ship), x, y (int16) per ship
+        opponent: hp (uint8) per ship
+    clock                  if HAS_CLOCK
+        elapsed, me, opponent (float64, NaN for no limit)
+
+Ships are indexed in the order of SHIP_TYPES.  The field is sent as its
+JSON text in a FIELD frame, the placement and actions of a player in
+PLACEMENT and ACTION frames.  Decoded messages are the same dicts as
+the JSON messages, except that "near" lists ships in the order of
+SHIP_TYPES.
+"""
+from .protocol import Protocol
+from .ship import Ship
+import math
+import struct
+
+SHIP_TYPES = tuple(Ship.MAX_HPS)  #: ship types in the order of indices
+STATUS = ["your turn", "waiting",
+          Protocol.you_win, Protocol.you_lose, Protocol.draw]
+FIELD, PLACEMENT, ACTION = 5, 6, 7   #: kinds following those in STATUS
+HAS_INFO, HAS_RESULT, HAS_OUTCOME, WON, HAS_CLOCK = 1, 2, 4, 8, 16
+ATTACKED, MOVED = 1, 2
+NO_SHIP = 255
+
+_header = struct.Struct('!I')
+_attacked = struct.Struct('!hhBB')
+_moved = struct.Struct('!Bhh')
+_me = struct.Struct('!Bhh')
+_clock = struct.Struct('!ddd')
+_action = struct.Struct('!BBhh')
+_placement = struct.Struct('!Bhh')
+
+
+def frame(payload: bytes) -> bytes:
+    """prepend the length to payload"""
+    return _header.pack(len(payload)) + payload
+
+
+def read_frame(file) -> bytes:
+    """read the payload of a frame from a binary file, b'' at the end"""
+    header = file.read(_header.size)
+    if len(header) < _header.size:
+        return b''
+    n, = _header.unpack(header)
+    payload = file.read(n)
+    return payload if len(payload) == n else b''
+
+
+async def read_frame_async(reader) -> bytes:
+    """read_frame() for asyncio.StreamReader"""
+    import asyncio
+    try:
+        header = await reader.readexactly(_header.size)
+        n, = _header.unpack(header)
+        return await reader.readexactly(n)
+    except asyncio.IncompleteReadError:
+        return b''
+
+
+def encode_field(field_json: str) -> bytes:
+    return frame(bytes([FIELD]) + field_json.encode())
+
+
+def decode_field(payload: bytes) -> str:
+    """return the JSON text of the field, '' for other frames"""
+    if not payload or payload[0] != FIELD:
+        return ''
+    return payload[1:].decode()
+
+
+def encode_placement(positions) -> bytes:
+    """encode a dict of ship type -> position
+
+    >>> p = encode_placement({"w": [0, 0], "c": [0, 1], "s": (1, 0)})
+    >>> decode_placement(p[4:])
+    {'w': [0, 0], 'c': [0, 1], 's': [1, 0]}
+    """
+    body = bytearray([PLACEMENT])
+    for ship_type in SHIP_TYPES:
+        if ship_type in positions:
+            body += _placement.pack(1, *positions[ship_type])
+        else:
+            body += _placement.pack(0, 0, 0)
+    return frame(bytes(body))
+
+
+def decode_placement(payload: bytes):
+    """return dict of ship type -> position, or {} for a malformed frame"""
+    if len(payload) != 1 + _placement.size * len(SHIP_TYPES) \
+       or payload[0] != PLACEMENT:
+        return {}
+    positions = {}
+    for i, ship_type in enumerate(SHIP_TYPES):
+        present, x, y = _placement.unpack_from(
+            payload, 1 + i * _placement.size)
+        if present:
+            positions[ship_type] = [x, y]
+    return positions
+
+
+def encode_action(act) -> bytes:
+    """encode an action dict
+
+    >>> decode_action(encode_action({"move": {"ship": "c", "to": [2, 1]}})[4:])
+    {'move': {'ship': 'c', 'to': [2, 1]}}
+    >>> decode_action(encode_action({"attack": {"to": [0, 3]}})[4:])
+    {'attack': {'to': [0, 3]}}
+    """
+    if "move" in act:
+        ship = SHIP_TYPES.index(act["move"]["ship"])
+        body = _action.pack(1, ship, *act["move"]["to"])
+    else:
+        body = _action.pack(0, 0, *act["attack"]["to"])
+    return frame(bytes([ACTION]) + body)
+
+
+def decode_action(payload: bytes):
+    """return an action dict, {} for a malformed frame (an illegal action)"""
+    if len(payload) != 1 + _action.size or payload[0] != ACTION:
+        return {}
+    kind, ship, x, y = _action.unpack_from(payload, 1)
+    if kind == 0:
+        return {"attack": {"to": [x, y]}}
+    if kind == 1 and ship < len(SHIP_TYPES):
+        return {"move": {"ship": SHIP_TYPES[ship], "to": [x, y]}}
+    return {}
+
+
+def encode_status(status: str, info=None) -> bytes:
+    """encode a status with the result of the preceding action (if any)"""
+    body = bytearray([STATUS.index(status), 0])
+    if info is None:
+        return frame(bytes(body))
+    flags = HAS_INFO
+    result = info.get("result")
+    if result is not None:
+        flags |= HAS_RESULT
+        if "attacked" in result:
+            attacked = result["attacked"]
+            body += bytes([ATTACKED, bool(attacked)])
+            if attacked:
+                hit = SHIP_TYPES.index(attacked["hit"]) \
+                    if "hit" in attacked else NO_SHIP
+                near = sum(1 << SHIP_TYPES.index(s) for s in attacked["near"])
+                body += _attacked.pack(*attacked["position"], hit, near)
+        else:
+            moved = result["moved"]
+            body += bytes([MOVED, bool(moved)])
+            if moved:
+                body += _moved.pack(SHIP_TYPES.index(moved["ship"]),
+                                    *moved["distance"])
+    if "outcome" in info:
+        flags |= HAS_OUTCOME | (WON if info["outcome"] else 0)
+    observation = info["observation"]
+    for ship_type in SHIP_TYPES:
+        ship = observation["me"].get(ship_type)
+        body += _me.pack(ship["hp"], *ship["position"]) if ship \
+            else _me.pack(0, 0, 0)
+    for ship_type in SHIP_TYPES:
+        ship = observation["opponent"].get(ship_type)
+        body.append(ship["hp"] if ship else 0)
+    if "clock" in info:
+        flags |= HAS_CLOCK
+        clock = info["clock"]
+        body += _clock.pack(*(math.nan if clock[key] is None else clock[key]
+                              for key in ('elapsed', 'me', 'opponent')))
+    body[1] = flags
+    return frame(bytes(body))
+
+
+def decode_status(payload: bytes):
+    """return (status, info) of a status frame, info being None if absent
+
+    Raises ValueError for a malformed frame.
+    """
+    if len(payload) < 2 or payload[0] >= len(STATUS):
+        raise ValueError(f'unexpected frame {payload[:8]!r}')
+    status, flags = STATUS[payload[0]], payload[1]
+    if not flags & HAS_INFO:
+        return status, None
+    info = {}
+    offset = 2
+    try:
+        if flags & HAS_RESULT:
+            kind, ok = payload[offset], payload[offset+1]
+            offset += 2
+            if kind == ATTACKED:
+                attacked = False
+                if ok:
+                    x, y, hit, near = _attacked.unpack_from(payload, offset)
+                    offset += _attacked.size
+                    attacked = {"position": [x, y]}
+                    if hit != NO_SHIP:
+                        attacked["hit"] = SHIP_TYPES[hit]
+                    attacked["near"] = [s for i, s in enumerate(SHIP_TYPES)
+                                        if near & (1 << i)]
+                info["result"] = {"attacked": attacked}
+            else:
+                moved = False
+                if ok:
+                    ship, dx, dy = _moved.unpack_from(payload, offset)
+                    offset += _moved.size
+                    moved = {"ship": SHIP_TYPES[ship], "distance": [dx, dy]}
+                info["result"] = {"moved": moved}
+        if flags & HAS_OUTCOME:
+            info["outcome"] = bool(flags & WON)
+        me, opponent = {}, {}
+        for ship_type in SHIP_TYPES:
+            hp, x, y = _me.unpack_from(payload, offset)
+            offset += _me.size
+            if hp:
+                me[ship_type] = {"hp": hp, "position": [x, y]}
+        for ship_type in SHIP_TYPES:
+            if payload[offset]:
+                opponent[ship_type] = {"hp": payload[offset]}
+            offset += 1
+        info["observation"] = {"me": me, "opponent": opponent}
+        if flags & HAS_CLOCK:
+            values = _clock.unpack_from(payload, offset)
+            info["clock"] = {
+                key: None if math.isnan(v) else v
+                for key, v in zip(('elapsed', 'me', 'opponent'), values)}
+    except (IndexError, struct.error) as e:
+        raise ValueError(f'malformed frame {e}')
+    return status, info
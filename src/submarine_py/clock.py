@@ -0,0 +1,100 @@
+"""Clocks limiting the thinking time of players in a game.
+
+A :class:`TimeControl` gives a limit per move, a time for the whole
+game, or both.  The game time works like a Fischer clock in chess: the
+increment is added after each move made in time.
+"""
+import time
+
+
+class TimeControl:
+    """limits of thinking time in seconds
+
+    move: limit for each move (None for no limit)
+    game: time of each player for the whole game (None for no limit)
+    increment: time added to the game time after each move
+    """
+
+    def __init__(self, move=None, game=None, increment=0.0):
+        self.move = move
+        self.game = game
+        self.increment = increment
+
+    def __bool__(self):
+        return self.move is not None or self.game is not None
+
+    def __repr__(self):
+        return (f'TimeControl(move={self.move}, game={self.game}, '
+                f'increment={self.increment})')
+
+    def clock(self):
+        """return a new Clock for a game"""
+        return Clock(self)
+
+
+class Clock:
+    """clocks of the two players in a game
+
+    >>> clock = TimeControl(move=1.0, game=1.5, increment=0.25).clock()
+    >>> clock.budget(0)
+    1.0
+    >>> clock.charge(0, 0.75)
+    True
+    >>> clock.info(1)
+    {'elapsed': 0.75, 'me': 1.5, 'opponent': 1.0}
+    >>> clock.budget(0)
+    1.0
+    >>> clock.charge(0, 0.9)
+    True
+    >>> clock.budget(0)
+    0.35
+    >>> clock.charge(0, 0.5)
+    False
+    """
+
+    def __init__(self, control: TimeControl):
+        self.control = control
+        self.remaining = [control.game, control.game]
+        self.total = [0.0, 0.0]  #: thinking time used by each player
+        self.elapsed = 0.0       #: thinking time of the last move
+        self._start = None
+
+    def budget(self, c):
+        """return time available for the next move of player c (None for
+        no limit)"""
+        limits = [t for t in (self.control.move, self.remaining[c])
+                  if t is not None]
+        return round(min(limits), 6) if limits else None
+
+    def start(self):
+        """start the clock of the player to move"""
+        self._start = time.monotonic()
+
+    def stop(self, c):
+        """stop the clock of player c to return whether the move was in time"""
+        return self.charge(c, time.monotonic() - self._start)
+
+    def charge(self, c, elapsed):
+        """charge elapsed seconds to player c to return whether in time"""
+        in_time = self.budget(c) is None or elapsed <= self.budget(c)
+        self.elapsed = elapsed
+        self.total[c] += elapsed
+        if self.remaining[c] is not None:
+            self.remaining[c] -= elapsed
+            if in_time:
+                self.remaining[c] += self.control.increment
+        return in_time
+
+    def info(self, c):
+        """return the state of the clocks seen by player c after a move
+
+        'elapsed' is the thinking time of the last move, 'me' and
+        'opponent' are the remaining game time (None for no limit).
+        """
+        def rounded(t):
+            return None if t is None else round(max(t, 0.0), 3)
+        return {
+            'elapsed': round(self.elapsed, 3),
+            'me': rounded(self.remaining[c]),
+            'opponent': rounded(self.remaining[1-c]),
+        }
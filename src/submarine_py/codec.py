@@ -0,0 +1,55 @@
+"""Encoding of JSON messages, using orjson if it is installed.
+
+The server builds each message as a dict and encodes it once with
+:func:`dumps`.  The encoder can be switched by :func:`use`:
+
+>>> use('json')
+>>> dumps({"move": {"ship": "w", "to": (1, 2)}})
+'{"move": {"ship": "w", "to": [1, 2]}}'
+>>> loads('{"attack": {"to": [0, 1]}}')
+{'attack': {'to': [0, 1]}}
+>>> use()
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
+_dumps, _loads = json.dumps, json.loads
+backend = 'json'                #: name of the encoder in use
+
+
+def dumps(obj) -> str:
+    """encode obj into a JSON string"""
+    return _dumps(obj)
+
+
+def loads(s):
+    """decode a JSON string"""
+    return _loads(s)
+
+
+def use(name=None):
+    """select the encoder, 'orjson' or 'json' (default: the fastest one)"""
+    global _dumps, _loads, backend
+    if name is None:
+        name = 'json' if orjson is None else 'orjson'
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError('orjson is not installed')
+        _dumps, _loads = _orjson_dumps, orjson.loads
+    elif name == 'json':
+        _dumps, _loads = json.dumps, json.loads
+    else:
+        raise ValueError(f'unknown encoder {name}')
+    backend = name
+
+
+use()
@@ -0,0 +1,338 @@
+"""Export of games as training samples in NumPy shards.
+
+Each ply gives a sample seen by the player to move: its observation
+before the action, an optional belief, the action taken and the outcome
+of the game for that player.  The arrays of a sample have fixed shapes
+for a field:
+
+- ``me`` int16 (len(SHIP_TYPES), 3): hp, x, y of own ships, hp 0 and
+  position (-1, -1) for a sunk ship
+- ``opponent`` uint8 (len(SHIP_TYPES),): hp of opponent ships
+- ``planes`` uint8 (len(PLANES), width, height): see PLANES
+- ``belief`` float32, shape given by the belief (only if given)
+- ``action`` int16 (4,): kind (ATTACK, MOVE, INVALID or FORFEIT of
+  replay), ship index, x, y
+- ``outcome`` int8: 1 for a win, -1 for a loss, 0 for a draw
+- ``game``, ``turn`` int32: index of the game and the ply
+
+Samples are written in ``.npz`` shards of a fixed number of samples, so
+that a run of any length is exported with bounded memory::
+
+    $ python -m submarine_py.dataset data --path sample --games 1000 \\
+          random_player:RandomPlayer original_player:OriginalPlayer
+
+A belief is a callable taking the field to return a tracker with
+``update(info, mine)``, called with every result seen by the player
+(mine is True for the results of its own actions), and ``array()``.
+"""
+from .batch import SHIP_TYPES, passable_grid
+from .field import Field
+from .replay import Replay, ReplayReader
+from .server import GameControl
+import numpy as np
+import logging
+import os
+
+PLANES = [
+    'passable',          # squares of the field without rocks
+    'ships',             # own ships
+    'missed',            # own attacks with neither hit nor near
+    'near',              # own attacks reported near a ship
+    'hit',               # own attacks hitting a ship
+    'attacked',          # attacks of the opponent
+]
+PASSABLE, SHIPS, MISSED, NEAR, HIT, ATTACKED = range(len(PLANES))
+
+
+class Observation:
+    """observation of a player accumulated over a game as arrays
+
+    initial: initial observation of the player, GameControl.observation()
+    """
+
+    def __init__(self, field: Field, initial):
+        self.planes = np.zeros((len(PLANES), field.width, field.height),
+                               dtype=np.uint8)
+        self.planes[PASSABLE] = passable_grid(field)
+        self.me = np.zeros((len(SHIP_TYPES), 3), dtype=np.int16)
+        self.opponent = np.zeros(len(SHIP_TYPES), dtype=np.uint8)
+        self.observe(initial["observation"])
+
+    def observe(self, observation):
+        self.me[:] = (0, -1, -1)
+        for s, ship_type in enumerate(SHIP_TYPES):
+            ship = observation["me"].get(ship_type)
+            if ship:
+                self.me[s] = (ship["hp"], *ship["position"])
+            ship = observation["opponent"].get(ship_type)
+            self.opponent[s] = ship["hp"] if ship else 0
+
+    def update(self, info, mine: bool):
+        """update by info returned by GameControl.action_info()
+
+        mine: whether info is the result of an action of the player
+        """
+        attacked = info.get("result", {}).get("attacked")
+        if attacked:
+            x, y = attacked["position"]
+            if not mine:
+                plane = ATTACKED
+            elif "hit" in attacked:
+                plane = HIT
+            else:
+                plane = NEAR if attacked["near"] else MISSED
+            if self.planes[plane, x, y] < 255:
+                self.planes[plane, x, y] += 1
+        self.observe(info["observation"])
+
+    def arrays(self):
+        """return (me, opponent, planes) as new arrays"""
+        planes = self.planes.copy()
+        alive = self.me[:, 0] > 0
+        planes[SHIPS, self.me[alive, 1], self.me[alive, 2]] = 1
+        return self.me.copy(), self.opponent.copy(), planes
+
+
+def game_samples(replay: Replay, *, game=0, belief=None):
+    """return dict of arrays of the samples of a recorded game
+
+    The game is re-simulated by GameControl to give the observations.
+    """
+    field = replay.field()
+    control = GameControl(field)
+    control.initialize(*replay.placements())
+    observations = [Observation(field, control.observation(c))
+                    for c in range(2)]
+    trackers = [belief(field) for _ in range(2)] if belief else None
+    columns = {'me': [], 'opponent': [], 'planes': [], 'belief': []}
+    for t, act in enumerate(replay.actions()):
+        c = t % 2
+        me, opponent, planes = observations[c].arrays()
+        columns['me'].append(me)
+        columns['opponent'].append(opponent)
+        columns['planes'].append(planes)
+        if trackers:
+            columns['belief'].append(
+                np.asarray(trackers[c].array(), dtype=np.float32))
+        if act is None:
+            info = control.forfeit_info(c)
+        else:
+            info = control.action_info(c, act)
+        for i, p in enumerate((c, 1 - c)):
+            observations[p].update(info[i], i == 0)
+            if trackers:
+                trackers[p].update(info[i], i == 0)
+    turns = replay.turn_array()
+    n = len(turns)
+    mover = np.arange(n) % 2
+    winner = replay.winner
+    samples = {key: np.stack(value) for key, value in columns.items()
+               if value}
+    samples['action'] = np.stack(
+        [turns[key].astype(np.int16) for key in ('kind', 'ship', 'x', 'y')],
+        axis=1)
+    samples['outcome'] = np.zeros(n, dtype=np.int8) if winner < 0 \
+        else np.where(mover == winner, 1, -1).astype(np.int8)
+    samples['game'] = np.full(n, game, dtype=np.int32)
+    samples['turn'] = np.arange(n, dtype=np.int32)
+    return samples
+
+
+class ShardWriter:
+    """write samples to ``prefix-NNNNN.npz`` files of shard_size samples
+
+    Samples are buffered until a shard is filled; close() writes the
+    rest in a smaller shard.
+    """
+
+    def __init__(self, directory, *, shard_size=65536, prefix='shard',
+                 compress=True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.save = np.savez_compressed if compress else np.savez
+        self.buffer = []
+        self.buffered = 0
+        self.paths = []         #: shards written so far
+        self.samples = 0        #: samples written so far
+
+    def add(self, samples):
+        """add dict of arrays whose first axes are samples"""
+        if self.buffer:
+            first = self.buffer[0]
+            if samples.keys() != first.keys() or any(
+                    value.shape[1:] != first[key].shape[1:]
+                    for key, value in samples.items()):
+                raise ValueError('samples of different shapes in a shard')
+        self.buffer.append(samples)
+        self.buffered += len(samples['game'])
+        while self.buffered >= self.shard_size:
+            self._write(self.shard_size)
+
+    def _write(self, n):
+        merged = {key: np.concatenate([b[key] for b in self.buffer])
+                  for key in self.buffer[0]}
+        path = os.path.join(self.directory,
+                            f'{self.prefix}-{len(self.paths):05d}.npz')
+        self.save(path, **{key: value[:n] for key, value in merged.items()})
+        self.paths.append(path)
+        self.samples += n
+        self.buffered -= n
+        self.buffer = [{key: value[n:] for key, value in merged.items()}] \
+            if self.buffered else []
+
+    def close(self):
+        if self.buffered:
+            self._write(self.buffered)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def export(replays, directory, *, belief=None, **kwargs):
+    """write the samples of replays (iterable of Replay) to shards
+
+    kwargs are passed to ShardWriter.
+
+    Returns the ShardWriter after closing it.
+    """
+    with ShardWriter(directory, **kwargs) as writer:
+        for g, replay in enumerate(replays):
+            if replay.turns:
+                writer.add(game_samples(replay, game=g, belief=belief))
+    return writer
+
+
+def _play(game_id: int, specs, field_json: str):
+    """return the record of a game, None if a player raised an exception"""
+    from .engine import run_game
+    from .tournament import load_player
+    import contextlib
+    import io
+    field = Field.from_json(field_json)
+    record = io.BytesIO()
+    try:
+        players = [load_player(spec)() for spec in specs]
+        if game_id % 2:
+            players.reverse()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_game(field, players, replay=record)
+    except Exception:
+        logging.exception(f'game {game_id}: error, skipped')
+        return None
+    return record.getvalue()
+
+
+def _replays(future):
+    """yield Replay of a future of _play(), nothing for a failed game"""
+    try:
+        record = future.result()
+    except Exception:
+        logging.exception('game failed in a worker, skipped')
+        return
+    if record:
+        yield Replay.from_record(record)
+
+
+def self_play(specs, games: int, field: Field, *, workers=None, paths=()):
+    """play games between two players over a process pool to iterate
+    Replay of each game in order, alternating the first mover
+
+    At most a few games per worker are kept in flight, so that a long
+    run is not held in memory.  Games in which a player raises an
+    exception are skipped.
+    """
+    import concurrent.futures
+    import collections
+    from .tournament import _init_worker
+    workers = workers or os.cpu_count()
+    field_json = field.to_json()
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(list(paths),)) as pool:
+        pending = collections.deque()
+        for g in range(games):
+            pending.append(pool.submit(_play, g, list(specs), field_json))
+            if len(pending) >= 4 * workers:
+                yield from _replays(pending.popleft())
+        while pending:
+            yield from _replays(pending.popleft())
+
+
+def read_shards(directory, prefix='shard'):
+    """iterate dicts of arrays of the shards in directory"""
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(prefix + '-') and name.endswith('.npz'):
+            with np.load(os.path.join(directory, name)) as data:
+                yield dict(data)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from .tournament import load_player
+
+    parser = argparse.ArgumentParser(
+        description="export games as training samples in npz shards",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("output", help="directory of shards")
+    parser.add_argument(
+        "players", nargs='*',
+        help="import paths of two players for self-play",
+    )
+    parser.add_argument(
+        "--replay", default=None,
+        help="export games in a replay file instead of self-play",
+    )
+    parser.add_argument(
+        "--games", type=int, default=100,
+        help="number of games of self-play",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of processes",
+    )
+    parser.add_argument(
+        "--shard-size", type=int, default=65536,
+        help="number of samples in a shard",
+    )
+    parser.add_argument(
+        "--belief", default=None,
+        help="import path of a belief,"
+        " e.g., submarine_py.belief:BeliefTracker",
+    )
+    parser.add_argument(
+        "--path", action='append', default=[],
+        help="directory to search players, e.g., sample",
+    )
+    parser.add_argument(
+        "--field-width", type=int, default=5,
+        help="width of field",
+    )
+    parser.add_argument(
+        "--field-height", type=int, default=5,
+        help="height of field",
+    )
+    args = parser.parse_intermixed_args()
+    FORMAT = '%(asctime)s %(levelname)s %(message)s'
+    logging.basicConfig(format=FORMAT, level=logging.INFO, force=True)
+    sys.path[:0] = args.path
+    belief = load_player(args.belief) if args.belief else None
+    if args.replay:
+        reader = ReplayReader(args.replay)
+        replays = iter(reader)
+    elif len(args.players) == 2:
+        replays = self_play(
+            args.players, args.games,
+            Field(args.field_height, args.field_width),
+            workers=args.workers, paths=args.path)
+    else:
+        parser.error('expects two players or --replay')
+    writer = export(replays, args.output, belief=belief,
+                    shard_size=args.shard_size)
+    logging.info(f'{writer.samples} samples in {len(writer.paths)} shards')
@@ -0,0 +1,64 @@
+"""In-process game engine: play two Player objects without sockets.
+
+The players receive the same messages as over the network, in the same
+order as :func:`submarine_py.play_game` would deliver them.
+"""
+from .field import Field
+from .player_base import Player
+from .protocol import Protocol
+from .server import GameControl
+from .replay import GameRecord
+from . import codec
+
+
+def run_game(field: Field, players, *, parsed=False,
+             limit=Protocol.turn_limit, replay=None):
+    """play one game between players[0] (first mover) and players[1]
+
+    If parsed is True, Player.update receives the messages as dicts
+    instead of JSON strings.  Such dicts are shared with the engine and
+    must be treated as read-only by the players.
+
+    If replay (ReplayWriter) is given, the game is recorded in it.
+
+    Returns (winner, turns, reason) where winner is the index of the
+    winning player or -1 for a draw, and reason is one of
+    'sunk', 'illegal' or 'draw'.
+    """
+    assert len(players) == 2
+    assert all(isinstance(p, Player) for p in players)
+    game = GameControl(field)
+    for p in players:
+        p.initialize(field)
+    if parsed:
+        placements = [{ship.type: ship.position for ship in p.ships.values()}
+                      for p in players]
+    else:
+        placements = [p.ships_to_json() for p in players]
+    game.initialize(*placements)
+    record = GameRecord(field, placements) if replay else None
+
+    t = 0
+    c = 0                       # turn to move
+    winner, reason = -1, 'draw'
+    while winner == -1 and t < limit:
+        active, passive = players[c], players[1-c]
+        act = active.action()
+        info = game.action_info(c, act)
+        if record:
+            record.add(act, info)
+        if parsed:
+            active.update(info[0], "your turn")
+            passive.update(info[1], "waiting")
+        else:
+            active.update(codec.dumps(info[0]), "your turn")
+            passive.update(codec.dumps(info[1]), "waiting")
+        if "outcome" in info[0]:
+            won = info[0]["outcome"]
+            winner = c if won else 1 - c
+            reason = 'sunk' if won else 'illegal'
+        c = 1 - c
+        t += 1
+    if record:
+        replay.write(record.finish(winner))
+    return winner, t, reason
@@ -0,0 +1,302 @@
+"""Reinforcement learning environments in the style of Gymnasium.
+
+An agent plays one side of games against an opponent policy, through
+``reset()`` and ``step(action)`` of the usual signatures::
+
+    env = SubmarineEnv(Field())
+    obs, info = env.reset(seed=0)
+    while True:
+        action = policy(obs, info['action_mask'])
+        obs, reward, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            break
+
+An action is an index in ``range(n_actions(field))``: an attack on the
+square of bit index ``y * width + x`` (see :class:`Field`) below
+``width * height``, and a move of ship ``SHIP_TYPES[s]`` to that square
+in block ``1 + s``.  ``info['action_mask']`` tells the legal actions; an
+illegal action loses the game as on the server.  The observation is a
+dict of the arrays ``me``, ``opponent`` and ``planes`` of
+:class:`submarine_py.dataset.Observation`, and the reward is 1 for a
+win, -1 for a loss and 0 otherwise.
+
+:class:`VectorEnv` steps many games at once over a
+:class:`submarine_py.batch.BatchGame` against a uniformly random
+opponent, and restarts finished games in the same step.
+"""
+from .batch import BatchGame, SHIP_TYPES, ATTACK, MOVE, passable_grid
+from .dataset import Observation, PLANES, PASSABLE, SHIPS, MISSED, NEAR, HIT, \
+    ATTACKED
+from .field import Field
+from .player_base import Player
+from .protocol import Protocol
+from .server import GameControl
+import numpy as np
+
+
+def n_actions(field: Field):
+    """return the number of actions
+
+    >>> n_actions(Field(5, 5))
+    100
+    """
+    return (1 + len(SHIP_TYPES)) * field.width * field.height
+
+
+def encode(field: Field, kind, ship, to):
+    """return the index of an action (kind ATTACK or MOVE, ship index)
+
+    >>> encode(Field(5, 5), MOVE, 1, (3, 2))
+    63
+    """
+    x, y = to
+    block = 0 if kind == ATTACK else 1 + ship
+    return (block * field.height + y) * field.width + x
+
+
+def decode(field: Field, action):
+    """inverse of encode(), returns (kind, ship, (x, y))
+
+    >>> decode(Field(5, 5), 63)
+    (1, 1, (3, 2))
+    """
+    block, square = divmod(int(action), field.width * field.height)
+    y, x = divmod(square, field.width)
+    if block == 0:
+        return ATTACK, 0, (x, y)
+    return MOVE, block - 1, (x, y)
+
+
+def _act(kind, ship, to):
+    if kind == ATTACK:
+        return {"attack": {"to": list(to)}}
+    if not 0 <= ship < len(SHIP_TYPES):
+        return {}
+    return {"move": {"ship": SHIP_TYPES[ship], "to": list(to)}}
+
+
+def _random_placement(field, rng):
+    squares = field.squares
+    chosen = rng.choice(len(squares), len(SHIP_TYPES), replace=False)
+    return {t: list(squares[i]) for t, i in zip(SHIP_TYPES, chosen)}
+
+
+class SubmarineEnv:
+    """one game at a time on GameControl against opponent
+
+    opponent: a Player, or None for uniformly random legal actions
+    first: whether the agent moves first
+    limit: turns (of both players) after which a game is truncated
+    """
+
+    def __init__(self, field: Field = None, opponent: Player = None, *,
+                 first=True, limit=Protocol.turn_limit, seed=None):
+        self.field = field or Field()
+        self.opponent = opponent
+        self.first = first
+        self.limit = limit
+        self.rng = np.random.default_rng(seed)
+        self.n_actions = n_actions(self.field)
+        self.me = 0 if first else 1
+        self.control = None
+        self.done = True
+
+    def reset(self, *, seed=None):
+        """start a game, return (observation, info)"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        placements = [_random_placement(self.field, self.rng), None]
+        if self.opponent is not None:
+            self.opponent.initialize(self.field)
+            placements[1] = {ship.type: ship.position
+                             for ship in self.opponent.ships.values()}
+        else:
+            placements[1] = _random_placement(self.field, self.rng)
+        if not self.first:
+            placements.reverse()
+        self.control = GameControl(self.field)
+        self.control.initialize(*placements)
+        self.observation = Observation(self.field,
+                                       self.control.observation(self.me))
+        self.turns = 0
+        self.done = False
+        if not self.first:
+            self.opponent_turn()
+        return self.obs(), self.info()
+
+    def step(self, action):
+        """play action and the reply of the opponent, return
+        (observation, reward, terminated, truncated, info)"""
+        if self.done:
+            raise RuntimeError('step() after the end of a game')
+        act = _act(*decode(self.field, action))
+        info = self.control.action_info(self.me, act)
+        self.observation.update(info[0], True)
+        if self.opponent is not None:
+            self.opponent.update(info[1], "waiting")
+        self.turns += 1
+        if "outcome" in info[0]:
+            return self.finish(1 if info[0]["outcome"] else -1)
+        if self.turns < self.limit:
+            outcome = self.opponent_turn()
+            if outcome is not None:
+                return self.finish(-1 if outcome else 1)
+        if self.turns >= self.limit:
+            self.done = True
+            return self.obs(), 0.0, False, True, self.info()
+        return self.obs(), 0.0, False, False, self.info()
+
+    def opponent_turn(self):
+        """play an action of the opponent, return its outcome if any"""
+        c = 1 - self.me
+        if self.opponent is not None:
+            act = self.opponent.action()
+        else:
+            actions = self.control.clients[c].legal_actions()
+            act = actions[self.rng.integers(len(actions))]
+        info = self.control.action_info(c, act)
+        self.observation.update(info[1], False)
+        if self.opponent is not None:
+            self.opponent.update(info[0], "your turn")
+        self.turns += 1
+        return info[0].get("outcome")
+
+    def finish(self, reward):
+        self.done = True
+        return self.obs(), float(reward), True, False, self.info()
+
+    def obs(self):
+        me, opponent, planes = self.observation.arrays()
+        return {'me': me, 'opponent': opponent, 'planes': planes}
+
+    def info(self):
+        return {'action_mask': self.action_mask(), 'turns': self.turns}
+
+    def action_mask(self):
+        """return boolean array of the legal actions of the agent"""
+        mask = np.zeros(self.n_actions, dtype=bool)
+        if self.control is None:
+            return mask
+        client = self.control.clients[self.me]
+        for to in client.legal_attacks():
+            mask[encode(self.field, ATTACK, 0, to)] = True
+        for ship_type, to in client.legal_moves():
+            mask[encode(self.field, MOVE, SHIP_TYPES.index(ship_type),
+                        to)] = True
+        return mask
+
+
+def legal_mask(game: BatchGame, p):
+    """return (N, n_actions) boolean array of legal actions of player p"""
+    w, h = game.grid.shape
+    x = np.arange(w)[:, None]
+    y = np.arange(h)[None, :]
+    alive = (game.hp[:, p] > 0)[..., None, None]
+    px = game.position[:, p, :, 0, None, None]
+    py = game.position[:, p, :, 1, None, None]
+    attack = ((np.abs(x - px) <= 1) & (np.abs(y - py) <= 1)
+              & alive).any(axis=1) & game.grid
+    occupied = ((x == px) & (y == py) & alive).any(axis=1)
+    move = ((x == px) != (y == py)) & alive & game.grid \
+        & ~occupied[:, None]
+    mask = np.concatenate([attack[:, None], move], axis=1)
+    return mask.transpose(0, 1, 3, 2).reshape(game.n, -1)
+
+
+class VectorEnv:
+    """num_envs games stepped together against random opponents
+
+    The agent moves first in every game.  step() takes an array of
+    num_envs actions and returns arrays; the observation of a game
+    finished by the step is that of the next game, which has already
+    started.  ``info['opponent_action']`` is the reply of the opponent
+    (-1 if none).
+    """
+
+    def __init__(self, field: Field = None, num_envs=1024, *,
+                 limit=Protocol.turn_limit, seed=None):
+        self.field = field or Field()
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+        self.n_actions = n_actions(self.field)
+        self.game = BatchGame.random(self.field, num_envs, self.rng,
+                                     limit=limit)
+        self.initial = np.zeros((len(PLANES), self.field.width,
+                                 self.field.height), dtype=np.uint8)
+        self.initial[PASSABLE] = passable_grid(self.field)
+        self.planes = np.broadcast_to(
+            self.initial, (num_envs, *self.initial.shape)).copy()
+
+    def reset(self, *, seed=None):
+        """restart all games, return (observation, info)"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.restart(np.ones(self.num_envs, dtype=bool))
+        return self.obs(), self.info()
+
+    def restart(self, games):
+        self.game.reset(games, self.rng)
+        self.planes[games] = self.initial
+
+    def step(self, actions):
+        """play actions of the agent and replies of the opponents, return
+        (observation, reward, terminated, truncated, info) of arrays"""
+        w, h = self.field.width, self.field.height
+        block, square = np.divmod(np.asarray(actions), w * h)
+        to = np.stack([square % w, square // w], axis=1)
+        kind = np.where(block == 0, ATTACK, MOVE)
+        self.record(kind, to, self.game.step(kind, block - 1, to), True)
+
+        mask = legal_mask(self.game, 1)
+        keys = self.rng.random(mask.shape)
+        keys[~mask] = -1
+        reply = keys.argmax(axis=1)
+        block, square = np.divmod(reply, w * h)
+        to = np.stack([square % w, square // w], axis=1)
+        kind = np.where(block == 0, ATTACK, MOVE)
+        result = self.game.step(kind, block - 1, to)
+        self.record(kind, to, result, False)
+
+        done = self.game.done
+        reward = np.where(self.game.winner == 0, 1.0,
+                          np.where(self.game.winner == 1, -1.0, 0.0))
+        reward = np.where(done, reward, 0.0).astype(np.float32)
+        terminated = done & (self.game.winner >= 0)
+        truncated = done & (self.game.winner < 0)
+        opponent_action = np.where(result['active'], reply, -1)
+        if done.any():
+            self.restart(done.copy())
+        info = self.info()
+        info['opponent_action'] = opponent_action
+        return self.obs(), reward, terminated, truncated, info
+
+    def record(self, kind, to, result, mine):
+        """add legal attacks in result to the planes"""
+        g = np.flatnonzero(result['active'] & result['legal']
+                           & (kind == ATTACK))
+        if mine:
+            plane = np.where(result['hit'][g] >= 0, HIT,
+                             np.where(result['near'][g].any(axis=1),
+                                      NEAR, MISSED))
+        else:
+            plane = np.full(len(g), ATTACKED)
+        x, y = to[g, 0], to[g, 1]
+        count = self.planes[g, plane, x, y]
+        self.planes[g, plane, x, y] = np.where(count < 255, count + 1, 255)
+
+    def obs(self):
+        hp = self.game.hp
+        alive = hp[:, 0] > 0
+        me = np.concatenate([hp[:, 0, :, None].astype(np.int16),
+                             np.where(alive[..., None],
+                                      self.game.position[:, 0], -1)],
+                            axis=2)
+        planes = self.planes.copy()
+        g, s = np.nonzero(alive)
+        position = self.game.position[g, 0, s]
+        planes[g, SHIPS, position[:, 0], position[:, 1]] = 1
+        return {'me': me, 'opponent': hp[:, 1].astype(np.uint8),
+                'planes': planes}
+
+    def info(self):
+        return {'action_mask': legal_mask(self.game, 0)}
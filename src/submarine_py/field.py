@@ -1,5 +1,25 @@
+import collections
 import json
-import tabulate
+import logging
+import operator
+import threading
+
+
+def coordinate(value):
+    """return value as int if integral, e.g., NumPy integers or 2.0
+
+    Raises TypeError or ValueError otherwise.
+
+    >>> coordinate(2.0), coordinate(3)
+    (2, 3)
+    """
+    if isinstance(value, bool):
+        raise TypeError('bool is not a coordinate')
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(f'{value} is not integral')
+        return int(value)
+    return operator.index(value)
 
 
 class Field:
@@ -15,6 +35,95 @@ class Field:
             [i, j] for i in range(self.w_size) for j in range(self.h_size)
             if [i, j] not in rock
         ]
+        # bitboard: square (x, y) is bit y * width + x
+        self.mask = 0
+        for x, y in self.positions:
+            self.mask |= 1 << (y * self.w_size + x)
+        self.attack_masks = [self._attack_mask(i)
+                             for i in range(self.w_size * self.h_size)]
+        rows = [((1 << self.w_size) - 1) << (y * self.w_size)
+                for y in range(self.h_size)]
+        columns = [sum(1 << (y * self.w_size + x) for y in range(self.h_size))
+                   for x in range(self.w_size)]
+        self.reach_masks = [
+            (rows[i // self.w_size] | columns[i % self.w_size]) & self.mask
+            for i in range(self.w_size * self.h_size)
+        ]
+
+    def _attack_mask(self, index):
+        x0, y0 = index % self.w_size, index // self.w_size
+        mask = 0
+        for y in range(max(0, y0 - 1), min(self.h_size, y0 + 2)):
+            for x in range(max(0, x0 - 1), min(self.w_size, x0 + 2)):
+                mask |= 1 << (y * self.w_size + x)
+        return mask & self.mask
+
+    def index(self, position):
+        """return bit index of a passable position, or -1
+
+        >>> field = Field(2, 3, [[0, 0]])
+        >>> field.index([2, 1]), field.index([0, 0]), field.index([3, 0])
+        (5, -1, -1)
+        """
+        try:
+            x, y = position
+            x, y = coordinate(x), coordinate(y)
+        except (TypeError, ValueError):
+            return -1
+        if not (0 <= x < self.w_size and 0 <= y < self.h_size):
+            return -1
+        index = y * self.w_size + x
+        return index if self.mask >> index & 1 else -1
+
+    def bit(self, position):
+        """return bitboard of a position, 0 if it is not passable
+
+        >>> Field(2, 3).bit([1, 1])
+        16
+        """
+        index = self.index(position)
+        return 1 << index if index >= 0 else 0
+
+    def position(self, index):
+        """inverse of index()
+
+        >>> Field(2, 3).position(5)
+        (2, 1)
+        """
+        return (index % self.w_size, index // self.w_size)
+
+    def attack_mask(self, position):
+        """return bitboard of passable squares within 1 square of position
+
+        A ship at position can attack these squares, and conversely
+        ships on these squares can attack position.
+
+        >>> field = Field(3, 3)
+        >>> field.attack_mask([0, 0]) == sum(
+        ...     field.bit(p) for p in [[0, 0], [1, 0], [0, 1], [1, 1]])
+        True
+        """
+        index = self.index(position)
+        return self.attack_masks[index] if index >= 0 else 0
+
+    def reach_mask(self, position):
+        """return bitboard of passable squares in the row and column
+
+        >>> field = Field(2, 3, [[2, 1]])
+        >>> field.squares_of(field.reach_mask([1, 1]))
+        [(1, 0), (0, 1), (1, 1)]
+        """
+        index = self.index(position)
+        return self.reach_masks[index] if index >= 0 else 0
+
+    def squares_of(self, mask):
+        """return positions of set bits in mask, in the order of bits"""
+        squares = []
+        while mask:
+            low = mask & -mask
+            squares.append(self.position(low.bit_length() - 1))
+            mask ^= low
+        return squares
 
     @property
     def width(self):
@@ -58,7 +167,7 @@ class Field:
         >>> field_with_rock_at_zerozero.passable([0, 0])
         False
         """
-        return position in self.positions
+        return self.index(position) >= 0
 
     def to_ascii(self):
         '''return ascii representation for handy printing
@@ -142,6 +251,7 @@ class Reporter:
         for type, ship in fleets.items():
             x, y = ship['position']
             table[y][x] += f'{type}{ship["hp"]}'
+        import tabulate
         header = range(field.width)
         view = tabulate.tabulate(
             table, header, tablefmt="simple_grid", showindex="always",
@@ -150,11 +260,16 @@ class Reporter:
         return view
 
     def report_field(field, result, c):
-        results = [json.loads(result[0]), json.loads(result[1])]
+        """print fields of both players side by side
+
+        result は通知する JSON 文字列，あるいは連想配列の組である．
+        """
+        results = [json.loads(r) if isinstance(r, str) else r
+                   for r in result]
         fleets = [results[c]["observation"]["me"],
                   results[1-c]["observation"]["me"]]
         attacked = None
-        if "result" in result[1] and "attacked" in results[1]["result"]:
+        if "result" in results[1] and "attacked" in results[1]["result"]:
             attacked = results[1]["result"]["attacked"]["position"]
         views = [
             Reporter.make_view(field, fleets[0], (c == 1) and attacked),
@@ -163,3 +278,64 @@ class Reporter:
         lines = [_.split('\n') for _ in views]
         for left, right in zip(*lines):
             print(left, right)
+
+
+class ReportObserver:
+    """Reporter.report_field in a background thread
+
+    report_field() only appends the result to a bounded deque, so that
+    rendering does not delay the game.  When the deque is full, the
+    oldest frame is dropped to show the latest state.  The thread waits
+    interval seconds after each frame, so that it leaves the CPU to the
+    game when the game runs faster than the terminal can follow.
+
+    >>> observer = ReportObserver()
+    >>> observer.close()
+    0
+    """
+
+    def __init__(self, maxsize=4, interval=0.02):
+        self.frames = collections.deque(maxlen=maxsize)
+        self.interval = interval
+        self.received = 0
+        self.rendered = 0
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def report_field(self, field, result, c):
+        """same as Reporter.report_field; result must not be modified later"""
+        self.frames.append((field, result, c))
+        self.received += 1
+
+    def _run(self):
+        while True:
+            try:
+                item = self.frames.popleft()
+            except IndexError:
+                if self.closed.is_set():
+                    return
+                self.closed.wait(self.interval)
+                continue
+            if self.closed.is_set() and self.frames:
+                continue        # only the last frame after close()
+            try:
+                Reporter.report_field(*item)
+            except Exception as e:
+                logging.error(f'report failed {e}')
+            self.rendered += 1
+            self.closed.wait(self.interval)
+
+    @property
+    def dropped(self):
+        """number of frames not rendered"""
+        return self.received - self.rendered
+
+    def close(self):
+        """render the last frame and stop, to return number of dropped
+        frames"""
+        self.closed.set()
+        self.thread.join()
+        if self.dropped:
+            logging.info(f'{self.dropped} frames dropped in report')
+        return self.dropped
@@ -0,0 +1,60 @@
+class Fleet:
+    """Ships of one player on a field, shared by Player and Client.
+
+    Subclasses hold self.field, self.ships (dict of Ship by type) and
+    call fleet_changed() whenever a ship moves or sinks.  Legal actions
+    are computed from the bitboards of Field and cached until then.
+    """
+
+    def fleet_changed(self):
+        """recompute self.occupancy and drop cached legal actions"""
+        self.occupancy = 0
+        for ship in self.ships.values():
+            self.occupancy |= self.field.bit(ship.position)
+        self._area = None
+        self._attacks = self._moves = self._actions = None
+
+    def attack_area(self):
+        """return bitboard of squares that the fleet can attack"""
+        if self._area is None:
+            self._area = 0
+            for ship in self.ships.values():
+                self._area |= self.field.attack_mask(ship.position)
+        return self._area
+
+    def legal_attacks(self):
+        """return list of squares that the fleet can attack
+
+        The list is cached and must not be modified.
+        """
+        if self._attacks is None:
+            self._attacks = self.field.squares_of(self.attack_area())
+        return self._attacks
+
+    def legal_moves(self):
+        """return list of (ship type, square) that the fleet can move to
+
+        The list is cached and must not be modified.
+        """
+        if self._moves is None:
+            free = ~self.occupancy
+            self._moves = [
+                (ship.type, to) for ship in self.ships.values()
+                for to in self.field.squares_of(
+                        self.field.reach_mask(ship.position) & free)
+            ]
+        return self._moves
+
+    def legal_actions(self):
+        """return list of all legal actions in the format sent to server
+
+        The list is cached and must not be modified.
+        """
+        if self._actions is None:
+            self._actions = [
+                {"attack": {"to": to}} for to in self.legal_attacks()
+            ] + [
+                {"move": {"ship": ship_type, "to": to}}
+                for ship_type, to in self.legal_moves()
+            ]
+        return self._actions
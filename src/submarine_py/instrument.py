@@ -0,0 +1,123 @@
+"""Latency histograms of the phases of the server game loop.
+
+:class:`Timings` collects the seconds spent in named phases, e.g. the
+thinking time of each player, the engine, the serialization of results
+and the writes to sockets.  Each phase is a :class:`Histogram` with
+buckets of powers of two nanoseconds, so that adding a sample costs a
+few integer operations and the memory does not grow with the samples.
+
+>>> timings = Timings()
+>>> for us in [1, 2, 3, 100]:
+...     timings.add('engine', us * 1e-6)
+>>> engine = timings['engine']
+>>> engine.count, round(engine.total * 1e6)
+(4, 106)
+>>> engine.quantile(0.5) < 4e-6 < engine.quantile(0.99)
+True
+"""
+import math
+
+PHASES = ('think1', 'think2', 'engine', 'serialize', 'send', 'record',
+          'report')                #: phases recorded by server.play_game
+
+
+class Histogram:
+    """counts of samples in buckets [2**(i-1), 2**i) nanoseconds"""
+
+    __slots__ = ('buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.buckets[min(int(seconds * 1e9).bit_length(), 63)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float):
+        """return the upper bound in seconds of the bucket holding the
+        q-quantile, capped by the maximum sample"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i * 1e-9, self.max)
+        return self.max
+
+    def to_dict(self):
+        """return a dict to be dumped as JSON, buckets by their index"""
+        return {
+            'count': self.count,
+            'total': round(self.total, 9),
+            'min': round(self.min, 9) if self.count else None,
+            'max': round(self.max, 9),
+            'buckets': {str(i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Timings:
+    """histograms by name of phase"""
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, phase: str, seconds: float):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram()
+        histogram.add(seconds)
+
+    def __getitem__(self, phase):
+        return self.phases[phase]
+
+    def merge(self, other):
+        for phase, histogram in other.phases.items():
+            self.phases.setdefault(phase, Histogram()).merge(histogram)
+
+    def to_dict(self):
+        return {phase: h.to_dict() for phase, h in self.phases.items()}
+
+    def summary(self) -> str:
+        """return a table of the phases in milliseconds
+
+        >>> timings = Timings()
+        >>> timings.add('send', 0.002)
+        >>> print(timings.summary())
+        phase       count  total[s]   mean[ms]    p50    p90    p99    max
+        send            1     0.002      2.000  2.000  2.000  2.000  2.000
+        """
+        lines = [f'{"phase":10} {"count":>6} {"total[s]":>9} '
+                 f'{"mean[ms]":>10} {"p50":>6} {"p90":>6} {"p99":>6} '
+                 f'{"max":>6}']
+        order = [p for p in PHASES if p in self.phases] \
+            + sorted(p for p in self.phases if p not in PHASES)
+        for phase in order:
+            h = self.phases[phase]
+            ms = [h.quantile(q) * 1e3 for q in (0.5, 0.9, 0.99)]
+            lines.append(
+                f'{phase:10} {h.count:6} {h.total:9.3f} {h.mean * 1e3:10.3f}'
+                + ''.join(f' {v:6.3f}' for v in ms + [h.max * 1e3]))
+        return '\n'.join(lines)
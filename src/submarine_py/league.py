@@ -0,0 +1,424 @@
+"""League of many players with Elo and Glicko ratings.
+
+Players are registered by label and import path (see
+:mod:`submarine_py.tournament`).  Pairings are scheduled round-robin or
+Swiss, the first mover alternates within each pairing, and games run in
+a pool of processes.  A pairing stops early once the Wilson score
+interval of its result excludes an even score.
+
+    $ python -m submarine_py.league --path sample --games 200 \\
+          random=random_player:RandomPlayer \\
+          original=original_player:OriginalPlayer
+"""
+from .field import Field
+from .tournament import FIELDS, _init_worker, aborted, error_result, \
+    play_one
+import concurrent.futures
+import contextlib
+import csv
+import itertools
+import logging
+import math
+import os
+import sys
+
+
+def wilson_interval(score: float, n: int, z=1.96):
+    """return the Wilson score interval of a score (wins + draws/2) in n games
+
+    >>> [round(v, 3) for v in wilson_interval(8, 10)]
+    [0.49, 0.943]
+    >>> wilson_interval(0, 0)
+    (0.0, 1.0)
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    center = (p + z*z / (2*n)) / (1 + z*z / n)
+    half = z * math.sqrt(p*(1-p)/n + z*z/(4*n*n)) / (1 + z*z / n)
+    return center - half, center + half
+
+
+class Elo:
+    """Elo ratings updated after each game"""
+
+    def __init__(self, k=16, initial=1500.0):
+        self.k = k
+        self.initial = initial
+        self.ratings = {}
+
+    def __getitem__(self, name):
+        return self.ratings.get(name, self.initial)
+
+    def expected(self, a, b):
+        """expected score of a against b"""
+        return 1 / (1 + 10 ** ((self[b] - self[a]) / 400))
+
+    def update(self, a, b, score):
+        """record a game between a and b where a scored score (1, 0.5, 0)
+
+        >>> elo = Elo()
+        >>> elo.update('a', 'b', 1)
+        >>> elo['a'], elo['b']
+        (1508.0, 1492.0)
+        """
+        delta = self.k * (score - self.expected(a, b))
+        self.ratings[a] = self[a] + delta
+        self.ratings[b] = self[b] - delta
+
+
+class Rating:
+    """Glicko rating with its deviation"""
+
+    __slots__ = ('r', 'rd')
+
+    def __init__(self, r=1500.0, rd=350.0):
+        self.r = r
+        self.rd = rd
+
+    def __repr__(self):
+        return f'Rating({self.r:.1f}, {self.rd:.1f})'
+
+    def interval(self, z=1.96):
+        """return the confidence interval of the rating"""
+        return self.r - z * self.rd, self.r + z * self.rd
+
+
+class Glicko:
+    """Glicko-1 ratings, each game being a rating period of its own
+
+    c: growth of the deviation per rating period, to follow players
+    whose strength changes
+    """
+    Q = math.log(10) / 400
+
+    def __init__(self, c=0.0, initial_rd=350.0):
+        self.c = c
+        self.initial_rd = initial_rd
+        self.ratings = {}
+
+    def __getitem__(self, name):
+        if name not in self.ratings:
+            self.ratings[name] = Rating(rd=self.initial_rd)
+        return self.ratings[name]
+
+    @staticmethod
+    def g(rd):
+        return 1 / math.sqrt(1 + 3 * (Glicko.Q * rd / math.pi) ** 2)
+
+    @staticmethod
+    def expected(rating: Rating, opponent: Rating):
+        """expected score of rating against opponent"""
+        g = Glicko.g(opponent.rd)
+        return 1 / (1 + 10 ** (-g * (rating.r - opponent.r) / 400))
+
+    @staticmethod
+    def rate(rating: Rating, results):
+        """return the new rating after results [(opponent, score), ...]
+
+        The example from Glickman's paper:
+
+        >>> Glicko.rate(Rating(1500, 200), [(Rating(1400, 30), 1),
+        ...     (Rating(1550, 100), 0), (Rating(1700, 300), 0)])
+        Rating(1464.1, 151.4)
+        """
+        if not results:
+            return Rating(rating.r, rating.rd)
+        q = Glicko.Q
+        d2_inv = 0.0
+        total = 0.0
+        for opponent, score in results:
+            g = Glicko.g(opponent.rd)
+            e = Glicko.expected(rating, opponent)
+            d2_inv += q * q * g * g * e * (1 - e)
+            total += g * (score - e)
+        denom = 1 / rating.rd ** 2 + d2_inv
+        return Rating(rating.r + q / denom * total, math.sqrt(1 / denom))
+
+    def update(self, a, b, score):
+        """record a game between a and b where a scored score (1, 0.5, 0)"""
+        ra, rb = self[a], self[b]
+        if self.c:
+            for r in (ra, rb):
+                r.rd = min(math.hypot(r.rd, self.c), self.initial_rd)
+        self.ratings[a] = Glicko.rate(ra, [(rb, score)])
+        self.ratings[b] = Glicko.rate(rb, [(ra, 1 - score)])
+
+
+class Pairing:
+    """games between players a and b, a moving first in even games"""
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+        self.wins = 0           # of a
+        self.losses = 0
+        self.draws = 0
+        self.aborted = 0        # games of errors or timeouts, not scored
+        self.submitted = 0
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.draws
+
+    @property
+    def score(self):
+        """score of a"""
+        return self.wins + self.draws / 2
+
+    def settled(self, min_games, z=1.96):
+        """whether the interval of the score of a excludes 0.5"""
+        if self.games < min_games:
+            return False
+        low, high = wilson_interval(self.score, self.games, z)
+        return high < 0.5 or 0.5 < low
+
+    def next_order(self):
+        """return (first, second) of the next game"""
+        order = (self.a, self.b) if self.submitted % 2 == 0 else \
+            (self.b, self.a)
+        self.submitted += 1
+        return order
+
+
+def round_robin(names):
+    """return all pairings of names
+
+    >>> round_robin(['a', 'b', 'c'])
+    [('a', 'b'), ('a', 'c'), ('b', 'c')]
+    """
+    return list(itertools.combinations(names, 2))
+
+
+def swiss(names, ratings: Glicko, played=()):
+    """return pairings of players adjacent in the rating order
+
+    A player meets the nearest one not yet met if any.  With an odd
+    number of players, the lowest rated one sits out.
+
+    >>> swiss(['a', 'b', 'c', 'd'], Glicko(), {('a', 'b')})
+    [('a', 'c'), ('b', 'd')]
+    """
+    order = sorted(names, key=lambda n: -ratings[n].r)
+    pairs = []
+    while len(order) >= 2:
+        a = order.pop(0)
+        b = next((b for b in order
+                  if (a, b) not in played and (b, a) not in played),
+                 order[0])
+        order.remove(b)
+        pairs.append((a, b))
+    return pairs
+
+
+class League:
+    """players: dict of label -> import path of a Player subclass
+
+    games: maximum number of games in a pairing over all rounds
+    min_games: number of games before a pairing may stop early
+    """
+
+    def __init__(self, players: dict, field: Field, *, games=100,
+                 min_games=10, z=1.96, workers=None, paths=(),
+                 output=None):
+        assert len(players) >= 2
+        self.players = dict(players)
+        self.field = field
+        self.games = games
+        self.min_games = min_games
+        self.z = z
+        self.workers = workers or os.cpu_count()
+        self.paths = list(paths)
+        self.output = output
+        self.elo = Elo()
+        self.glicko = Glicko()
+        self.pairings = {}      # (a, b) -> Pairing
+        self.results = []
+
+    def run(self, schedule='round-robin', rounds=1):
+        """play the league and return standings()
+
+        schedule: 'round-robin' plays every pairing in each round,
+        'swiss' pairs players of close ratings in each round
+        """
+        writer = None
+        with contextlib.ExitStack() as stack:
+            if self.output:
+                f = stack.enter_context(open(self.output, 'w', newline=''))
+                writer = csv.DictWriter(f, FIELDS)
+                writer.writeheader()
+            pool = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    self.workers, initializer=_init_worker,
+                    initargs=(self.paths,)))
+            for r in range(rounds):
+                if schedule == 'round-robin':
+                    pairs = round_robin(list(self.players))
+                elif schedule == 'swiss':
+                    pairs = swiss(list(self.players), self.glicko,
+                                  self.pairings)
+                else:
+                    raise ValueError(f'unknown schedule {schedule}')
+                logging.info(f'round {r}: {pairs}')
+                self.play_round(pool, pairs, writer)
+        return self.standings()
+
+    def play_round(self, pool, pairs, writer=None):
+        """play pairs in parallel until each is settled or has played
+        the maximum number of games"""
+        pending = [self.pairing(a, b) for a, b in pairs]
+        running = {}            # future -> (pairing, first)
+        while pending or running:
+            # keep the pool busy, taking pairings in turn
+            while pending and len(running) < 2 * self.workers:
+                pairing = pending.pop(0)
+                if pairing.submitted >= self.games or \
+                        pairing.settled(self.min_games, self.z):
+                    continue
+                first, second = pairing.next_order()
+                future = pool.submit(
+                    play_one, len(self.results) + len(running),
+                    [self.players[first], self.players[second]],
+                    self.field.to_json())
+                running[future] = (pairing, first, second)
+                pending.append(pairing)
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                pairing, first, second = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    logging.exception(f'game between {first} and {second}:'
+                                      ' error')
+                    result = error_result(0, [first, second])
+                result.update(game=len(self.results), first=first,
+                              second=second)
+                self.record(pairing, result)
+                if writer:
+                    writer.writerow(result)
+
+    def pairing(self, a, b):
+        """return the Pairing of a and b in either order"""
+        if (b, a) in self.pairings:
+            return self.pairings[b, a]
+        return self.pairings.setdefault((a, b), Pairing(a, b))
+
+    def record(self, pairing: Pairing, result):
+        """update pairing and ratings with a result of play_one()
+
+        Aborted games (errors or timeouts) are counted in the pairing but
+        do not change its score nor the ratings.
+        """
+        self.results.append(result)
+        if aborted(result):
+            pairing.aborted += 1
+            return
+        winner = [result['first'], result['second'], None][result['winner']]
+        if winner is None:
+            pairing.draws += 1
+            score = 0.5
+        elif winner == pairing.a:
+            pairing.wins += 1
+            score = 1
+        else:
+            pairing.losses += 1
+            score = 0
+        self.elo.update(pairing.a, pairing.b, score)
+        self.glicko.update(pairing.a, pairing.b, score)
+
+    def standings(self):
+        """return list of dicts of players in the order of Glicko rating"""
+        table = []
+        for name in self.players:
+            rating = self.glicko[name]
+            low, high = rating.interval(self.z)
+            games = sum(p.games for p in self.pairings.values()
+                        if name in (p.a, p.b))
+            score = sum(p.score if name == p.a else p.games - p.score
+                        for p in self.pairings.values()
+                        if name in (p.a, p.b))
+            table.append({
+                'name': name, 'rating': round(rating.r, 1),
+                'rd': round(rating.rd, 1),
+                'low': round(low, 1), 'high': round(high, 1),
+                'elo': round(self.elo[name], 1),
+                'games': games, 'score': score,
+            })
+        table.sort(key=lambda row: -row['rating'])
+        return table
+
+
+def parse_players(args):
+    """return dict of label -> spec from 'label=spec' or 'spec'
+
+    >>> parse_players(['a=m:A', 'm:B'])
+    {'a': 'm:A', 'm:B': 'm:B'}
+    """
+    players = {}
+    for arg in args:
+        label, _, spec = arg.rpartition('=')
+        players[label or spec] = spec
+    return players
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="run a league between players in parallel",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "players", nargs='+',
+        help="players as label=module:Class or module:Class",
+    )
+    parser.add_argument(
+        "--schedule", choices=['round-robin', 'swiss'],
+        default='round-robin',
+        help="how to pair players",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=1,
+        help="number of rounds",
+    )
+    parser.add_argument(
+        "--games", type=int, default=100,
+        help="maximum number of games of a pairing",
+    )
+    parser.add_argument(
+        "--min-games", type=int, default=10,
+        help="number of games before a pairing may stop early",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of processes",
+    )
+    parser.add_argument(
+        "--output", default='league.csv',
+        help="CSV file to write the result of each game",
+    )
+    parser.add_argument(
+        "--path", action='append', default=[],
+        help="directory to search players, e.g., sample",
+    )
+    parser.add_argument(
+        "--field-width", type=int, default=5,
+        help="width of field",
+    )
+    parser.add_argument(
+        "--field-height", type=int, default=5,
+        help="height of field",
+    )
+    args = parser.parse_args()
+    FORMAT = '%(asctime)s %(levelname)s %(message)s'
+    logging.basicConfig(format=FORMAT, level=logging.INFO, force=True)
+    sys.path[:0] = args.path
+    league = League(
+        parse_players(args.players),
+        Field(args.field_height, args.field_width), games=args.games,
+        min_games=args.min_games, workers=args.workers, paths=args.path,
+        output=args.output)
+    for row in league.run(args.schedule, args.rounds):
+        print(f'{row["name"]}: {row["rating"]} '
+              f'[{row["low"]}, {row["high"]}] elo {row["elo"]} '
+              f'score {row["score"]}/{row["games"]}')
@@ -0,0 +1,295 @@
+"""Information set Monte Carlo tree search (ISMCTS) player.
+
+Each iteration samples a determinization of the opponent fleet from a
+:class:`submarine_py.belief.JointBelief`, and descends a single tree
+shared by all determinizations (single observer ISMCTS): a child is
+selected by UCB among the actions legal in the determinization, with
+the number of times it was available in place of the visits of its
+parent.  Games are simulated on copies of :class:`Client` and finished
+by random playouts of a limited depth.
+
+The search stops at a wall-clock budget per action, so that the
+strength grows with the time given.  With workers > 1, independent
+searches run in a :class:`submarine_py.parallel.RootParallel` pool and
+their visits at the root are summed::
+
+    $ python -m submarine_py.tournament --path sample \\
+          submarine_py.mcts:MCTSPlayer random_player:RandomPlayer
+"""
+from .belief import JointBelief, SHIP_TYPES
+from .field import Field
+from .player_base import Player
+from .server import Client
+from .ship import Ship
+from .transposition import fleet_hash
+import json
+import logging
+import math
+import random
+import time
+import numpy as np
+
+
+class Node:
+    """node of the search tree reached by action of player"""
+
+    __slots__ = ('action', 'player', 'children', 'visits', 'total',
+                 'available')
+
+    def __init__(self, action=None, player=1):
+        self.action = action
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.total = 0.0        #: sum of rewards of player
+        self.available = 0      #: times selectable in determinizations
+
+    def select(self, actions, exploration):
+        """return the child of actions with the highest UCB"""
+        best, best_value = None, -math.inf
+        for action in actions:
+            child = self.children[action]
+            child.available += 1
+            value = child.total / child.visits + exploration * math.sqrt(
+                math.log(child.available) / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+
+def legal_actions(client):
+    """return keys (ship type or None for attacks, square) of actions"""
+    return [(None, to) for to in client.legal_attacks()] \
+        + client.legal_moves()
+
+
+def apply(clients, c, action):
+    """apply action of player c to clients, return whether c has won"""
+    ship_type, to = action
+    if ship_type is None:
+        clients[1 - c].attacked(to)
+        return not clients[1 - c].ships
+    clients[c].move(ship_type, to)
+    return False
+
+
+def evaluate(clients):
+    """return the value in [0, 1] of an unfinished game for player 0"""
+    def strength(client):
+        return sum(ship.hp for ship in client.ships.values()) / TOTAL_HP
+    return 0.5 + (strength(clients[0]) - strength(clients[1])) / 2
+
+
+TOTAL_HP = sum(Ship.MAX_HPS.values())
+
+
+class MCTSPlayer(Player):
+    """ISMCTS player thinking for budget seconds per action
+
+    iterations: maximum number of iterations per action (optional)
+    depth: plies of a playout before the game is evaluated
+    exploration: constant of UCB
+    workers: number of processes searching in parallel
+    tablebase: directory of tables of submarine_py.tablebase, probed
+        instead of a playout when both fleets are small enough
+
+    If the server reports a game clock, at most 1/20 of the remaining
+    time is used for an action.  With workers > 1, close() (or a with
+    statement) stops the processes.
+    """
+
+    def __init__(self, budget=0.1, *, iterations=None, depth=20,
+                 exploration=0.7, seed=0, workers=1, tablebase=None):
+        super().__init__()
+        self.budget = budget
+        self.iterations = iterations
+        self.depth = depth
+        self.exploration = exploration
+        self.rng = random.Random(seed or None)
+        self.belief = None
+        self.searched = 0       #: iterations of the last search
+        self.tablebase_dir = tablebase
+        self.tablebase = None
+        self.parallel = None
+        if workers > 1:
+            from .parallel import RootParallel
+            self.parallel = RootParallel(workers)
+
+    def name(self):
+        return 'mcts-player'
+
+    def close(self):
+        """stop the pool of workers, if any"""
+        if self.parallel is not None:
+            self.parallel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def initialize(self, field):
+        super().initialize(field)
+        rng = np.random.default_rng(self.rng.getrandbits(32))
+        self.belief = JointBelief(field, samples=5000, rng=rng)
+        self.open_tablebase()
+
+    def open_tablebase(self):
+        if self.tablebase_dir is None:
+            return
+        from .tablebase import Tablebase
+        tablebase = Tablebase(self.tablebase_dir)
+        if tablebase.field.to_json() != self.field.to_json():
+            logging.warning('tablebase is for another field, not used')
+            return
+        self.tablebase = tablebase
+
+    def place_ship(self):
+        '''ships far from each other, so that "near" tells less'''
+        def spread(squares):
+            return min(max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+                       for i, a in enumerate(squares) for b in squares[i+1:])
+        candidates = [self.rng.sample(self.field.squares, len(SHIP_TYPES))
+                      for _ in range(20)]
+        best = max(candidates, key=spread)
+        return {t: list(p) for t, p in zip(SHIP_TYPES, best)}
+
+    def update(self, json_, info):
+        super().update(json_, info)
+        self.belief.update(self.last_msg, info == "your turn")
+
+    def time_limit(self):
+        """return seconds available for an action"""
+        clock = (self.last_msg or {}).get("clock")
+        if clock and clock.get("me") is not None:
+            return min(self.budget, clock["me"] / 20)
+        return self.budget
+
+    def determinize(self, me):
+        """return [own client, sampled opponent client]"""
+        positions = self.belief.sample(1)[0]
+        opponent = Client(self.field, {
+            t: tuple(positions[s].tolist())
+            for s, t in enumerate(SHIP_TYPES) if self.belief.hp[s] > 0})
+        for s, t in enumerate(SHIP_TYPES):
+            if t in opponent.ships:
+                opponent.ships[t].hp = int(self.belief.hp[s])
+        opponent.hash = fleet_hash(self.field, opponent.ships.values())
+        return [me.copy(), opponent]
+
+    def own_client(self):
+        me = Client(self.field, {t: s.position for t, s in self.ships.items()})
+        for t, ship in self.ships.items():
+            me.ships[t].hp = ship.hp
+        me.hash = fleet_hash(self.field, me.ships.values())
+        return me
+
+    def root_visits(self, time_limit):
+        """search for time_limit seconds to return dict of visits of the
+        actions at the root"""
+        deadline = time.perf_counter() + time_limit
+        me = self.own_client()
+        root = Node()
+        self.searched = 0
+        while time.perf_counter() < deadline and (
+                self.iterations is None or self.searched < self.iterations):
+            self.iterate(root, self.determinize(me))
+            self.searched += 1
+        return {a: child.visits for a, child in root.children.items()}
+
+    def search(self):
+        """return the most visited action at the root"""
+        if self.parallel:
+            fleet = {t: (s.position, s.hp) for t, s in self.ships.items()}
+            params = dict(iterations=self.iterations, depth=self.depth,
+                          exploration=self.exploration,
+                          tablebase=self.tablebase_dir)
+            visits = self.parallel.search(
+                search_root,
+                {'positions': self.belief.positions, 'hp': self.belief.hp},
+                (self.field.to_json(), fleet, self.time_limit(), params))
+        else:
+            visits = self.root_visits(self.time_limit())
+        actions = legal_actions(self.own_client())
+        visited = [a for a in actions if a in visits]
+        if not visited:
+            return self.rng.choice(actions)
+        return max(visited, key=visits.get)
+
+    def iterate(self, root, clients):
+        node, c = root, 0
+        path = [root]
+        winner = None
+        while winner is None:
+            actions = legal_actions(clients[c])
+            untried = [a for a in actions if a not in node.children]
+            if untried:
+                action = self.rng.choice(untried)
+                child = node.children[action] = Node(action, c)
+                child.available = 1
+            else:
+                child = node.select(actions, self.exploration)
+                action = child.action
+            if apply(clients, c, action):
+                winner = c
+            node = child
+            path.append(node)
+            c = 1 - c
+            if untried:
+                break
+        value = float(1 - winner) if winner is not None \
+            else self.leaf_value(clients, c)
+        for node in path:
+            node.visits += 1
+            node.total += value if node.player == 0 else 1 - value
+
+    def leaf_value(self, clients, c):
+        """return the value for player 0 of clients with player c to move,
+        from the tablebase if available, otherwise by a playout"""
+        if self.tablebase is not None:
+            value = self.tablebase.probe_clients(clients, c)
+            if value is not None:
+                won = 0.5 if value == 0 else float(value > 0)
+                return won if c == 0 else 1 - won
+        return self.playout(clients, c)
+
+    def playout(self, clients, c):
+        """play random actions (mostly attacks) from clients with player c
+        to move, return the value for player 0"""
+        for _ in range(self.depth):
+            client = clients[c]
+            if self.rng.random() < 0.8 or not client.legal_moves():
+                action = (None, self.rng.choice(client.legal_attacks()))
+            else:
+                action = self.rng.choice(client.legal_moves())
+            if apply(clients, c, action):
+                return float(1 - c)
+            c = 1 - c
+        return evaluate(clients)
+
+    def action(self):
+        ship_type, to = self.search()
+        if ship_type is None:
+            return json.dumps(self.attack(list(to)))
+        return json.dumps(self.move(ship_type, list(to)))
+
+
+def search_root(arrays, field_json, fleet, time_limit, params, *, seed):
+    """root_visits() of MCTSPlayer in a worker of RootParallel
+
+    arrays: 'positions' and 'hp' of JointBelief
+    fleet: dict of ship type -> (position, hp) of the player
+    """
+    # leave time to send the result back
+    time_limit = max(time_limit - 0.005, 0.0)
+    player = MCTSPlayer(time_limit, seed=seed, **params)
+    player.field = Field.from_json(field_json)
+    player.ships = {t: Ship(t, position, hp)
+                    for t, (position, hp) in fleet.items()}
+    player.fleet_changed()
+    player.open_tablebase()
+    player.belief = JointBelief.from_hypotheses(
+        player.field, arrays['positions'], arrays['hp'],
+        rng=np.random.default_rng(seed))
+    return player.root_visits(time_limit)
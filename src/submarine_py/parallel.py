@@ -0,0 +1,113 @@
+"""Root-parallel search over a pool of processes.
+
+Each worker runs an independent search from the same state, and the
+visit counts of the actions at the root are summed::
+
+    parallel = RootParallel(workers=4)
+    visits = parallel.search(search_root, {'positions': array}, args)
+    action = max(visits, key=visits.get)
+
+The search function is called in a worker as
+``fn(arrays, *args, seed=seed)`` and returns a dict of action -> visits.
+NumPy arrays of the state (e.g. hypotheses of a belief) are passed
+through shared memory, written once and read by all workers without
+pickling; other arguments are pickled as usual.
+"""
+from multiprocessing import shared_memory
+import collections
+import concurrent.futures
+import os
+import numpy as np
+
+
+class SharedArrays:
+    """copy of dict of arrays in a shared memory block"""
+
+    def __init__(self, arrays):
+        self.spec = []          #: (key, dtype, shape, offset)
+        offset = 0
+        for key, array in arrays.items():
+            array = np.asarray(array)
+            self.spec.append((key, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // 8) * 8
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=max(offset, 1))
+        try:
+            for (key, dtype, shape, start), array in zip(self.spec,
+                                                         arrays.values()):
+                _view(self.memory, dtype, shape, start)[...] = array
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _view(memory, dtype, shape, offset):
+    return np.ndarray(shape, dtype, memory.buf, offset)
+
+
+def _run(fn, name, spec, args, seed):
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        arrays = {key: _view(memory, dtype, shape, offset)
+                  for key, dtype, shape, offset in spec}
+        visits = fn(arrays, *args, seed=seed)
+        del arrays
+        return visits
+    finally:
+        memory.close()
+
+
+class RootParallel:
+    """pool of workers running searches from the same root
+
+    The pool is started at the first search and kept for later ones.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.seed = np.random.SeedSequence()
+
+    def search(self, fn, arrays, args=(), *, searches=None):
+        """run searches (default: one per worker) of fn to return the
+        sum of their visit counts as a Counter
+
+        fn must be picklable, i.e., a function defined at the top level
+        of a module.
+        """
+        if self.pool is None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        seeds = [int(s.generate_state(1)[0])
+                 for s in self.seed.spawn(searches or self.workers)]
+        visits = collections.Counter()
+        with SharedArrays(arrays) as shared:
+            futures = [self.pool.submit(_run, fn, shared.name, shared.spec,
+                                        args, seed) for seed in seeds]
+            for future in futures:
+                visits.update(future.result())
+        return visits
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
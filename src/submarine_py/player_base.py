@@ -1,12 +1,15 @@
 from .ship import Ship
+from .fleet import Fleet
 from .field import Field
 from .protocol import Protocol
+from . import codec
+from . import binary
 import json
 import abc
 import logging
 
 
-class Player(abc.ABC):
+class Player(Fleet, abc.ABC):
     """プレイヤーを表すクラスである．艦を複数保持している．
 
     Typical sequence:
@@ -26,6 +29,7 @@ class Player(abc.ABC):
         self.field = None
         self.ships = {}
         self.last_msg = None
+        self.fleet_changed()
 
     def initialize(self, field: Field):
         '''
@@ -38,6 +42,7 @@ class Player(abc.ABC):
         logging.debug(f'place ships at {positions}')
         self.ships = {ship_type: Ship(ship_type, position)
                       for ship_type, position in positions.items()}
+        self.fleet_changed()
 
     def ships_to_json(self):
         '''船の状態をJSONで返す．'''
@@ -71,20 +76,32 @@ class Player(abc.ABC):
         pass
 
     def update(self, json_, info):
-        '''通知された情報で艦の状態を更新する．'''
-        self.last_msg = json.loads(json_)
+        '''通知された情報で艦の状態を更新する．
+
+        json_ は JSON 文字列，あるいは解析済みの連想配列 (読み取り専用) である．
+        '''
+        self.last_msg = codec.loads(json_) if isinstance(json_, str) else json_
         status = self.last_msg['observation']['me']
+        changed = False
         for ship_type in list(self.ships):
             if ship_type not in status:
                 self.ships.pop(ship_type)
+                changed = True
             else:
-                self.ships[ship_type].hp = status[ship_type]['hp']
-                self.ships[ship_type].position = status[ship_type]['position']
+                ship = self.ships[ship_type]
+                ship.hp = status[ship_type]['hp']
+                x, y = status[ship_type]['position']
+                if ship.position[0] != x or ship.position[1] != y:
+                    ship.position = (x, y)
+                    changed = True
+        if changed:
+            self.fleet_changed()
 
     def move(self, ship_type, to):
         '''移動の処理を行い，連想配列で結果を返す．'''
         ship = self.ships[ship_type]
         ship.move_to(to)
+        self.fleet_changed()
         return {
             "move": {
                 "ship": ship_type,
@@ -102,8 +119,7 @@ class Player(abc.ABC):
 
     def in_attack_range(self, to):
         '''艦隊の攻撃可能な範囲か判定を返す．'''
-        return self.in_field(to)\
-            and any([ship.in_attack_range(to) for ship in self.ships.values()])
+        return bool(self.field.bit(to) & self.attack_area())
 
     def in_field(self, position):
         '''与えられた座標がフィールドないかどうかを返す．'''
@@ -114,62 +130,176 @@ class Player(abc.ABC):
 
     def overlap(self, position):
         '''与えられた座標にいる艦を返す．'''
+        bit = self.field.bit(position)
+        if not bit & self.occupancy:
+            return None
         for ship in self.ships.values():
-            if ship.position == position:
+            if self.field.bit(ship.position) == bit:
                 return ship
         return None
 
 
-def play_game(host: str, port: int, player: Player):
-    """仕様に従ってサーバとソケット通信を行う．"""
+def play_game(host: str, port: int, player: Player, *, games=1,
+              binary=False):
+    """仕様に従ってサーバとソケット通信を行う．
+
+    When games > 1, the client asks the server to keep the connection
+    for the following games, and connects again for each game if the
+    server does not accept it.
+    When binary is True, the client asks the server for the compact
+    binary protocol, and uses JSON lines if the server does not accept it.
+    Options are requested only when needed, since a server without
+    options (older than Protocol.options) takes an option line for the
+    name; use games=1 and binary=False with such a server.
+    """
     import socket
-    import logging
     assert isinstance(host, str) and isinstance(port, int)
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect((host, port))
-        with sock.makefile(mode='rw', buffering=1) as sockfile:
-            # (2a) receive greeting from the server
-            greeting = sockfile.readline().rstrip()
-            logging.debug(f'< {greeting}')
-            assert greeting == Protocol.greeting
-            logging.info(f'connect to server with name {player.name()}')
-            # (2b) send its name to the server
-            sockfile.write(player.name()+'\n')
-
-            # (3) receive filed information
-            field = sockfile.readline()
-            player.initialize(Field.from_json(field))
-            # (4) send initial placement of ships
-            ships = player.ships_to_json()
-            logging.debug('send initial placement ' + ships)
-            sockfile.write(ships+'\n')
-
-            # (5) main loop in game
-            t = 1
-            while True:
-                # receive (5a) turn to move or (6) game end
-                game_status = sockfile.readline().rstrip()
-                print(f't={t} {game_status}')
-                if game_status == "your turn":
-                    # (5b) send action if my turn
-                    action = player.action()
-                    logging.debug('> ' + action)
-                    sockfile.write(action+'\n')
-                elif game_status == "waiting":
-                    pass
-                elif game_status == Protocol.you_win:
-                    break
-                elif game_status == Protocol.you_lose:
-                    break
-                elif game_status == Protocol.draw:
-                    break
-                else:
-                    raise RuntimeError("unexpected information from server")
-                observation = sockfile.readline()
-                # (5c) receive result of action either by me or by opponent
-                if not observation:
-                    logging.error('disconnected from server')
-                    break
-                player.update(observation, game_status)
-                t += 1
+    played = 0
+    while played < games:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.connect((host, port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with sock.makefile(mode='rwb') as sockfile:
+                requested = [Protocol.binary] if binary else []
+                if games - played > 1:
+                    requested.append(Protocol.persistent)
+                accepted = _handshake(sockfile, player, requested)
+                persistent = Protocol.persistent in accepted
+                channel = _BinaryChannel(sockfile) \
+                    if Protocol.binary in accepted else _TextChannel(sockfile)
+                field = channel.recv_field()
+                while field:
+                    _play_one_game(channel, player, field)
+                    played += 1
+                    if not persistent or played >= games:
+                        break
+                    # the server starts the next game on this connection
+                    field = channel.recv_field()
+                if not field:
+                    logging.warning('connection closed by server')
+                    return
+
+
+def _readline(sockfile) -> str:
+    return sockfile.readline().decode()
+
+
+def _writeline(sockfile, line: str):
+    sockfile.write((line + '\n').encode())
+    sockfile.flush()
+
+
+def _handshake(sockfile, player, requested):
+    """(2) exchange greeting and name, to return accepted options"""
+    # (2a) receive greeting from the server
+    greeting = _readline(sockfile).rstrip()
+    logging.debug(f'< {greeting}')
+    assert greeting == Protocol.greeting
+    logging.info(f'connect to server with name {player.name()}')
+    for option in requested:
+        _writeline(sockfile, f'{Protocol.option} {option}')
+    # (2b) send its name to the server
+    _writeline(sockfile, player.name())
+    if not requested:
+        return set()
+    # (2c) receive the accepted options
+    line = _readline(sockfile)
+    if not line.startswith(Protocol.accepted):
+        raise RuntimeError(f'server does not support options: {line!r}')
+    return set(line.split()[1:])
+
+
+class _TextChannel:
+    """messages in JSON lines"""
+    merged = False              #: whether results come with status
+
+    def __init__(self, sockfile):
+        self.sockfile = sockfile
+
+    def recv_field(self) -> str:
+        return _readline(self.sockfile)
+
+    def send_placement(self, ships: str):
+        _writeline(self.sockfile, ships)
+
+    def recv_status(self):
+        """return (status, result of the preceding action or None)"""
+        return _readline(self.sockfile).rstrip(), None
+
+    def send_action(self, action: str):
+        _writeline(self.sockfile, action)
+
+    def recv_result(self):
+        return _readline(self.sockfile)
+
+
+class _BinaryChannel:
+    """frames of the binary module, a result arriving with the next status"""
+    merged = True
+
+    def __init__(self, sockfile):
+        self.sockfile = sockfile
+
+    def recv_field(self) -> str:
+        return binary.decode_field(binary.read_frame(self.sockfile))
+
+    def send_placement(self, ships: str):
+        self.sockfile.write(binary.encode_placement(codec.loads(ships)))
+        self.sockfile.flush()
+
+    def recv_status(self):
+        payload = binary.read_frame(self.sockfile)
+        if not payload:
+            return '', None
+        return binary.decode_status(payload)
+
+    def send_action(self, action: str):
+        self.sockfile.write(binary.encode_action(codec.loads(action)))
+        self.sockfile.flush()
+
+
+def _play_one_game(channel, player, field):
+    """(3) - (6) play a game starting from the field information"""
+    player.initialize(Field.from_json(field))
+    # (4) send initial placement of ships
+    ships = player.ships_to_json()
+    logging.debug('send initial placement ' + ships)
+    channel.send_placement(ships)
+
+    # (5) main loop in game
+    t = 1
+    last_status = None
+    while True:
+        # receive (5a) turn to move or (6) game end
+        game_status, result = channel.recv_status()
+        if result is not None:
+            # (5c) result of the preceding action in the binary mode
+            player.update(result, last_status)
+            t += 1
+        print(f't={t} {game_status}')
+        if game_status == "your turn":
+            # (5b) send action if my turn
+            action = player.action()
+            logging.debug('> ' + action)
+            channel.send_action(action)
+        elif game_status == "waiting":
+            pass
+        elif game_status == Protocol.you_win:
+            break
+        elif game_status == Protocol.you_lose:
+            break
+        elif game_status == Protocol.draw:
+            break
+        else:
+            raise RuntimeError("unexpected information from server")
+        last_status = game_status
+        if channel.merged:
+            continue
+        observation = channel.recv_result()
+        # (5c) receive result of action either by me or by opponent
+        if not observation:
+            logging.error('disconnected from server')
+            break
+        player.update(observation, game_status)
+        t += 1
@@ -3,5 +3,27 @@ class Protocol:
     you_win = 'you win'
     you_lose = 'you lose'
     draw = 'draw'
+    turn_limit = 10000  #: a game is drawn after this number of turns
+
+    # options requested by a client before its name, e.g. "option persistent"
+    option = 'option'
+    accepted = 'accepted'   #: server reply listing the accepted options
+    persistent = 'persistent'  #: play successive games on one connection
+    binary = 'binary'          #: exchange frames of binary module after name
+    options = {persistent, binary}  #: options supported by this server
+
+    @staticmethod
+    def parse_option(line):
+        """return the option requested in line, or None for other lines
+
+        >>> Protocol.parse_option('option persistent')
+        'persistent'
+        >>> Protocol.parse_option('random-player') is None
+        True
+        """
+        words = line.split()
+        if len(words) == 2 and words[0] == Protocol.option:
+            return words[1]
+        return None
 
     old_greeting = "you are connected. please send me initial state."
@@ -0,0 +1,343 @@
+"""Append-only binary log of games, read through a memory map.
+
+A replay file is a sequence of records, one per game::
+
+    record  = b'SUBR' length (uint32) body
+    body    = width, height, rocks (uint16) (x, y) (int16) per rock
+              placement of each player:
+                  present (uint8), x, y (int16) per ship in SHIP_TYPES
+              winner (int8), reason (uint8), turns (uint32)
+              turn record (TURN) per turn
+
+    TURN    = kind (uint8)   ATTACK, MOVE, INVALID or FORFEIT
+              ship (uint8)   index in SHIP_TYPES of the moved ship
+              x, y (int16)   target square
+              legal (uint8)  whether the action was legal
+              hit (uint8)    index of the ship hit, or 255
+              near (uint8)   bit mask of ships next to the attacked square
+
+Records are written with a single write() on a file opened for
+appending, so that processes may share a file.  :class:`ReplayReader`
+indexes the records by their headers only; a game is decoded when it
+is accessed.
+
+    $ python -m submarine_py.replay verify games.replay
+"""
+from .binary import SHIP_TYPES
+from .field import Field
+from . import codec
+import mmap
+import struct
+
+MAGIC = b'SUBR'
+ATTACK, MOVE, INVALID, FORFEIT = range(4)
+NO_SHIP = 255
+REASONS = ['sunk', 'illegal', 'draw', 'forfeit']
+
+_record = struct.Struct('!4sI')
+_field = struct.Struct('!HHH')
+_rock = struct.Struct('!hh')
+_ship = struct.Struct('!Bhh')
+_result = struct.Struct('!bBI')
+TURN = struct.Struct('!BBhhBBB')
+
+
+def _parse(msg):
+    return codec.loads(msg) if isinstance(msg, (str, bytes)) else msg
+
+
+class GameRecord:
+    """collect a game to encode it as a record
+
+    placements: initial placements of the two players (JSON or dicts)
+    """
+
+    def __init__(self, field: Field, placements):
+        self.field = field
+        self.placements = [_parse(p) for p in placements]
+        self.turns = bytearray()
+        self.count = 0
+        self.last_kind = None
+        self.last_legal = True
+
+    def add(self, act, info):
+        """record an action (JSON, dict, or None for a forfeit) and the
+        results [active, passive] returned by GameControl.action_info"""
+        act = _parse(act) if act is not None else None
+        ship, (x, y) = 0, (0, 0)
+        if act is None:
+            kind = FORFEIT
+        elif "attack" in act:
+            kind = ATTACK
+            to = act["attack"].get("to")
+        elif "move" in act:
+            kind = MOVE
+            to = act["move"].get("to")
+            ship = SHIP_TYPES.index(act["move"].get("ship")) \
+                if act["move"].get("ship") in SHIP_TYPES else NO_SHIP
+        else:
+            kind = INVALID
+        if kind in (ATTACK, MOVE):
+            try:
+                x, y = to
+                _rock.pack(x, y)
+            except (TypeError, ValueError, struct.error):
+                kind, x, y = INVALID, 0, 0
+        hit, near = NO_SHIP, 0
+        attacked = info[0].get("result", {}).get("attacked")
+        if kind == ATTACK:
+            legal = bool(attacked)
+            if attacked:
+                if "hit" in attacked:
+                    hit = SHIP_TYPES.index(attacked["hit"])
+                near = sum(1 << SHIP_TYPES.index(s) for s in attacked["near"])
+        elif kind == MOVE:
+            legal = bool(info[1]["result"]["moved"])
+        else:
+            legal = False
+        self.turns += TURN.pack(kind, ship, x, y, legal, hit, near)
+        self.count += 1
+        self.last_kind, self.last_legal = kind, legal
+
+    def finish(self, winner: int) -> bytes:
+        """return the encoded record of the game won by winner (-1 for
+        a draw)"""
+        if winner < 0:
+            reason = 'draw'
+        elif self.last_kind == FORFEIT:
+            reason = 'forfeit'
+        else:
+            reason = 'sunk' if self.last_legal else 'illegal'
+        body = bytearray(_field.pack(self.field.width, self.field.height,
+                                     len(self.field.rock)))
+        for x, y in self.field.rock:
+            body += _rock.pack(x, y)
+        for placement in self.placements:
+            for ship_type in SHIP_TYPES:
+                if ship_type in placement:
+                    body += _ship.pack(1, *placement[ship_type])
+                else:
+                    body += _ship.pack(0, 0, 0)
+        body += _result.pack(winner, REASONS.index(reason), self.count)
+        body += self.turns
+        return _record.pack(MAGIC, len(body)) + body
+
+
+class ReplayWriter:
+    """append records to a replay file"""
+
+    def __init__(self, path):
+        self.file = open(path, 'ab', buffering=0)
+
+    def write(self, record: bytes):
+        self.file.write(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Replay:
+    """a recorded game, decoded on access"""
+
+    __slots__ = ('data', 'rocks', 'result_offset')
+
+    def __init__(self, data):
+        self.data = data
+        self.rocks = _field.unpack_from(data, 0)[2]
+        self.result_offset = _field.size + self.rocks * _rock.size \
+            + 2 * len(SHIP_TYPES) * _ship.size
+
+    @staticmethod
+    def from_record(record: bytes):
+        """return the game in a record made by GameRecord.finish()"""
+        magic, n = _record.unpack_from(record, 0)
+        if magic != MAGIC or len(record) != _record.size + n:
+            raise ValueError('broken record')
+        return Replay(memoryview(record)[_record.size:])
+
+    def field(self) -> Field:
+        width, height, n = _field.unpack_from(self.data, 0)
+        rocks = [list(_rock.unpack_from(self.data,
+                                        _field.size + i * _rock.size))
+                 for i in range(n)]
+        return Field(height, width, rocks)
+
+    def placements(self):
+        """return initial placements of the players as dicts"""
+        offset = _field.size + self.rocks * _rock.size
+        placements = []
+        for _ in range(2):
+            placement = {}
+            for ship_type in SHIP_TYPES:
+                present, x, y = _ship.unpack_from(self.data, offset)
+                offset += _ship.size
+                if present:
+                    placement[ship_type] = [x, y]
+            placements.append(placement)
+        return placements
+
+    @property
+    def winner(self) -> int:
+        return _result.unpack_from(self.data, self.result_offset)[0]
+
+    @property
+    def reason(self) -> str:
+        return REASONS[_result.unpack_from(self.data, self.result_offset)[1]]
+
+    @property
+    def turns(self) -> int:
+        return _result.unpack_from(self.data, self.result_offset)[2]
+
+    def turn_records(self):
+        """iterate tuples of the TURN fields"""
+        start = self.result_offset + _result.size
+        end = start + self.turns * TURN.size
+        return TURN.iter_unpack(self.data[start:end])
+
+    def turn_array(self):
+        """return the turns as a NumPy structured array (zero copy)"""
+        import numpy as np
+        dtype = np.dtype([('kind', 'u1'), ('ship', 'u1'), ('x', '>i2'),
+                          ('y', '>i2'), ('legal', 'u1'), ('hit', 'u1'),
+                          ('near', 'u1')])
+        start = self.result_offset + _result.size
+        return np.frombuffer(self.data, dtype, self.turns, start)
+
+    def actions(self):
+        """iterate actions as dicts, None for a forfeit"""
+        for kind, ship, x, y, *_ in self.turn_records():
+            if kind == ATTACK:
+                yield {"attack": {"to": [x, y]}}
+            elif kind == MOVE:
+                yield {"move": {"ship": SHIP_TYPES[ship] if ship != NO_SHIP
+                                else None, "to": [x, y]}}
+            elif kind == INVALID:
+                yield {}
+            else:
+                yield None
+
+
+class ReplayReader:
+    """random access to the games in a replay file through mmap"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except ValueError:      # empty file
+            self.map = b''
+        self.view = memoryview(self.map)
+        self.offsets = []
+        offset = 0
+        while offset + _record.size <= len(self.map):
+            magic, n = _record.unpack_from(self.map, offset)
+            if magic != MAGIC or offset + _record.size + n > len(self.map):
+                break           # a broken or unfinished record
+            self.offsets.append((offset + _record.size, n))
+            offset += _record.size + n
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i) -> Replay:
+        start, n = self.offsets[i]
+        return Replay(self.view[start:start + n])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def close(self):
+        try:
+            self.view.release()
+            if isinstance(self.map, mmap.mmap):
+                self.map.close()
+        except BufferError:
+            pass                # games still in use keep the map alive
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def verify(replay: Replay):
+    """re-simulate a game through GameControl to return the first
+    difference from the record, or None if the game is reproduced"""
+    from .server import GameControl
+    game = GameControl(replay.field())
+    game.initialize(*replay.placements())
+    winner = -1
+    c = 0
+    for t, (act, turn) in enumerate(zip(replay.actions(),
+                                        replay.turn_records())):
+        if winner != -1:
+            return f'turn {t}: game continues after the end'
+        if act is None:
+            info = game.forfeit_info(c)
+        else:
+            info = game.action_info(c, act)
+        record = GameRecord(game.field, [{}, {}])
+        record.add(act, info)
+        if tuple(record.turns) != tuple(TURN.pack(*turn)):
+            return f'turn {t}: recorded {turn}, ' \
+                f'replayed {TURN.unpack(record.turns)}'
+        if "outcome" in info[0]:
+            winner = c if info[0]["outcome"] else 1 - c
+        c = 1 - c
+    if winner != replay.winner:
+        return f'winner {replay.winner} recorded, {winner} replayed'
+    return None
+
+
+if __name__ == '__main__':
+    import argparse
+    import collections
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="inspect a replay file",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "command", choices=['summary', 'verify', 'dump'],
+        help="summary of games, re-simulation of games, or JSON of a game",
+    )
+    parser.add_argument("path", help="replay file")
+    parser.add_argument(
+        "--index", type=int, default=0,
+        help="game to dump",
+    )
+    args = parser.parse_args()
+    with ReplayReader(args.path) as reader:
+        if args.command == 'summary':
+            reasons = collections.Counter(r.reason for r in reader)
+            winners = collections.Counter(r.winner for r in reader)
+            turns = sum(r.turns for r in reader)
+            print(f'{len(reader)} games, {turns} turns')
+            print(f'winners: {dict(winners)}, reasons: {dict(reasons)}')
+        elif args.command == 'verify':
+            failed = 0
+            for i, replay in enumerate(reader):
+                error = verify(replay)
+                if error:
+                    failed += 1
+                    print(f'game {i}: {error}')
+            print(f'{len(reader) - failed}/{len(reader)} games reproduced')
+            raise SystemExit(1 if failed else 0)
+        else:
+            replay = reader[args.index]
+            print(json.dumps({
+                'field': json.loads(replay.field().to_json()),
+                'placements': replay.placements(),
+                'actions': list(replay.actions()),
+                'winner': replay.winner, 'reason': replay.reason,
+            }))
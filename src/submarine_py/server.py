@@ -1,14 +1,39 @@
 from .ship import Ship
-from .field import Reporter, Field
+from .fleet import Fleet
+from .field import Reporter, ReportObserver, Field, coordinate
 from .protocol import Protocol
+from . import codec
+from . import binary
+from .replay import GameRecord, ReplayWriter
+from .transposition import zobrist_table, fleet_hash, combine
+from .instrument import Timings
+from time import perf_counter
 import socket
-import json
 import logging
 import collections
 
 
-class Client:
-    """プレイヤーを表すクラスである．艦を複数保持している．"""
+def _parse(msg):
+    """JSON 文字列なら解析し，解析済みならそのまま返す．"""
+    return codec.loads(msg) if isinstance(msg, (str, bytes)) else msg
+
+
+def _square(to):
+    """NumPy の整数や 2.0 などで与えられた座標を int のリストにする．"""
+    try:
+        x, y = to
+        if type(x) is int and type(y) is int:
+            return to
+        return [coordinate(x), coordinate(y)]
+    except (TypeError, ValueError):
+        return to
+
+
+class Client(Fleet):
+    """プレイヤーを表すクラスである．艦を複数保持している．
+
+    self.occupancy は艦のいるマスを表すビットボード (Field.bit を参照) である．
+    """
 
     def __init__(self, field: Field, positions):
         """艦種ごとに座標を与えられるので，Shipオブジェクトを作成し，連想配列に加える．
@@ -16,12 +41,28 @@ class Client:
         """
         self.ships = {}
         self.field = field
+        self.fleet_changed()
         for type, position in positions.items():
             if self.overlap(position):
                 raise ValueError("overlapping positions")
             if not self.field.passable(position):
                 raise ValueError(f"position {position} out of field")
             self.ships[type] = Ship(type, position)
+            self.occupancy |= self.field.bit(position)
+        self.keys = zobrist_table(field)
+        self.hash = fleet_hash(field, self.ships.values())
+
+    def copy(self):
+        """探索用に独立した複製を返す．Field と不変な座標は共有する．"""
+        other = Client.__new__(Client)
+        other.field = self.field
+        other.ships = {type: ship.copy() for type, ship in self.ships.items()}
+        other.occupancy = self.occupancy
+        other.keys, other.hash = self.keys, self.hash
+        other._area = self._area
+        other._attacks, other._moves, other._actions \
+            = self._attacks, self._moves, self._actions
+        return other
 
     def move(self, type, to):
         """艦が座標に移動可能か確かめてから移動させる．相手プレイヤーに渡す情報を連想配列で返す．
@@ -29,13 +70,17 @@ class Client:
         反則の場合は False を返す
         """
         ship = self.ships[type]
+        bit = self.field.bit(to)
 
-        if not ship or not self.field.passable(to) \
-           or not ship.is_reachable(to) or self.overlap(to):
+        if not ship or not bit or bit & self.occupancy \
+           or not bit & self.field.reach_mask(ship.position):
             return False
 
         offset = [to[0] - ship.position[0], to[1] - ship.position[1]]
+        keys = self.keys[type]
+        self.hash ^= keys[ship.position][ship.hp] ^ keys[tuple(to)][ship.hp]
         ship.move_to(to)
+        self.fleet_changed()
         return {"ship": type, "distance": offset}
 
     def attacked(self, to):
@@ -50,11 +95,14 @@ class Client:
         near = self.near(to)
 
         if ship:
+            keys = self.keys[ship.type][ship.position]
+            self.hash ^= keys[ship.hp] ^ keys[ship.hp - 1]
             ship.deal_damage(1)
             info["hit"] = ship.type
 
             if ship.hp == 0:
                 del self.ships[ship.type]
+                self.fleet_changed()
 
         info["near"] = [s.type for s in near]
         return info
@@ -70,26 +118,25 @@ class Client:
 
     def in_attack_range(self, to):
         """艦隊の攻撃可能な範囲かどうかを返す．"""
-        return (
-            self.field.passable(to)
-            and any([ship.in_attack_range(to)
-                     for ship in self.ships.values()])
-        )
+        return bool(self.field.attack_mask(to) & self.occupancy)
 
     def overlap(self, position):
         """与えられた座標にいる艦を返す．"""
+        bit = self.field.bit(position)
+        if not bit & self.occupancy:
+            return None
         for ship in self.ships.values():
-            if ship.position == position:
+            if self.field.bit(ship.position) == bit:
                 return ship
         return None
 
     def near(self, to):
         """与えられた座標の周り1マスにいる艦を配列で返す．"""
-        near = []
-        for ship in self.ships.values():
-            if ship.position != to and ship.in_attack_range(to):
-                near.append(ship)
-        return near
+        around = self.field.attack_mask(to) & ~self.field.bit(to)
+        if not around & self.occupancy:
+            return []
+        return [ship for ship in self.ships.values()
+                if self.field.bit(ship.position) & around]
 
 
 class GameControl:
@@ -103,17 +150,28 @@ class GameControl:
         self.field = field
         self.clients = None
 
+    def copy(self):
+        """探索用に独立した複製を返す．"""
+        other = GameControl(self.field)
+        other.clients = [client.copy() for client in self.clients]
+        return other
+
+    def hash(self, c):
+        """return the Zobrist hash of the state with player c to move"""
+        return combine(self.clients[0].hash, self.clients[1].hash, c)
+
     def initialize(self, json1, json2):
+        """初期配置 (JSON あるいは解析済みの連想配列) から両プレイヤーを作る．"""
         self.clients = [
-            Client(self.field, json.loads(json1)),
-            Client(self.field, json.loads(json2))
+            Client(self.field, _parse(json1)),
+            Client(self.field, _parse(json2))
         ]
 
     def initial_condition(self, c):
         """初期配置をJSONで返す．"""
         return [
-            json.dumps(self.observation(c)),
-            json.dumps(self.observation(1-c))
+            codec.dumps(self.observation(c)),
+            codec.dumps(self.observation(1-c))
         ]
 
     def action(self, c, json_msg):
@@ -121,29 +179,49 @@ class GameControl:
         可能かどうかチェックしてから攻撃，あるいは移動の処理を行い，両プレイヤーに結果を通知するJSONを作る．
         JSONの配列を返す．0番目の要素が行動プレイヤー宛，1番目の要素が待機プレイヤー宛である．
         """
+        info = self.action_info(c, json_msg)
+        return [codec.dumps(info[0]), codec.dumps(info[1])]
+
+    def action_info(self, c, act):
+        """action() と同じ処理を行い，通知内容を連想配列の配列で返す．
+
+        act は JSON 文字列でも解析済みの連想配列でもよい．
+        解析できない行動や存在しない艦の移動は反則として扱う．
+        """
         info = [{}, {}]
         active = self.clients[c]
         passive = self.clients[1-c]
-        act = json.loads(json_msg)
-
-        if "attack" in act:
-            to = act["attack"]["to"]
-
-            if not active.in_attack_range(to):
-                result = False
-            else:
-                result = passive.attacked(to)
-
-            info[c]["result"] = {"attacked": result}
-            info[1-c]["result"] = {"attacked": result}
-
-            if not passive.ships:
-                info[c]["outcome"] = True
-                info[1-c]["outcome"] = False
-
-        elif "move" in act:
-            result = active.move(act["move"]["ship"], act["move"]["to"])
-            info[1-c]["result"] = {"moved": result}
+        try:
+            act = _parse(act)
+        except ValueError:
+            act = None
+        if not isinstance(act, dict):
+            act = {}
+        result = False          # neither attack nor move
+
+        try:
+            if "attack" in act:
+                to = _square(act["attack"]["to"])
+
+                if not active.in_attack_range(to):
+                    result = False
+                else:
+                    result = passive.attacked(to)
+
+                info[c]["result"] = {"attacked": result}
+                info[1-c]["result"] = {"attacked": result}
+
+                if not passive.ships:
+                    info[c]["outcome"] = True
+                    info[1-c]["outcome"] = False
+
+            elif "move" in act:
+                result = active.move(act["move"]["ship"],
+                                     _square(act["move"]["to"]))
+                info[1-c]["result"] = {"moved": result}
+        except (KeyError, TypeError):
+            # malformed, e.g., without "to" or with an unknown ship
+            info, result = [{}, {}], False
 
         if not result:
             info[c]["outcome"] = False
@@ -152,7 +230,22 @@ class GameControl:
         info[c].update(self.observation(c))
         info[1-c].update(self.observation(1-c))
 
-        return [json.dumps(info[c]), json.dumps(info[1-c])]
+        return [info[c], info[1-c]]
+
+    def forfeit(self, c):
+        """プレイヤー c を (切断などにより) 負けとし，両プレイヤーに通知するJSONを作る．
+
+        配列の順序は action() と同じである．
+        """
+        info = self.forfeit_info(c)
+        return [codec.dumps(info[0]), codec.dumps(info[1])]
+
+    def forfeit_info(self, c):
+        """forfeit() と同じ通知内容を連想配列の配列で返す．"""
+        info = [{"outcome": False}, {"outcome": True}]
+        info[0].update(self.observation(c))
+        info[1].update(self.observation(1-c))
+        return info
 
     def observation(self, c):
         """自分と相手の状態を連想配列で返す．"""
@@ -164,102 +257,362 @@ class GameControl:
         }
 
 
-def step(time, active, passive, c, game, *, quiet):
+class Connection:
+    """ソケットで接続したクライアントである．
+
+    binary オプションが受け入れられた場合，ハンドシェイク後の通信は
+    binary モジュールのフレームで行う．send_status, send_result などは
+    どちらの形式でも使える．
+    """
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.addr = addr
+        self.file = sock.makefile(mode='rwb')
+        self.name = None
+        self.options = set()
+        self.alive = True  #: False after a disconnection or a timeout
+        self.pending = None  # result to be sent with the next status
+        self.timings = None  #: Timings of 'serialize' and 'send' if given
+
+    def _write(self, data: bytes):
+        start = perf_counter() if self.timings else 0.0
+        try:
+            self.file.write(data)
+            self.file.flush()
+        except OSError:
+            self.alive = False
+        if self.timings:
+            self.timings.add('send', perf_counter() - start)
+
+    def _read(self, read, timeout):
+        if not self.alive:
+            return b''
+        self.sock.settimeout(timeout)
+        try:
+            data = read()
+        except socket.timeout:
+            # a late reply would be taken for the next message
+            self.alive = False
+            raise
+        except OSError:
+            data = b''
+        finally:
+            if self.alive:
+                self.sock.settimeout(None)
+        if not data:
+            self.alive = False
+        return data
+
+    def send(self, line: str):
+        self._write((line + '\n').encode())
+
+    def recv(self, timeout=None) -> str:
+        """receive one line, or '' when disconnected
+
+        Raises socket.timeout if no line arrives in timeout seconds.
+        """
+        return self._read(self.file.readline, timeout).decode().rstrip()
+
+    @property
+    def binary(self):
+        return Protocol.binary in self.options
+
+    def send_field(self, field_json: str):
+        """(3) send field information"""
+        if self.binary:
+            self._write(binary.encode_field(field_json))
+        else:
+            self.send(field_json)
+
+    def recv_placement(self, timeout=None):
+        """(4) receive the initial placement as JSON or as a dict"""
+        if self.binary:
+            payload = self._read(lambda: binary.read_frame(self.file),
+                                 timeout)
+            return binary.decode_placement(payload)
+        return self.recv(timeout)
+
+    def send_status(self, status: str):
+        """(5a), (6) send a status, with the result of the preceding action
+        in the binary mode"""
+        if self.binary:
+            start = perf_counter() if self.timings else 0.0
+            frame = binary.encode_status(status, self.pending)
+            if self.timings:
+                self.timings.add('serialize', perf_counter() - start)
+            self._write(frame)
+            self.pending = None
+        else:
+            self.send(status)
+
+    def send_result(self, info: dict):
+        """(5c) send the result of an action, or keep it until the next
+        status in the binary mode"""
+        if self.binary:
+            self.pending = info
+        elif self.timings:
+            start = perf_counter()
+            line = codec.dumps(info)
+            self.timings.add('serialize', perf_counter() - start)
+            self.send(line)
+        else:
+            self.send(codec.dumps(info))
+
+    def recv_action(self, timeout=None):
+        """(5b) receive an action as JSON or as a dict, '' when disconnected
+
+        Raises socket.timeout if no action arrives in timeout seconds.
+        """
+        if self.binary:
+            payload = self._read(lambda: binary.read_frame(self.file),
+                                 timeout)
+            return payload and binary.decode_action(payload)
+        return self.recv(timeout)
+
+    def handshake(self, timeout=None):
+        """(2) greet the client and receive options and its name
+
+        Raises socket.timeout if a line does not arrive in timeout seconds.
+        """
+        # (2a) server -> client: greeting
+        logging.debug(f'> {Protocol.greeting}')
+        self.send(Protocol.greeting)
+        # (2b) client -> server: options (if any) and name
+        line = self.recv(timeout)
+        requested = []
+        while (option := Protocol.parse_option(line)) is not None:
+            requested.append(option)
+            line = self.recv(timeout)
+        self.name = line
+        if requested:
+            self.options = Protocol.options.intersection(requested)
+            self.send(' '.join([Protocol.accepted, *sorted(self.options)]))
+
+    @property
+    def persistent(self):
+        return Protocol.persistent in self.options
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def step(time, active, passive, c, game, *, quiet, clock=None,
+         reporter=Reporter, record=None, timings=None):
     """
     プレイヤーの行動をソケットから取得して処理し，結果を通知する．
     勝利したプレイヤーを返す．勝敗が決していない時は-1を返す．
+
+    quiet でなければ結果を通知した後に reporter (Reporter あるいは
+    ReportObserver) で表示する．record (GameRecord) があれば記録する．
+
+    clock (Clock) があれば持ち時間を超えたプレイヤーを負けとし，
+    両プレイヤーへの通知に "clock" を加える．切断したプレイヤーも負けとなる．
+    timings (Timings) があれば各段階の所要時間を加える．
     """
     # (5a) notify player to move
-    print("your turn", file=active)
-    print("waiting", file=passive)
+    active.send_status("your turn")
+    passive.send_status("waiting")
     # (5b) recieve action
-    act = active.readline().rstrip()
-    if not act:
-        logging.error(f'client disconnected at time {time}')
-        logging.error('aborted')
-        exit(1)
-    logging.debug(f"action {time=} player={c+1} {act}")
-    results = game.action(c, act)
-    logging.debug(f"{results[0]=} {results[1]=}")
+    if clock:
+        clock.start()
+    start = perf_counter() if timings else 0.0
+    try:
+        act = active.recv_action(clock.budget(c) if clock else None)
+    except socket.timeout:
+        act = None
+    if timings:
+        now = perf_counter()
+        timings.add(f'think{c+1}', now - start)
+        start = now
+    in_time = clock.stop(c) if clock else True
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    if act not in (None, '') and in_time:
+        if debug:
+            logging.debug(f"action {time=} player={c+1} {act}")
+        info = game.action_info(c, act)
+        if timings:
+            timings.add('engine', perf_counter() - start)
+    else:
+        reason = 'disconnected' if act == '' else 'timed out'
+        logging.error(f'player {c+1} {active.name} {reason} at time {time}')
+        info = game.forfeit_info(c)
+        act = None
+    if record:
+        start = perf_counter() if timings else 0.0
+        record.add(act, info)
+        if timings:
+            timings.add('record', perf_counter() - start)
+    if clock:
+        info[0]["clock"] = clock.info(c)
+        info[1]["clock"] = clock.info(1-c)
+    # (5c) notify results, encoding each message once
+    if debug:
+        logging.debug(f"{info[0]=} {info[1]=}")
+    active.send_result(info[0])
+    passive.send_result(info[1])
     if not quiet:
-        Reporter.report_field(game.field, results, c)
-    # (5c) notify results
-    print(results[0], file=active)
-    print(results[1], file=passive)
+        start = perf_counter() if timings else 0.0
+        reporter.report_field(game.field, info, c)
+        if timings:
+            timings.add('report', perf_counter() - start)
 
-    if "outcome" in json.loads(results[0]):
-        return c if json.loads(results[0])["outcome"] else 1 - c
+    if "outcome" in info[0]:
+        return c if info[0]["outcome"] else 1 - c
     return -1
 
 
-def play_game(field, clients, *, quiet):
-    """play one game to return winner (-1 for draw)"""
-    # (2a) receive name from each client
-    names = [cl.readline().rstrip() for cl in clients]
+def play_game(field, clients, *, quiet, time_control=None, reporter=None,
+              replay=None, timings=None):
+    """play one game between connections to return winner (-1 for draw)
+    and its name
+
+    Returns (None, None) when the game is aborted before it starts, by a
+    placement which is invalid or not received in time.
+    time_control (TimeControl) limits the thinking time of each player,
+    including the time for the initial placement.
+    Unless quiet, fields are rendered by reporter (a ReportObserver
+    made for the game by default) apart from the game loop.
+    The game is recorded in replay (ReplayWriter) if given.
+    Latencies of the phases of each turn are added to timings (Timings)
+    if given.
+    """
+    names = [cl.name for cl in clients]
     logging.info(f'start game for {names}')
     game = GameControl(field)
     # (3) send field information to both clients
     field_rep = field.to_json()
     logging.debug(f'>> {field_rep}')
     for cl in clients:
-        print(field_rep, file=cl)
+        cl.send_field(field_rep)
     # (4) receive initial ship placement
-    ships = [cl.readline() for cl in clients]
+    clock = time_control.clock() if time_control else None
+    ships = []
+    for i, cl in enumerate(clients):
+        try:
+            ships.append(cl.recv_placement(clock.budget(i) if clock
+                                           else None))
+        except socket.timeout:
+            ships.append('')
     logging.debug(f'<< {ships}')
     try:
         game.initialize(*ships)
-    except ValueError as e:
-        logging.error(f'error in initial ship placement {e}')
-        exit(1)
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.error(f'error in initial ship placement {names} {e}')
+        return None, None
 
     # (5) main loop of game
     t = 0
-    limit = 10000
+    limit = Protocol.turn_limit
     c = 0                       # turn to move
+    record = GameRecord(field, ships) if replay else None
+    observer = None
     if not quiet:
-        Reporter.report_field(field, game.initial_condition(c), c)
+        if reporter is None:
+            reporter = observer = ReportObserver()
+        reporter.report_field(field, game.initial_condition(c), c)
     winner = -1
+    for cl in clients:
+        cl.timings = timings
     while winner == -1 and t < limit:
-        winner = step(t+1, clients[c], clients[1-c], c, game, quiet=quiet)
+        winner = step(t+1, clients[c], clients[1-c], c, game, quiet=quiet,
+                      clock=clock, reporter=reporter, record=record,
+                      timings=timings)
         c = 1 - c
         t += 1
+    for cl in clients:
+        cl.timings = None
+    if record:
+        replay.write(record.finish(winner))
+    if observer:
+        observer.close()
 
     # (6) game ends
     if winner == -1:
         for client in clients:
-            print(Protocol.draw, file=client)
+            client.send_status(Protocol.draw)
         logging.info("draw")
     else:
-        print(Protocol.you_win, file=clients[winner])
-        print(Protocol.you_lose, file=clients[1-winner])
+        clients[winner].send_status(Protocol.you_win)
+        clients[1-winner].send_status(Protocol.you_lose)
         logging.info(f"player {1+winner} {names[winner]} win")
     return winner, names[winner]
 
 
-def server_main(host: str, port: int, games: int, field: Field, *, quiet):
+def server_main(host: str, port: int, games: int, field: Field, *, quiet,
+                time_control=None, replay=None, timings=False,
+                timings_file=None, handshake_timeout=10.0):
+    """host games between pairs of clients
+
+    A client which requested the persistent option stays connected and
+    plays the next game; the other seat is filled by a new connection.
+    A client which timed out or disconnected loses the game and its seat.
+    A connection which does not send its name in handshake_timeout
+    seconds is closed, and both clients of an aborted game (see
+    play_game) are closed.
+    Games are recorded in the replay file at path replay if given.
+    If timings, a summary of the latencies of the phases of turns is
+    printed at the end; timings_file is a path to write them for each
+    game as lines of JSON.
+    """
     listen_addr = (host, port)
     win_count = collections.Counter()
+    clients = [None, None]
+    reporter = None if quiet else ReportObserver()
+    writer = ReplayWriter(replay) if replay else None
+    total = Timings() if timings or timings_file else None
+    dump = open(timings_file, 'w') if timings_file else None
     with socket.create_server(listen_addr, reuse_port=True) as s:
         # (1) server started
         for g in range(games):
-            logging.info(f'waiting client players at {host}:{port}')
-            clients, addrs = [], []
             for i in range(2):
-                conn, addr = s.accept()
-                logging.info(f'player {i+1} from {addr}')
-                c = conn.makefile(mode='rw', buffering=1)
-                # (2a) server -> client: greeting
-                logging.debug(f'> {Protocol.greeting}')
-                print(Protocol.greeting, file=c)
-                clients.append(c)
-                addrs.append(addr)
-            # (2b), (3) - (6)
-            winner, name = play_game(field, clients, quiet=quiet)
-            for client in clients:
-                client.close()
-            if winner >= 0:
-                id = f'{name}@{addrs[winner][0]}'
+                while clients[i] is None:
+                    logging.info(f'waiting client players at {host}:{port}')
+                    conn, addr = s.accept()
+                    logging.info(f'player {i+1} from {addr}')
+                    client = Connection(conn, addr)
+                    # (2a), (2b)
+                    try:
+                        client.handshake(handshake_timeout)
+                    except socket.timeout:
+                        client.name = None
+                    if not client.name:
+                        logging.error(f'no name from {addr}')
+                        client.close()
+                        continue
+                    clients[i] = client
+            # (3) - (6)
+            names = [client.name for client in clients]
+            game_timings = Timings() if total else None
+            winner, name = play_game(field, clients, quiet=quiet,
+                                     time_control=time_control,
+                                     reporter=reporter, replay=writer,
+                                     timings=game_timings)
+            if total:
+                total.merge(game_timings)
+            if dump:
+                dump.write(codec.dumps({
+                    'game': g, 'players': names, 'winner': winner,
+                    'phases': game_timings.to_dict()}) + '\n')
+                dump.flush()
+            if winner is not None and winner >= 0:
+                id = f'{name}@{clients[winner].addr[0]}'
                 win_count[id] += 1
+            for i, client in enumerate(clients):
+                if g + 1 == games or not client.persistent \
+                   or not client.alive or winner is None:
+                    client.close()
+                    clients[i] = None
+    if reporter:
+        reporter.close()
+    if writer:
+        writer.close()
+    if dump:
+        dump.close()
     if games > 1:
         for name, wins in win_count.items():
             print(f'{name} win {wins} time(s)')
+    if total:
+        print(total.summary())
@@ -1,21 +1,29 @@
 class Ship:
     """Player's ship
 
+    The position is held as an immutable (x, y) tuple, so that ships
+    and their positions can be shared between copies of a game state.
+
     >>> ship = Ship('w', (1, 2))
     >>> ship.hp
     3
-    >>> ship.move_to((4, 3))
+    >>> ship.move_to([4, 3])
     >>> ship.position
     (4, 3)
     """
     MAX_HPS = {"w": 3, "c": 2, "s": 1}  #: maixmum HP for each ship
 
-    def __init__(self, type, position):
+    __slots__ = ('type', 'position', 'hp')
+
+    def __init__(self, type, position, hp=None):
         if type not in Ship.MAX_HPS:
             raise ValueError(f'invalid type {type} for Ship')
         self.type = type
-        self.position = position
-        self.hp = Ship.MAX_HPS[type]
+        self.position = tuple(position)
+        self.hp = Ship.MAX_HPS[type] if hp is None else hp
+
+    def __repr__(self):
+        return f'Ship({self.type!r}, {self.position}, hp={self.hp})'
 
     def to_dict(self):
         '''convert to dict
@@ -24,11 +32,26 @@ class Ship:
         >>> ship.to_dict() == {'type': 'w', 'position': (1, 2), 'hp': 3}
         True
         '''
-        return self.__dict__
+        return {'type': self.type, 'position': self.position, 'hp': self.hp}
+
+    @staticmethod
+    def from_dict(data):
+        '''inverse of to_dict
+
+        >>> Ship.from_dict({'type': 'c', 'position': [0, 1], 'hp': 1})
+        Ship('c', (0, 1), hp=1)
+        '''
+        return Ship(data['type'], data['position'], data['hp'])
+
+    def copy(self):
+        '''return an independent ship in the same state'''
+        ship = Ship.__new__(Ship)
+        ship.type, ship.position, ship.hp = self.type, self.position, self.hp
+        return ship
 
     def move_to(self, to):
         """座標を変更する"""
-        self.position = to
+        self.position = tuple(to)
 
     def deal_damage(self, d):
         """ダメージを受けてHPが減る．"""
@@ -0,0 +1,293 @@
+"""Endgame tablebase solved by retrograde analysis.
+
+With perfect information (both fleets known), the types of ships do not
+matter, only their HP: a material is a tuple of HP of the ships of a
+side in descending order.  The table of (mover, opponent) materials
+holds, for every placement of the ships, the value for the player to
+move as int16:
+
+- ``n > 0``: wins in n plies (n = 1: sinks the last ship now)
+- ``n < 0``: loses in -n plies, against the best defense
+- ``0``: draw, or an impossible placement (overlapping ships)
+
+Placements are indexed by the squares of the ships in the order of the
+material, mover first, each being an index into ``Field.squares``.  An
+attack which does not sink the last ship leads to a table of less
+material, so tables are solved from small to large materials, and a
+table and its mirror (opponent to move) are solved together, layer by
+layer of the distance.
+
+Tables are saved as ``.npy`` files in a directory together with
+``field.json``, and :class:`Tablebase` reads them through memory maps::
+
+    $ python -m submarine_py.tablebase tables --ships 3 --rounded-field
+"""
+from .field import Field
+from .ship import Ship
+import itertools
+import logging
+import os
+import numpy as np
+
+
+def materials(max_ships=2):
+    """return materials of a side with at most max_ships ships
+
+    >>> materials(2)
+    [(1,), (2,), (3,), (1, 1), (2, 1), (3, 1), (2, 2), (3, 2)]
+    """
+    found = set()
+    types = list(Ship.MAX_HPS)
+    for n in range(1, max_ships + 1):
+        for fleet in itertools.combinations(types, n):
+            for hps in itertools.product(
+                    *(range(1, Ship.MAX_HPS[t] + 1) for t in fleet)):
+                found.add(tuple(sorted(hps, reverse=True)))
+    return sorted(found, key=lambda m: (len(m), m[::-1]))
+
+
+def _name(mover, opponent):
+    return '-'.join(map(str, mover)) + '_' + '-'.join(map(str, opponent))
+
+
+class Solver:
+    """solve and save tables of a field in directory"""
+
+    def __init__(self, field: Field, directory):
+        self.field = field
+        self.directory = directory
+        self.squares = [tuple(p) for p in field.squares]
+        self.p = len(self.squares)
+        index = {sq: i for i, sq in enumerate(self.squares)}
+        attacks, moves = [], []
+        for x, y in self.squares:
+            attacks.append([index[sq] for sq in self.squares
+                            if max(abs(sq[0] - x), abs(sq[1] - y)) <= 1])
+            moves.append([index[sq] for sq in self.squares
+                          if (sq[0] == x) != (sq[1] == y)])
+        self.attacks = _padded(attacks)
+        self.moves = _padded(moves)
+        self.tables = {}
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'field.json'), 'w') as f:
+            f.write(field.to_json())
+
+    def path(self, mover, opponent):
+        return os.path.join(self.directory,
+                            _name(mover, opponent) + '.npy')
+
+    def table(self, mover, opponent):
+        """return the table, solving it (and smaller ones) if needed"""
+        key = (tuple(mover), tuple(opponent))
+        if key not in self.tables:
+            path = self.path(*key)
+            if os.path.exists(path):
+                self.tables[key] = np.load(path, mmap_mode='r')
+            else:
+                self.solve(*key)
+        return self.tables[key]
+
+    def solve(self, a, b):
+        """solve tables (a, b) and (b, a)"""
+        pair = [(a, b)] if a == b else [(a, b), (b, a)]
+        sides = [self._successors(m, o) for m, o in pair]
+        if len(sides) == 1:
+            sides.append(sides[0])
+        values = [np.zeros(s['n'], dtype=np.int16) for s in sides]
+        assigned = [~s['valid'] for s in sides]
+        for s, v, done in zip(sides, values, assigned):
+            v[s['win']] = 1
+            done |= s['win']
+        horizon = max([int(np.abs(s['fixed']).max(initial=0))
+                       for s in sides]) + 1
+        n = 2
+        while True:
+            changed = False
+            updates = []
+            for k, s in enumerate(sides):
+                other = values[1 - k]
+                succ = np.concatenate(
+                    [np.where(s['dynamic'] >= 0, other[s['dynamic']], 0),
+                     s['fixed']], axis=1)
+                mask = np.concatenate([s['dynamic'] >= 0, s['fixed_mask']],
+                                      axis=1)
+                known = mask & (succ != 0) & (np.abs(succ) <= n - 1)
+                win = (known & (succ < 0)).any(axis=1)
+                loss = ((known & (succ > 0)) | ~mask).all(axis=1)
+                todo = ~assigned[k]
+                updates.append((todo & win, todo & ~win & loss))
+            for k, (win, loss) in enumerate(updates):
+                values[k][win] = n
+                values[k][loss] = -n
+                assigned[k] |= win | loss
+                changed |= bool(win.any() or loss.any())
+            if not changed and n > horizon:
+                break
+            n += 1
+        for (m, o), v in zip(pair, values):
+            np.save(self.path(m, o), v)
+            self.tables[(m, o)] = np.load(self.path(m, o), mmap_mode='r')
+            logging.info(f'solved {_name(m, o)}: '
+                         f'{(v > 0).sum()} wins, {(v < 0).sum()} losses')
+
+    def _successors(self, a, b):
+        """return successors of placements of mover a and opponent b
+
+        'dynamic': (N, D) indices in the mirror table (-1 for none)
+        'fixed': (N, F) values of successors in smaller tables
+        'win': placements where the mover sinks the last ship
+        """
+        ka, kb, p = len(a), len(b), self.p
+        shape = (p,) * (ka + kb)
+        n = p ** (ka + kb)
+        pos = np.stack(np.unravel_index(np.arange(n), shape), axis=1)
+        own, opp = pos[:, :ka], pos[:, ka:]
+        valid = _distinct(own) & _distinct(opp)
+        mirror = np.concatenate([opp, own], axis=1)
+
+        def index(columns):
+            return np.ravel_multi_index(tuple(columns.T),
+                                        (p,) * columns.shape[1])
+
+        dynamic, fixed, fixed_mask = [], [], []
+        win = np.zeros(n, dtype=bool)
+        miss = np.zeros(n, dtype=bool)
+        for i in range(ka):
+            for slot in range(self.attacks.shape[1]):
+                to = self.attacks[own[:, i], slot]
+                ok = valid & (to >= 0)
+                hits = opp == to[:, None]
+                miss |= ok & ~hits.any(axis=1)
+                for j in range(kb):
+                    hit = ok & hits[:, j]
+                    hps = list(b)
+                    hps[j] -= 1
+                    if hps[j] == 0 and kb == 1:
+                        win |= hit
+                        continue
+                    keep = [k for k in range(kb) if hps[k] > 0]
+                    keep.sort(key=lambda k: -hps[k])
+                    smaller = tuple(hps[k] for k in keep)
+                    table = self.table(smaller, a)
+                    columns = np.concatenate([opp[:, keep], own], axis=1)
+                    fixed.append(np.where(hit, table[index(columns)], 0))
+                    fixed_mask.append(hit)
+        dynamic.append(np.where(miss, index(mirror), -1))
+        for i in range(ka):
+            for slot in range(self.moves.shape[1]):
+                to = self.moves[own[:, i], slot]
+                ok = valid & (to >= 0) & ~(own == to[:, None]).any(axis=1)
+                moved = mirror.copy()
+                moved[:, kb + i] = np.where(ok, to, 0)
+                dynamic.append(np.where(ok, index(moved), -1))
+        return {
+            'n': n, 'valid': valid, 'win': win,
+            'dynamic': np.stack(dynamic, axis=1),
+            'fixed': np.stack(fixed, axis=1).astype(np.int16) if fixed
+            else np.zeros((n, 0), dtype=np.int16),
+            'fixed_mask': np.stack(fixed_mask, axis=1) if fixed_mask
+            else np.zeros((n, 0), dtype=bool),
+        }
+
+
+def _padded(lists):
+    width = max(map(len, lists))
+    return np.array([row + [-1] * (width - len(row)) for row in lists],
+                    dtype=np.intp)
+
+
+def _distinct(columns):
+    ok = np.ones(len(columns), dtype=bool)
+    for i, j in itertools.combinations(range(columns.shape[1]), 2):
+        ok &= columns[:, i] != columns[:, j]
+    return ok
+
+
+def build(field: Field, directory, max_ships=2, max_total=3):
+    """solve all tables with at most max_ships ships on a side and
+    max_total ships in all"""
+    solver = Solver(field, directory)
+    for a in materials(max_ships):
+        for b in materials(max_ships):
+            if len(a) + len(b) <= max_total:
+                solver.table(a, b)
+    return solver
+
+
+class Tablebase:
+    """tables in directory read through memory maps"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'field.json')) as f:
+            self.field = Field.from_json(f.read())
+        self.index = {tuple(p): i for i, p in enumerate(self.field.squares)}
+        self.tables = {}
+
+    def table(self, mover, opponent):
+        key = (mover, opponent)
+        if key not in self.tables:
+            path = os.path.join(self.directory, _name(*key) + '.npy')
+            self.tables[key] = np.load(path, mmap_mode='r') \
+                if os.path.exists(path) else None
+        return self.tables[key]
+
+    def probe(self, mover, opponent):
+        """return the value for the player to move, None if not in tables
+
+        mover, opponent: iterables of (position, hp) of ships afloat
+        """
+        mover = sorted(mover, key=lambda s: -s[1])
+        opponent = sorted(opponent, key=lambda s: -s[1])
+        table = self.table(tuple(s[1] for s in mover),
+                           tuple(s[1] for s in opponent))
+        if table is None:
+            return None
+        i = 0
+        for position, hp in mover + opponent:
+            i = i * len(self.index) + self.index[tuple(position)]
+        return int(table[i])
+
+    def probe_clients(self, clients, c):
+        """probe the state of Client objects with player c to move"""
+        def fleet(client):
+            return [(s.position, s.hp) for s in client.ships.values()]
+        return self.probe(fleet(clients[c]), fleet(clients[1 - c]))
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="solve endgame tables of a field",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("directory", help="directory to save tables")
+    parser.add_argument(
+        "--ships", type=int, default=3,
+        help="maximum number of ships of both players",
+    )
+    parser.add_argument(
+        "--field-width", type=int, default=5,
+        help="width of field",
+    )
+    parser.add_argument(
+        "--field-height", type=int, default=5,
+        help="height of field",
+    )
+    parser.add_argument(
+        "--rounded-field", action='store_true',
+        help="configure corners impassable",
+    )
+    args = parser.parse_args()
+    FORMAT = '%(asctime)s %(levelname)s %(message)s'
+    logging.basicConfig(format=FORMAT, level=logging.INFO, force=True)
+    rocks = []
+    if args.rounded_field:
+        rocks = [[x, y] for x in [0, args.field_width - 1]
+                 for y in [0, args.field_height - 1]]
+    start = time.perf_counter()
+    build(Field(args.field_height, args.field_width, rocks), args.directory,
+          max_ships=args.ships - 1, max_total=args.ships)
+    logging.info(f'done in {time.perf_counter() - start:.1f} s')
@@ -0,0 +1,295 @@
+"""Run many games between two players in a pool of processes.
+
+Players are given by import path, e.g. ``random_player:RandomPlayer``
+for the class RandomPlayer in random_player.py, and each game is played
+in-process by :func:`submarine_py.engine.run_game`.
+
+    $ python -m submarine_py.tournament --path sample --games 100 \\
+          random_player:RandomPlayer original_player:OriginalPlayer
+"""
+from .engine import run_game
+from .field import Field
+from .replay import ReplayWriter
+import concurrent.futures
+import contextlib
+import csv
+import importlib
+import io
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+FIELDS = ['game', 'first', 'second', 'winner', 'turns', 'reason', 'seconds']
+
+
+def load_player(spec: str):
+    """return the Player subclass named by 'module:Class' or 'module.Class'
+
+    >>> load_player('submarine_py:Player').__name__
+    'Player'
+    """
+    if ':' in spec:
+        module, name = spec.split(':', 1)
+    else:
+        module, _, name = spec.rpartition('.')
+    if not module or not name:
+        raise ValueError(f'expects module:Class for player, got {spec}')
+    return getattr(importlib.import_module(module), name)
+
+
+def _init_worker(paths):
+    sys.path[:0] = [p for p in paths if p not in sys.path]
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+class GameTimeout(Exception):
+    """raised in a game running longer than the timeout of play_one()"""
+
+
+def _alarm(signum, frame):
+    raise GameTimeout()
+
+
+@contextlib.contextmanager
+def _deadline(seconds):
+    """raise GameTimeout in the block after seconds
+
+    Only in the main thread on platforms with setitimer, otherwise games
+    are not limited in time.
+    """
+    if not seconds or not hasattr(signal, 'setitimer') \
+            or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def play_one(game_id: int, specs, field_json: str, *, quiet=True,
+             replay=None, timeout=None, log_turns=None):
+    """play a game between specs[0] (first mover) and specs[1]
+
+    The game is appended to the replay file at path replay if given.
+    A game longer than timeout seconds is aborted.  If quiet and the
+    game lasts more than log_turns turns, the standard output of the
+    players is kept in the result as 'output', which is not in FIELDS.
+
+    Returns a dict of the result with keys FIELDS, where 'first' and
+    'second' are the names of the players and 'winner' is 0 if the
+    first mover won, 1 if the second did, and -1 for a draw.  If a
+    player raises an exception, or the game is aborted, 'winner' is -1
+    and 'reason' is 'error' or 'timeout'.
+    """
+    field = Field.from_json(field_json)
+    names = list(specs)
+    winner, turns, reason = -1, 0, 'error'
+    out = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with _deadline(timeout), contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(out))
+            players = [load_player(spec)() for spec in specs]
+            names = [p.name() for p in players]
+            writer = stack.enter_context(ReplayWriter(replay)) if replay \
+                else None
+            winner, turns, reason = run_game(field, players, replay=writer)
+    except GameTimeout:
+        reason = 'timeout'
+        logging.warning(f'game {game_id}: aborted after {timeout} s')
+    except Exception:
+        logging.exception(f'game {game_id}: error')
+    result = {
+        'game': game_id, 'first': names[0], 'second': names[1],
+        'winner': winner,
+        'turns': turns, 'reason': reason,
+        'seconds': round(time.perf_counter() - start, 6),
+    }
+    if quiet and log_turns is not None and turns > log_turns:
+        result['output'] = out.getvalue()
+    return result
+
+
+def error_result(game_id: int, names):
+    """return the result of a game which failed outside play_one()"""
+    return {'game': game_id, 'first': names[0], 'second': names[1],
+            'winner': -1, 'turns': 0, 'reason': 'error', 'seconds': 0.0}
+
+
+def run_tournament(specs, games: int, field: Field, *, workers=None,
+                   output=None, alternate=True, paths=(), replay=None,
+                   timeout=None, log_dir=None, log_turns=80):
+    """play games between two players over a process pool
+
+    specs: import paths of the two players
+    workers: number of processes (default: number of cores)
+    output: path of a CSV file to write a row per game (optional)
+    alternate: swap the first mover in every other game
+    replay: path of a replay file to record the games (optional)
+    timeout: seconds after which a game is aborted (optional)
+    log_dir: directory to save the standard output of the players in
+        games of more than log_turns turns, as GAME_log.txt (optional)
+
+    Returns list of results of play_one() in the order of games.
+    """
+    assert len(specs) == 2
+    workers = workers or os.cpu_count()
+    field_json = field.to_json()
+    order = [list(specs), list(reversed(specs))]
+    results = []
+    writer = None
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        if output:
+            f = stack.enter_context(open(output, 'w', newline=''))
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+        pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(list(paths),)))
+        futures = {
+            pool.submit(play_one, g, order[g % 2 if alternate else 0],
+                        field_json, replay=replay, timeout=timeout,
+                        log_turns=log_turns if log_dir else None): g
+            for g in range(games)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                g = futures[future]
+                logging.exception(f'game {g}: error')
+                result = error_result(g, order[g % 2 if alternate else 0])
+            output = result.pop('output', None)
+            if output is not None:
+                save_log(log_dir, result, output)
+            results.append(result)
+            if writer:
+                writer.writerow(result)
+            logging.info(f'game {result["game"]}: {winner_name(result)} '
+                         f'{result["reason"]} in {result["turns"]} turns')
+    results.sort(key=lambda r: r['game'])
+    return results
+
+
+def save_log(log_dir, result, output):
+    """write output of the players in the game of result to log_dir"""
+    path = os.path.join(log_dir, f'{result["game"]}_log.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'--- Game #{result["game"]} Log ---\n'
+                f'{result["first"]} vs {result["second"]}, '
+                f'winner: {winner_name(result) or "draw"}, '
+                f'reason: {result["reason"]}, turns: {result["turns"]}\n'
+                + '-' * 20 + '\n' + output)
+    logging.info(f'game {result["game"]} took {result["turns"]} turns, '
+                 f'log saved to {path}')
+
+
+def winner_name(result):
+    """return name of the winner in a result of play_one(), '' for draws"""
+    return [result['first'], result['second'], ''][result['winner']]
+
+
+def aborted(result):
+    """return whether the game of a result of play_one() was aborted"""
+    return result.get('reason') in ('error', 'timeout')
+
+
+def summary(results):
+    """return dict of win counts by name ('' for draws), except aborted
+    games
+
+    >>> summary([{'first': 'a', 'second': 'b', 'winner': 0},
+    ...          {'first': 'b', 'second': 'a', 'winner': -1},
+    ...          {'first': 'b', 'second': 'a', 'winner': 1},
+    ...          {'first': 'a', 'second': 'b', 'winner': -1,
+    ...           'reason': 'timeout'}])
+    {'a': 2, '': 1}
+    """
+    count = {}
+    for r in results:
+        if aborted(r):
+            continue
+        name = winner_name(r)
+        count[name] = count.get(name, 0) + 1
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="run games between two players in parallel",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "players", nargs=2,
+        help="import paths of players, e.g., random_player:RandomPlayer",
+    )
+    parser.add_argument(
+        "--games", type=int, default=100,
+        help="number of games",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of processes",
+    )
+    parser.add_argument(
+        "--output", default='results.csv',
+        help="CSV file to write the result of each game",
+    )
+    parser.add_argument(
+        "--replay", default=None,
+        help="file to record games, see python -m submarine_py.replay",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="seconds after which a game is aborted",
+    )
+    parser.add_argument(
+        "--log-dir", default=None,
+        help="directory to save the output of players in long games",
+    )
+    parser.add_argument(
+        "--log-turns", type=int, default=80,
+        help="games of more turns than this are logged in --log-dir",
+    )
+    parser.add_argument(
+        "--path", action='append', default=[],
+        help="directory to search players, e.g., sample",
+    )
+    parser.add_argument(
+        "--no-alternate", action='store_true',
+        help="let the first player always move first",
+    )
+    parser.add_argument(
+        "--field-width", type=int, default=5,
+        help="width of field",
+    )
+    parser.add_argument(
+        "--field-height", type=int, default=5,
+        help="height of field",
+    )
+    args = parser.parse_args()
+    FORMAT = '%(asctime)s %(levelname)s %(message)s'
+    logging.basicConfig(format=FORMAT, level=logging.INFO, force=True)
+    sys.path[:0] = args.path
+    results = run_tournament(
+        args.players, args.games, Field(args.field_height, args.field_width),
+        workers=args.workers, output=args.output,
+        alternate=not args.no_alternate, paths=args.path,
+        replay=args.replay, timeout=args.timeout, log_dir=args.log_dir,
+        log_turns=args.log_turns)
+    for name, wins in summary(results).items():
+        print(f'{name or "draw"}: {wins}')
+    errors = sum(map(aborted, results))
+    if errors:
+        print(f'errors/timeouts: {errors}')
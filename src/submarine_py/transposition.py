@@ -0,0 +1,123 @@
+"""Zobrist hashing of game states and a bounded transposition table.
+
+The hash of a fleet is the XOR of a random 64 bit key per ship afloat,
+drawn for each (ship type, square, hp).  :class:`submarine_py.Client`
+keeps ``Client.hash`` up to date on moves and attacks, and
+``GameControl.hash(c)`` combines the two fleets and the player to move.
+Keys are drawn from a fixed seed, so that hashes agree across processes.
+
+>>> from submarine_py.server import GameControl
+>>> a, b = GameControl(Field()), GameControl(Field())
+>>> a.initialize({"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+...              {"w": [4, 4], "c": [3, 4], "s": [4, 3]})
+>>> b.initialize({"w": [0, 0], "c": [2, 1], "s": [1, 0]},
+...              {"w": [4, 4], "c": [3, 4], "s": [4, 3]})
+>>> _ = a.action_info(0, {"move": {"ship": "c", "to": [2, 1]}})
+>>> a.hash(1) == b.hash(1), a.hash(1) == b.hash(0)
+(True, False)
+"""
+from .field import Field
+from .ship import Ship
+import functools
+import random
+
+MASK = (1 << 64) - 1
+SIDE = random.Random(-1).getrandbits(64)  #: XORed when player 1 is to move
+_MAX_HP = max(Ship.MAX_HPS.values())
+
+
+@functools.lru_cache(maxsize=None)
+def _table(width: int, height: int):
+    rng = random.Random(width * 1000 + height)
+    # hp 0 (a sunk ship) has key 0
+    return {
+        ship_type: {(x, y): [0] + [rng.getrandbits(64) for _ in range(_MAX_HP)]
+                    for y in range(height) for x in range(width)}
+        for ship_type in Ship.MAX_HPS
+    }
+
+
+def zobrist_table(field: Field):
+    """return keys as ``table[ship_type][(x, y)][hp]``"""
+    return _table(field.width, field.height)
+
+
+def zobrist(field: Field, ship_type: str, position, hp: int) -> int:
+    """return the key of a ship of ship_type with hp at position"""
+    return zobrist_table(field)[ship_type][tuple(position)][hp]
+
+
+def fleet_hash(field: Field, ships) -> int:
+    """return the hash of ships (iterable of Ship) afloat"""
+    table = zobrist_table(field)
+    h = 0
+    for ship in ships:
+        if ship.hp > 0:
+            h ^= table[ship.type][ship.position][ship.hp]
+    return h
+
+
+def combine(first: int, second: int, c: int) -> int:
+    """return the hash of a game from the hashes of the fleets of the
+    players and the player c to move"""
+    rotated = ((second << 17) | (second >> 47)) & MASK
+    return first ^ rotated ^ (SIDE if c else 0)
+
+
+class TranspositionTable:
+    """table of size slots mapping hashes of states to values
+
+    A slot holds one entry.  A new entry replaces the one in its slot if
+    that is for the same state, was stored before the last new_search(),
+    or has a depth not greater than the new one; otherwise the new entry
+    is dropped.  Values are any objects, e.g. statistics of a search.
+
+    >>> table = TranspositionTable(4)
+    >>> table.store(5, 'deep', depth=3)
+    >>> table.store(9, 'shallow', depth=1)  # same slot as 5
+    >>> table.probe(5), table.probe(9)
+    ('deep', None)
+    >>> table.new_search()
+    >>> table.store(9, 'shallow', depth=1)
+    >>> table.probe(5), table.probe(9)
+    (None, 'shallow')
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.depths = [0] * size
+        self.ages = [0] * size
+        self.age = 0
+        self.hits = self.misses = 0
+
+    def probe(self, key: int, default=None):
+        """return the value stored for key, or default"""
+        i = key % self.size
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.values[i]
+        self.misses += 1
+        return default
+
+    def store(self, key: int, value, depth=0):
+        i = key % self.size
+        if self.keys[i] is not None and self.keys[i] != key \
+           and self.ages[i] == self.age and self.depths[i] > depth:
+            return
+        self.keys[i] = key
+        self.values[i] = value
+        self.depths[i] = depth
+        self.ages[i] = self.age
+
+    def new_search(self):
+        """mark entries stored so far as replaceable by any new entry,
+        e.g. at each action() of a player"""
+        self.age += 1
+
+    def clear(self):
+        self.__init__(self.size)
+
+    def __len__(self):
+        return self.size - self.keys.count(None)
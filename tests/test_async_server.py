@@ -0,0 +1,92 @@
+from submarine_py import Field, TimeControl, play_game
+from submarine_py.async_server import MatchServer
+from test_engine import ScriptedPlayer
+import asyncio
+
+
+def test_concurrent_games():
+    games = 6
+
+    async def main():
+        server = MatchServer(Field(), games=games, quiet=True)
+        listener = await server.start('localhost', 0)
+        port = listener.sockets[0].getsockname()[1]
+        clients = [
+            asyncio.to_thread(play_game, 'localhost', port,
+                              ScriptedPlayer(f'p{i}'))
+            for i in range(2 * games)
+        ]
+        await asyncio.gather(*clients)
+        return await server.wait_finished()
+
+    win_count = asyncio.run(main())
+    # the first mover sinks the opponent fleet in every game
+    assert sum(win_count.values()) == games
+
+
+def test_persistent_clients():
+    games = 8
+
+    async def main():
+        server = MatchServer(Field(), games=games, quiet=True)
+        listener = await server.start('localhost', 0)
+        port = listener.sockets[0].getsockname()[1]
+        players = [ScriptedPlayer(f'p{i}') for i in range(4)]
+        # clients stay until the server closes the connections
+        clients = [
+            asyncio.to_thread(play_game, 'localhost', port, p, games=100)
+            for p in players
+        ]
+        await asyncio.gather(*clients)
+        await server.wait_finished()
+        return players
+
+    players = asyncio.run(main())
+    assert sum(p.games for p in players) == 2 * games
+
+
+def test_game_time_limit():
+    async def main():
+        control = TimeControl(game=0.3, increment=0.01)
+        server = MatchServer(Field(), games=1, quiet=True,
+                             time_control=control)
+        listener = await server.start('localhost', 0)
+        port = listener.sockets[0].getsockname()[1]
+        # both take 0.1s per move, so the first mover runs out at its
+        # fourth move while it needs six moves to win
+        players = [ScriptedPlayer(f'p{i}', 0.1) for i in range(2)]
+        await asyncio.gather(*[
+            asyncio.to_thread(play_game, 'localhost', port, p)
+            for p in players])
+        await server.wait_finished()
+        return players
+
+    players = asyncio.run(main())
+    last = [p.messages[-1][0] for p in players]
+    assert sorted(m['outcome'] for m in last) == [False, True]
+    loser = last[0] if last[0]['outcome'] is False else last[1]
+    assert loser['clock']['me'] == 0
+    assert 0 < loser['clock']['opponent'] < 0.3
+
+
+def test_binary_protocol():
+    games = 4
+
+    async def main():
+        server = MatchServer(Field(), games=games, quiet=True)
+        listener = await server.start('localhost', 0)
+        port = listener.sockets[0].getsockname()[1]
+        players = [ScriptedPlayer(f'p{i}') for i in range(2)]
+        await asyncio.gather(*[
+            asyncio.to_thread(play_game, 'localhost', port, p, games=games,
+                              binary=(i == 0))
+            for i, p in enumerate(players)])
+        await server.wait_finished()
+        return players
+
+    players = asyncio.run(main())
+    assert [p.games for p in players] == [games, games]
+    assert [len(p.messages) for p in players] == [11 * games] * 2
+    for g in range(games):
+        last = [p.messages[11 * g + 10][0] for p in players]
+        assert sorted(m['outcome'] for m in last) == [False, True]
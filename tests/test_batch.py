@@ -0,0 +1,99 @@
+from submarine_py import Field
+from submarine_py.batch import BatchGame, SHIP_TYPES, ATTACK, MOVE
+from submarine_py.server import GameControl
+import numpy as np
+import pytest
+
+
+def placement(game, g, p):
+    return {t: game.position[g, p, s].tolist()
+            for s, t in enumerate(SHIP_TYPES)}
+
+
+def random_actions(game, rng):
+    """random actions, mostly legal; moves are only for ships afloat"""
+    w, h = game.field.width, game.field.height
+    kind = rng.integers(0, 2, game.n)
+    ship = np.zeros(game.n, dtype=int)
+    to = rng.integers(-1, max(w, h) + 1, (game.n, 2))
+    for g in range(game.n):
+        c = game.turn[g]
+        alive = np.flatnonzero(game.hp[g, c] > 0)
+        src = game.position[g, c]
+        if kind[g] == MOVE:
+            ship[g] = rng.choice(alive)
+            if rng.random() < 0.8:
+                to[g, rng.integers(2)] = src[ship[g], rng.integers(2)]
+        elif rng.random() < 0.8:
+            to[g] = src[rng.choice(alive)] + rng.integers(-1, 2, 2)
+    return kind, ship, to
+
+
+@pytest.mark.parametrize('field', [Field(), Field(4, 6, [[0, 0], [5, 3]])])
+def test_parity_with_game_control(field):
+    rng = np.random.default_rng(1)
+    n = 64
+    batch = BatchGame.random(field, n, rng)
+    games = []
+    for g in range(n):
+        game = GameControl(field)
+        game.initialize(placement(batch, g, 0), placement(batch, g, 1))
+        games.append(game)
+    while not batch.done.all():
+        turn = batch.turn.copy()
+        kind, ship, to = random_actions(batch, rng)
+        result = batch.step(kind, ship, to)
+        for g in np.flatnonzero(result['active']):
+            c = int(turn[g])
+            if kind[g] == ATTACK:
+                act = {"attack": {"to": to[g].tolist()}}
+            else:
+                act = {"move": {"ship": SHIP_TYPES[ship[g]],
+                                "to": to[g].tolist()}}
+            info = games[g].action_info(c, act)
+            assert info[0]["observation"] == \
+                batch.observation(g, c)["observation"]
+            assert result['legal'][g] == ("outcome" not in info[0]
+                                          or info[0]["outcome"])
+            outcome = info[0].get("outcome")
+            if outcome is not None:
+                assert batch.winner[g] == (c if outcome else 1 - c)
+                assert batch.done[g]
+            if result['legal'][g] and kind[g] == ATTACK:
+                attacked = info[1]["result"]["attacked"]
+                hit = attacked.get("hit")
+                assert result['hit'][g] == \
+                    (SHIP_TYPES.index(hit) if hit else -1)
+                assert sorted(attacked["near"]) == sorted(
+                    t for s, t in enumerate(SHIP_TYPES)
+                    if result['near'][g, s])
+            if result['legal'][g] and kind[g] == MOVE:
+                moved = info[1]["result"]["moved"]
+                assert moved["distance"] == result['distance'][g].tolist()
+
+
+def test_invalid_placement():
+    with pytest.raises(ValueError):
+        BatchGame.from_placements(Field(), [(
+            {"w": [0, 0], "c": [0, 0], "s": [1, 0]},
+            {"w": [4, 4], "c": [3, 4], "s": [4, 3]})])
+    with pytest.raises(ValueError):
+        BatchGame.from_placements(Field(), [(
+            {"w": [0, 5], "c": [0, 1], "s": [1, 0]},
+            {"w": [4, 4], "c": [3, 4], "s": [4, 3]})])
+
+
+def test_step_ignores_finished_games():
+    fleet = {"w": [0, 0], "c": [0, 1], "s": [1, 0]}
+    game = BatchGame.from_placements(Field(), [(fleet, fleet)] * 2)
+    result = game.step([ATTACK, ATTACK], [0, 0], [[3, 3], [0, 0]])
+    assert result['legal'].tolist() == [False, True]
+    assert game.winner.tolist() == [1, -1]
+    assert result['hit'].tolist() == [-1, 0]
+    assert result['near'][1].tolist() == [False, True, True]
+    assert game.hp[1, 1].tolist() == [2, 2, 1]
+    result = game.step([MOVE, MOVE], [1, 1], [[0, 4], [0, 4]])
+    assert result['active'].tolist() == [False, True]
+    assert result['distance'].tolist() == [[0, 0], [0, 3]]
+    assert game.position[1, 1, 1].tolist() == [0, 4]
+    assert game.turn.tolist() == [1, 0]
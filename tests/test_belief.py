@@ -0,0 +1,137 @@
+from submarine_py import Field
+from submarine_py.batch import BatchGame, SHIP_TYPES, ATTACK
+from submarine_py.belief import BeliefTracker, JointBelief
+from submarine_py.server import GameControl
+from test_batch import placement, random_actions
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('field', [Field(), Field(4, 6, [[0, 0], [5, 3]])])
+def test_true_positions_stay_possible(field):
+    rng = np.random.default_rng(2)
+    n = 64
+    batch = BatchGame.random(field, n, rng)
+    trackers = [BeliefTracker(field, n) for _ in range(2)]
+    games = []
+    singles = []
+    for g in range(4):
+        game = GameControl(field)
+        game.initialize(placement(batch, g, 0), placement(batch, g, 1))
+        games.append(game)
+        singles.append([BeliefTracker(field) for _ in range(2)])
+    while not batch.done.all():
+        turn = batch.turn.copy()
+        kind, ship, to = random_actions(batch, rng)
+        result = batch.step(kind, ship, to)
+        for p, tracker in enumerate(trackers):
+            tracker.step(kind, ship, to, result, turn == p)
+        for g in np.flatnonzero(result['active'][:4]):
+            c = int(turn[g])
+            if kind[g] == ATTACK:
+                act = {"attack": {"to": to[g].tolist()}}
+            else:
+                act = {"move": {"ship": SHIP_TYPES[ship[g]],
+                                "to": to[g].tolist()}}
+            info = games[g].action_info(c, act)
+            singles[g][c].update(info[0], True)
+            singles[g][1 - c].update(info[1], False)
+        for p, tracker in enumerate(trackers):
+            alive = batch.hp[:, 1 - p] > 0
+            assert (tracker.hp == batch.hp[:, 1 - p]).all()
+            x = batch.position[:, 1 - p, :, 0]
+            y = batch.position[:, 1 - p, :, 1]
+            g, s = np.indices(x.shape)
+            truth = tracker.grid[g, s, x, y]
+            assert (truth[alive] > 0).all()
+            assert (tracker.grid[~alive] == 0).all()
+            total = tracker.grid.sum(axis=(-1, -2))
+            assert np.allclose(total[alive], 1.0)
+            for g in range(4):
+                if not batch.done[g]:
+                    assert np.allclose(singles[g][p].grid[0], tracker.grid[g])
+
+
+def test_attack_and_move():
+    tracker = BeliefTracker(Field())
+    info = {"result": {"attacked": {"position": [2, 2], "near": ["w"]}},
+            "observation": {"opponent": {"w": {"hp": 3}, "c": {"hp": 2},
+                                         "s": {"hp": 1}}}}
+    tracker.update(info, True)
+    w, c, s = tracker.grid[0]
+    assert np.isclose(w[1:4, 1:4].sum(), 1.0) and w[2, 2] == 0
+    assert np.allclose(w[1:4, 1:4][w[1:4, 1:4] > 0], 1 / 8)
+    assert c[1:4, 1:4].sum() == 0 and np.isclose(c[0, 0], 1 / 16)
+    info["result"] = {"moved": {"ship": "w", "distance": [2, 0]}}
+    tracker.update(info, False)
+    w = tracker.grid[0, 0]
+    assert np.isclose(w[3:5, 1:4].sum(), 1.0) and w[4, 2] == 0
+    occupancy = tracker.occupancy()[0]
+    assert occupancy.shape == (5, 5) and occupancy[4, 1] > occupancy[0, 0]
+    near = tracker.near_probability()[0, 0]
+    assert np.isclose(near[4, 2], 1.0)
+    assert np.allclose(tracker.array(), tracker.grid[0])
+
+
+@pytest.mark.parametrize('field, limit', [
+    (Field(), 1_000_000), (Field(4, 6, [[0, 0], [5, 3]]), 1_000_000),
+    (Field(8, 8), 1000)])
+def test_joint_belief(field, limit):
+    rng = np.random.default_rng(3)
+    n = 12
+    batch = BatchGame.random(field, n, rng)
+    games = []
+    beliefs = []
+    for g in range(n):
+        game = GameControl(field)
+        game.initialize(placement(batch, g, 0), placement(batch, g, 1))
+        games.append(game)
+        beliefs.append([JointBelief(field, limit=limit, samples=2000,
+                                    rng=np.random.default_rng(g))
+                        for _ in range(2)])
+    assert beliefs[0][0].exact == (limit > 1000)
+    while not batch.done.all():
+        turn = batch.turn.copy()
+        kind, ship, to = random_actions(batch, rng)
+        result = batch.step(kind, ship, to)
+        for g in np.flatnonzero(result['active'] & ~batch.done):
+            c = int(turn[g])
+            if kind[g] == ATTACK:
+                act = {"attack": {"to": to[g].tolist()}}
+            else:
+                act = {"move": {"ship": SHIP_TYPES[ship[g]],
+                                "to": to[g].tolist()}}
+            info = games[g].action_info(c, act)
+            beliefs[g][c].update(info[0], True)
+            beliefs[g][1 - c].update(info[1], False)
+            for p in range(2):
+                belief = beliefs[g][p]
+                alive = batch.hp[g, 1 - p] > 0
+                truth = batch.position[g, 1 - p]
+                marginals = belief.marginals()
+                assert np.allclose(marginals.sum(axis=(1, 2)), alive)
+                if belief.exact:
+                    same = (belief.positions == truth)[:, alive].all(
+                        axis=(1, 2))
+                    assert same.any()
+                x, y = truth[alive].T
+                assert (belief.occupancy()[x, y] > 0).all()
+                assert belief.sample(3).shape == (3, len(SHIP_TYPES), 2)
+    assert len(beliefs[0][0].array()) == len(SHIP_TYPES)
+
+
+def test_joint_near_is_exact():
+    belief = JointBelief(Field())
+    info = {"result": {"attacked": {"position": [0, 0], "near": ["w", "c"]}},
+            "observation": {"opponent": {"w": {"hp": 3}, "c": {"hp": 2},
+                                         "s": {"hp": 1}}}}
+    belief.update(info, True)
+    # w and c on distinct squares of the 3 around [0, 0], s elsewhere
+    assert len(belief) == 3 * 2 * (25 - 4)
+    marginals = belief.marginals()
+    assert np.allclose(marginals[0, [0, 1, 1], [1, 0, 1]], 1 / 3)
+    assert marginals[2, :2, :2].sum() == 0
+    # an attack of the opponent at [4, 4] needs s around it
+    info["result"] = {"attacked": {"position": [4, 4], "near": []}}
+    belief.update(info, False)
+    assert len(belief) == 3 * 2 * 4
@@ -0,0 +1,49 @@
+from submarine_py import Field, binary, codec
+from submarine_py.server import GameControl
+from submarine_py.clock import TimeControl
+import pytest
+
+
+def roundtrip(status, info):
+    payload = binary.encode_status(status, info)[4:]
+    return binary.decode_status(payload)
+
+
+def normalize(info):
+    """info as received in JSON, with 'near' in the order of ship types"""
+    info = codec.loads(codec.dumps(info))
+    attacked = info.get("result", {}).get("attacked")
+    if attacked:
+        attacked["near"].sort(key=binary.SHIP_TYPES.index)
+    return info
+
+
+def test_status_roundtrip():
+    game = GameControl(Field())
+    game.initialize({"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+                    {"s": [4, 4], "c": [3, 4], "w": [4, 3]})
+    clock = TimeControl(move=1.0).clock()
+    clock.charge(0, 0.25)
+    actions = [
+        {"attack": {"to": [1, 1]}},
+        {"attack": {"to": [4, 4]}},                 # out of range
+        {"move": {"ship": "w", "to": [0, 3]}},
+        {"move": {"ship": "s", "to": [3, 3]}},      # not reachable
+        {"attack": {"to": [3, 4]}},
+        {},
+    ]
+    for c, act in enumerate(actions):
+        for i, info in enumerate(game.copy().action_info(c % 2, act)):
+            if c == 0:
+                info["clock"] = clock.info(i)
+            assert roundtrip("waiting", info) == ("waiting", normalize(info))
+    assert roundtrip("your turn", None) == ("your turn", None)
+    info = game.forfeit_info(0)
+    assert roundtrip("you lose", info[0]) == ("you lose", normalize(info[0]))
+
+
+def test_malformed_frames():
+    assert binary.decode_action(b'\x07\x03') == {}
+    assert binary.decode_placement(b'') == {}
+    with pytest.raises(ValueError):
+        binary.decode_status(b'\x00\x01\x00')
@@ -12,9 +12,9 @@ def test_init():
         _ = Client(field, {"w": [5, 0],  "c": [0, 1],  "s": [0, 0]})
 
     c = Client(field, {"w": [0, 0],  "c": [0, 1],  "s": [1, 0]})
-    assert [0, 0] == c.ships["w"].position
-    assert [0, 1] == c.ships["c"].position
-    assert [1, 0] == c.ships["s"].position
+    assert (0, 0) == c.ships["w"].position
+    assert (0, 1) == c.ships["c"].position
+    assert (1, 0) == c.ships["s"].position
 
 
 def test_client_move():
@@ -27,7 +27,7 @@ def test_client_move():
     assert not c.move("w", [0, 1])
     assert not c.move("w", [1, 1])
     assert {"ship": "w",  "distance": [0,  2]} == c.move("w",  [0, 2])
-    assert [0, 2] == c.ships["w"].position
+    assert (0, 2) == c.ships["w"].position
 
 
 def test_client_attacked():
@@ -60,15 +60,15 @@ def test_client_observation():
     assert ({
         "w": {
             "hp": 3,
-            "position": [0, 0]
+            "position": (0, 0)
         },
         "c": {
             "hp": 2,
-            "position": [0, 1]
+            "position": (0, 1)
         },
         "s": {
             "hp": 1,
-            "position": [1, 0]
+            "position": (1, 0)
         }
     } == c.observation(True))
     assert ({
@@ -98,3 +98,44 @@ def test_client_near():
     c = Client(field, {"w": [0, 0], "c": [0, 1], "s": [1, 0]})
     assert c.near([2, 2]) == []
     assert c.ships["c"], c.near([0, 2])
+
+
+def test_client_legal_actions():
+    field = Field(3, 3)
+
+    c = Client(field, {"w": [0, 0], "c": [2, 2]})
+    assert sorted(c.legal_attacks()) == [
+        (0, 0), (0, 1), (1, 0), (1, 1), (1, 2), (2, 1), (2, 2)]
+    assert sorted(c.legal_moves()) == [
+        ("c", (0, 2)), ("c", (1, 2)), ("c", (2, 0)), ("c", (2, 1)),
+        ("w", (0, 1)), ("w", (0, 2)), ("w", (1, 0)), ("w", (2, 0))]
+    assert len(c.legal_actions()) == 7 + 8
+    for act in c.legal_actions():
+        if "attack" in act:
+            assert c.in_attack_range(act["attack"]["to"])
+
+    # the cache follows moves and sinking
+    c.move("w", [0, 2])
+    assert ("w", (0, 0)) in c.legal_moves()
+    assert (0, 0) not in c.legal_attacks()
+    c.attacked([0, 2])
+    c.attacked([0, 2])
+    c.attacked([0, 2])
+    assert "w" not in c.ships
+    assert sorted(c.legal_attacks()) == [(1, 1), (1, 2), (2, 1), (2, 2)]
+    assert all(ship == "c" for ship, _ in c.legal_moves())
+
+
+def test_client_copy():
+    field = Field()
+
+    c = Client(field, {"w": [0, 0], "c": [0, 1], "s": [1, 0]})
+    d = c.copy()
+    d.move("w", [0, 3])
+    d.attacked([1, 0])
+    assert (0, 0) == c.ships["w"].position
+    assert "s" in c.ships
+    assert c.overlap([0, 0]) is c.ships["w"]
+    assert (0, 3) == d.ships["w"].position
+    assert "s" not in d.ships
+    assert d.overlap([0, 0]) is None
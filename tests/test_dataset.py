@@ -0,0 +1,74 @@
+from submarine_py import Field, run_game
+from submarine_py.dataset import (
+    PLANES, HIT, ATTACKED, SHIPS, export, read_shards, self_play)
+from submarine_py.replay import ReplayWriter, ReplayReader
+from test_engine import ScriptedPlayer, RandomPlayer
+import numpy as np
+import os
+
+
+class CountingBelief:
+    def __init__(self, field):
+        self.results = [0, 0]
+
+    def update(self, info, mine):
+        self.results[mine] += 1
+
+    def array(self):
+        return self.results
+
+
+def test_export(tmp_path):
+    path = tmp_path / 'games.replay'
+    field = Field(5, 5, [[2, 2]])
+    results = []
+    with ReplayWriter(path) as writer:
+        results.append(run_game(field, [ScriptedPlayer(), ScriptedPlayer()],
+                                replay=writer))
+        for seed in range(5):
+            players = [RandomPlayer(seed), RandomPlayer(seed + 100)]
+            results.append(run_game(field, players, replay=writer))
+    total = sum(turns for _, turns, _ in results)
+    with ReplayReader(path) as reader:
+        writer = export(reader, tmp_path / 'data', belief=CountingBelief,
+                        shard_size=16, compress=False)
+    assert writer.samples == total
+    assert len(writer.paths) == (total + 15) // 16
+    shards = list(read_shards(tmp_path / 'data'))
+    assert [len(s['game']) for s in shards[:-1]] == [16] * (len(shards) - 1)
+    data = {key: np.concatenate([s[key] for s in shards])
+            for key in shards[0]}
+    assert data['planes'].shape == (total, len(PLANES), 5, 5)
+    assert data['belief'].shape == (total, 2)
+    # the scripted game: the first mover hits w at [0, 0] three times
+    first = data['game'] == 0
+    assert data['turn'][first].tolist() == list(range(results[0][1]))
+    assert data['outcome'][first].tolist() == [1, -1] * 5 + [1]
+    assert data['action'][first][0].tolist() == [0, 0, 0, 0]
+    planes = data['planes'][first]
+    assert planes[2, HIT, 0, 0] == 1 and planes[4, HIT, 0, 0] == 2
+    assert planes[3, ATTACKED, 0, 0] == 2
+    assert planes[0, SHIPS].sum() == 3
+    assert data['me'][first][-1].tolist() == [[0, -1, -1], [0, -1, -1],
+                                              [1, 1, 0]]
+    assert data['opponent'][first][-1].tolist() == [0, 0, 1]
+    assert data['belief'][first][:3].tolist() == [[0, 0], [1, 0], [1, 1]]
+
+
+def test_self_play(tmp_path):
+    paths = [os.path.join(os.path.dirname(__file__), '..', 'sample')]
+    replays = self_play(['random_player:RandomPlayer'] * 2, 4, Field(),
+                        workers=2, paths=paths)
+    writer = export(replays, tmp_path, shard_size=100000)
+    assert len(writer.paths) == 1
+    data = next(read_shards(tmp_path))
+    assert 'belief' not in data
+    assert sorted(set(data['game'].tolist())) == [0, 1, 2, 3]
+    assert set(data['outcome'].tolist()) <= {-1, 0, 1}
+
+
+def test_self_play_errors():
+    # every game fails at an action of the crasher and is skipped
+    replays = self_play(['test_engine:ScriptedPlayer',
+                         'test_tournament:Crasher'], 3, Field(), workers=2)
+    assert list(replays) == []
@@ -0,0 +1,100 @@
+from submarine_py import Player, Field, run_game
+import json
+import random
+import time
+
+
+class ScriptedPlayer(Player):
+    '''attack squares in a fixed order; both sides place ships alike
+
+    The first mover wins at the 11th turn.  delay: seconds to sleep
+    before each action
+    '''
+    placement = {"w": [0, 0], "c": [0, 1], "s": [1, 0]}
+    targets = [[0, 0]] * 3 + [[0, 1]] * 2 + [[1, 0]]
+
+    def __init__(self, name='scripted', delay=0):
+        super().__init__()
+        self.my_name = name
+        self.delay = delay
+        self.turn = 0
+        self.games = 0
+        self.messages = []      #: (message, status) received
+
+    def name(self):
+        return self.my_name
+
+    def place_ship(self):
+        self.turn = 0
+        self.games += 1
+        return self.placement
+
+    def action(self):
+        if self.delay:
+            time.sleep(self.delay)
+        to = self.targets[self.turn % len(self.targets)]
+        self.turn += 1
+        return json.dumps(self.attack(to))
+
+    def update(self, json_, info):
+        super().update(json_, info)
+        self.messages.append((self.last_msg, info))
+
+
+class RandomPlayer(Player):
+    def __init__(self, seed):
+        super().__init__()
+        self.rng = random.Random(seed)
+
+    def name(self):
+        return 'random'
+
+    def place_ship(self):
+        ps = self.rng.sample(self.field.squares, 3)
+        return {'w': ps[0], 'c': ps[1], 's': ps[2]}
+
+    def action(self):
+        if self.rng.random() < 0.5:
+            ship = self.rng.choice(list(self.ships.values()))
+            to = self.rng.choice(self.field.squares)
+            while not ship.is_reachable(to) or self.overlap(to):
+                to = self.rng.choice(self.field.squares)
+            return json.dumps(self.move(ship.type, to))
+        to = self.rng.choice(self.field.squares)
+        while not self.in_attack_range(to):
+            to = self.rng.choice(self.field.squares)
+        return json.dumps(self.attack(to))
+
+
+def test_first_mover_wins():
+    players = [ScriptedPlayer(), ScriptedPlayer()]
+    assert run_game(Field(), players) == (0, 11, 'sunk')
+    first, second = players
+    assert first.messages[0][1] == 'your turn'
+    assert second.messages[0][1] == 'waiting'
+    assert first.messages[-1][0]['outcome'] is True
+    assert second.messages[-1][0]['outcome'] is False
+    assert second.messages[0][0]['result']['attacked'] == {
+        'position': [0, 0], 'hit': 'w', 'near': ['c', 's']
+    }
+
+
+def test_illegal_action():
+    class Cheater(ScriptedPlayer):
+        targets = [[4, 4]]
+    assert run_game(Field(), [Cheater(), ScriptedPlayer()]) \
+        == (1, 1, 'illegal')
+
+
+def test_parsed_messages():
+    for seed in range(1, 20):
+        players = [RandomPlayer(seed), RandomPlayer(seed + 100)]
+        expected = run_game(Field(), players)
+        players = [RandomPlayer(seed), RandomPlayer(seed + 100)]
+        assert run_game(Field(), players, parsed=True) == expected
+        assert expected[2] == 'sunk'
+
+
+def test_limit():
+    players = [RandomPlayer(1), RandomPlayer(2)]
+    assert run_game(Field(), players, limit=2) == (-1, 2, 'draw')
@@ -0,0 +1,102 @@
+from submarine_py import Field
+from submarine_py.batch import SHIP_TYPES, ATTACK, MOVE
+from submarine_py.dataset import Observation
+from submarine_py.env import SubmarineEnv, VectorEnv, decode, encode, _act
+from submarine_py.server import GameControl
+from test_engine import RandomPlayer
+import numpy as np
+import pytest
+
+
+def random_legal(mask, rng):
+    keys = rng.random(mask.shape)
+    keys[~mask] = -1
+    return keys.argmax(axis=-1)
+
+
+@pytest.mark.parametrize('first', [True, False])
+def test_single(first):
+    rng = np.random.default_rng(1)
+    env = SubmarineEnv(Field(4, 6, [[0, 0]]), RandomPlayer(1), first=first,
+                       seed=1)
+    rewards = []
+    for _ in range(10):
+        obs, info = env.reset()
+        assert obs['planes'].shape == (6, 6, 4)
+        while True:
+            action = random_legal(info['action_mask'], rng)
+            obs, reward, terminated, truncated, info = env.step(action)
+            if terminated or truncated:
+                break
+            assert reward == 0
+        rewards.append(reward)
+    assert set(rewards) <= {-1.0, 1.0}
+    with pytest.raises(RuntimeError):
+        env.step(0)
+
+
+def test_illegal_action_loses():
+    env = SubmarineEnv(seed=2)
+    obs, info = env.reset()
+    action = np.flatnonzero(~info['action_mask'])[0]
+    _, reward, terminated, _, _ = env.step(action)
+    assert reward == -1 and terminated
+
+
+def test_truncated():
+    env = SubmarineEnv(limit=3, seed=3)
+    obs, info = env.reset()
+    _, _, terminated, truncated, info = env.step(
+        np.flatnonzero(info['action_mask'])[-1])
+    assert not terminated and not truncated and info['turns'] == 2
+    _, reward, terminated, truncated, _ = env.step(
+        np.flatnonzero(info['action_mask'])[-1])
+    assert (reward, terminated, truncated) == (0.0, False, True)
+
+
+def test_vector_parity():
+    """observations of VectorEnv agree with GameControl and Observation"""
+    field = Field(4, 5, [[2, 2]])
+    rng = np.random.default_rng(4)
+    env = VectorEnv(field, 16, seed=4)
+    obs, info = env.reset()
+
+    def mirror(g):
+        game = GameControl(field)
+        game.initialize(*[{t: env.game.position[g, p, s].tolist()
+                           for s, t in enumerate(SHIP_TYPES)}
+                          for p in range(2)])
+        return game, Observation(field, game.observation(0))
+    games = [mirror(g) for g in range(env.num_envs)]
+    finished = 0
+    for _ in range(200):
+        actions = random_legal(info['action_mask'], rng)
+        actions[0] = 99         # illegal move of the submarine
+        for g, (game, observation) in enumerate(games):
+            expected = [encode(field, ATTACK, 0, to)
+                        for to in game.clients[0].legal_attacks()] + [
+                encode(field, MOVE, SHIP_TYPES.index(t), to)
+                for t, to in game.clients[0].legal_moves()]
+            assert np.flatnonzero(info['action_mask'][g]).tolist() \
+                == sorted(expected)
+        obs, reward, terminated, truncated, info = env.step(actions)
+        for g, (game, observation) in enumerate(games):
+            result = game.action_info(0, _act(*decode(field, actions[g])))
+            observation.update(result[0], True)
+            if "outcome" not in result[0]:
+                reply = info['opponent_action'][g]
+                result = game.action_info(1, _act(*decode(field, reply)))
+                observation.update(result[1], False)
+                result.reverse()
+            if "outcome" in result[0]:
+                assert terminated[g]
+                assert reward[g] == (1 if result[0]["outcome"] else -1)
+                games[g] = mirror(g)
+                finished += 1
+                continue
+            assert not terminated[g] and reward[g] == 0
+            me, opponent, planes = observation.arrays()
+            assert (obs['me'][g] == me).all()
+            assert (obs['opponent'][g] == opponent).all()
+            assert (obs['planes'][g] == planes).all()
+    assert finished > 16
@@ -1,4 +1,8 @@
 from submarine_py import Field
+from submarine_py.field import ReportObserver
+from submarine_py.server import GameControl
+from submarine_py import codec
+import json
 import pytest
 
 
@@ -27,3 +31,82 @@ def test_rock():
 
     with pytest.raises(ValueError):
         _ = Field(3, 2, [0, 0])
+
+
+def test_bitboard():
+    field = Field(3, 4, [[1, 1]])
+    assert field.index([1, 1]) == -1
+    assert field.bit([1, 1]) == 0
+    assert field.bit([5, 0]) == 0
+    assert field.bit([3, 2]) == 1 << 11
+    for sq in field.squares:
+        assert field.position(field.index(sq)) == tuple(sq)
+        around = field.squares_of(field.attack_mask(sq))
+        assert sorted(around) == sorted(
+            tuple(p) for p in field.squares
+            if abs(p[0] - sq[0]) <= 1 and abs(p[1] - sq[1]) <= 1)
+        reach = field.squares_of(field.reach_mask(sq))
+        assert sorted(reach) == sorted(
+            tuple(p) for p in field.squares if p[0] == sq[0] or p[1] == sq[1])
+
+
+def test_large_field():
+    field = Field(100, 200)
+    assert field.passable([199, 99])
+    assert not field.passable([99, 199])
+    assert field.bit([199, 99]) == 1 << (99 * 200 + 199)
+    assert len(field.squares_of(field.reach_mask([3, 4]))) == 299
+
+
+def test_report_observer(capsys):
+    field = Field()
+    game = GameControl(field)
+    game.initialize({"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+                    {"w": [4, 4], "c": [3, 4], "s": [4, 3]})
+    observer = ReportObserver(maxsize=2, interval=1.0)
+    frames = 50
+    for _ in range(frames):
+        observer.report_field(field, game.initial_condition(0), 0)
+    dropped = observer.close()
+    # at most the first and the last frames are rendered
+    assert frames - 2 <= dropped < frames
+    assert observer.rendered == frames - dropped
+    assert 'w3' in capsys.readouterr().out
+
+
+def test_numpy_integers():
+    np = pytest.importorskip('numpy')
+    field = Field()
+    assert field.passable([np.int64(1), np.int8(2)])
+    assert field.index((np.int32(4), np.int64(4))) == 24
+    assert not field.passable([np.int64(5), np.int64(0)])
+    assert not field.passable([True, 0])
+    # integral floats as before, e.g., 1.0 in JSON
+    assert field.passable([1.0, 2])
+    assert field.index([np.float64(4.0), 4]) == 24
+    assert not field.passable([1.5, 2])
+    game = GameControl(field)
+    game.initialize({"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+                    {"w": [4, 4], "c": [3, 4], "s": [4, 3]})
+    info = game.action_info(0, {"attack": {"to": [np.int64(1), np.int64(1)]}})
+    assert "outcome" not in info[0]
+    assert info[0]["result"]["attacked"]["position"] == [1, 1]
+    info = game.action_info(
+        1, {"move": {"ship": "w", "to": [np.int64(4), np.int64(2)]}})
+    assert info[1]["result"]["moved"]["distance"] == [0, -2]
+    assert json.loads(codec.dumps(info[0]))["observation"]["me"]["w"] \
+        == {"hp": 3, "position": [4, 2]}
+
+
+def test_malformed_actions():
+    game = GameControl(Field())
+    game.initialize({"w": [0, 0], "c": [0, 1], "s": [1, 0]},
+                    {"w": [4, 4], "c": [3, 4], "s": [4, 3]})
+    # lose as illegal actions, without changing the state
+    for act in ['not json', '[1, 2]', '{"attack": 5}', '{"attack": {}}',
+                '{"move": {"ship": "x", "to": [0, 2]}}',
+                '{"move": {"ship": ["w"], "to": [0, 2]}}',
+                {"move": {"to": [0, 2]}}]:
+        info = game.action_info(0, act)
+        assert info[0]["outcome"] is False and info[1]["outcome"] is True
+        assert info[0]["observation"]["me"]["w"]["position"] == (0, 0)
@@ -0,0 +1,71 @@
+from submarine_py import Field
+from submarine_py.league import League, Glicko, Pairing
+import csv
+
+
+def test_glicko_update():
+    glicko = Glicko()
+    for _ in range(10):
+        glicko.update('a', 'b', 1)
+    assert glicko['a'].r > 1500 > glicko['b'].r
+    assert glicko['a'].rd < 350
+    low, high = glicko['a'].interval()
+    assert low < glicko['a'].r < high
+
+
+def test_pairing_settled():
+    pairing = Pairing('a', 'b')
+    pairing.wins = 5
+    assert not pairing.settled(10)
+    pairing.wins = 10
+    assert pairing.settled(10)
+    pairing.wins, pairing.losses = 5, 5
+    assert not pairing.settled(10)
+    assert [pairing.next_order() for _ in range(3)] \
+        == [('a', 'b'), ('b', 'a'), ('a', 'b')]
+
+
+def test_league(tmp_path):
+    output = tmp_path / 'league.csv'
+    players = {
+        'scripted': 'test_engine:ScriptedPlayer',
+        'cheater': 'test_tournament:Cheater',
+        'cheater2': 'test_tournament:Cheater',
+    }
+    league = League(players, Field(), games=50, min_games=8, workers=2,
+                    output=output)
+    table = league.run()
+    assert table[0]['name'] == 'scripted'
+    # scripted always wins, so its pairings stop early
+    assert table[0]['score'] == table[0]['games'] < 100
+    for p in league.pairings.values():
+        if 'scripted' in (p.a, p.b):
+            assert p.settled(8)
+    with open(output) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(league.results)
+    assert {r['first'] for r in rows} == set(players)
+
+
+def test_aborted_games():
+    players = {'scripted': 'test_engine:ScriptedPlayer',
+               'crasher': 'test_tournament:Crasher'}
+    league = League(players, Field(), games=4, min_games=2, workers=1)
+    table = league.run()
+    # every game fails at an action of the crasher
+    assert [r['reason'] for r in league.results] == ['error'] * 4
+    pairing, = league.pairings.values()
+    assert pairing.games == 0 and pairing.aborted == 4
+    assert [row['games'] for row in table] == [0, 0]
+    assert league.glicko['crasher'].r == league.elo['crasher'] == 1500
+
+
+def test_swiss():
+    players = {'scripted': 'test_engine:ScriptedPlayer'}
+    players.update({f'cheater{i}': 'test_tournament:Cheater'
+                    for i in range(3)})
+    league = League(players, Field(), games=4, min_games=4, workers=1)
+    table = league.run('swiss', rounds=2)
+    # no pairing repeats in the second round
+    assert len(league.pairings) == 4
+    assert [row['games'] for row in table] == [8] * 4
@@ -0,0 +1,40 @@
+from submarine_py import Field, run_game
+from submarine_py.mcts import MCTSPlayer
+from test_engine import RandomPlayer
+import time
+
+
+def test_beats_random_player():
+    wins = 0
+    for seed in range(4):
+        mcts = MCTSPlayer(budget=10.0, iterations=40, seed=seed + 1)
+        players = [mcts, RandomPlayer(seed)]
+        if seed % 2:
+            players.reverse()
+        winner, turns, reason = run_game(Field(), players)
+        wins += players[winner] is mcts if winner >= 0 else 0
+        assert mcts.searched == 40
+    assert wins >= 3
+
+
+def test_time_budget():
+    mcts = MCTSPlayer(budget=0.02, seed=1)
+    mcts.initialize(Field())
+    start = time.perf_counter()
+    mcts.action()
+    assert time.perf_counter() - start < 0.02 + 0.05
+    assert mcts.searched > 0
+    mcts.last_msg = {"clock": {"elapsed": 0.0, "me": 0.1, "opponent": 1.0}}
+    assert mcts.time_limit() == 0.005
+
+
+def test_tablebase(tmp_path):
+    from submarine_py.tablebase import build
+    build(Field(), tmp_path, max_ships=1, max_total=2)
+    mcts = MCTSPlayer(budget=10.0, iterations=20, tablebase=tmp_path)
+    mcts.initialize(Field())
+    assert mcts.tablebase is not None
+    mcts.action()
+    other = MCTSPlayer(tablebase=tmp_path)
+    other.initialize(Field(4, 4))
+    assert other.tablebase is None
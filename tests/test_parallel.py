@@ -0,0 +1,54 @@
+from submarine_py import Field, run_game
+from submarine_py.mcts import MCTSPlayer
+from submarine_py import parallel
+from submarine_py.parallel import RootParallel
+from multiprocessing import shared_memory
+from test_engine import RandomPlayer
+import numpy as np
+import pytest
+
+
+def count(arrays, offset, *, seed):
+    return {'total': int(arrays['a'].sum()) + offset,
+            'rows': len(arrays['b']), seed: 1}
+
+
+def test_root_parallel():
+    a = np.arange(12, dtype=np.int16).reshape(3, 2, 2)
+    b = np.zeros((0, 3))
+    with RootParallel(workers=2) as parallel:
+        visits = parallel.search(count, {'a': a, 'b': b}, (1,), searches=3)
+        assert visits['total'] == 3 * (int(a.sum()) + 1)
+        assert visits['rows'] == 0
+        assert len(visits) == 2 + 3     # distinct seeds
+        visits = parallel.search(count, {'a': a[:1], 'b': b}, (0,))
+        assert visits['total'] == 2 * int(a[:1].sum())
+
+
+def test_parallel_mcts_player():
+    with MCTSPlayer(budget=0.02, seed=1, workers=2) as mcts:
+        winner, turns, reason = run_game(Field(), [mcts, RandomPlayer(1)])
+        assert mcts.parallel.pool is not None
+    assert mcts.parallel.pool is None
+    assert reason == 'sunk'
+
+
+def test_shared_arrays_failure(monkeypatch):
+    created = []
+
+    class Memory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self.name)
+
+    def broken(*args):
+        raise ValueError('broken')
+
+    monkeypatch.setattr(parallel.shared_memory, 'SharedMemory', Memory)
+    monkeypatch.setattr(parallel, '_view', broken)
+    with pytest.raises(ValueError):
+        parallel.SharedArrays({'a': np.zeros(2, np.int16)})
+    # the block is unlinked when the copy fails
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
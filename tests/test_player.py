@@ -29,9 +29,9 @@ def test_init():
     field = Field()
     p = MocPlayer({"w": [0, 0], "c": [0, 1], "s": [1, 0]})
     p.initialize(field)
-    assert [0, 0] == p.ships["w"].position
-    assert [0, 1] == p.ships["c"].position
-    assert [1, 0] == p.ships["s"].position
+    assert (0, 0) == p.ships["w"].position
+    assert (0, 1) == p.ships["c"].position
+    assert (1, 0) == p.ships["s"].position
 
 
 def test_ships_to_json():
@@ -68,7 +68,7 @@ def test_update():
     })
     p.update(json_, 'your turn')
     assert 2 == p.ships["w"].hp
-    assert [0, 4] == p.ships["c"].position
+    assert (0, 4) == p.ships["c"].position
 
 
 def test_move():
@@ -82,7 +82,7 @@ def test_move():
             "to": [0, 2]
         }
     } == p.move("w", [0, 2]))
-    assert [0, 2] == p.ships["w"].position
+    assert (0, 2) == p.ships["w"].position
 
 
 def test_attack():
@@ -100,3 +100,27 @@ def test_overlap():
 
     assert p.overlap([1, 1]) is None
     assert p.ships["w"] == p.overlap([0, 0])
+
+
+def test_legal_actions():
+    field = Field(3, 3, [[1, 1]])
+    p = MocPlayer({"w": [0, 0], "c": [0, 1]})
+    p.initialize(field)
+
+    assert sorted(p.legal_attacks()) == [(0, 0), (0, 1), (0, 2), (1, 0),
+                                         (1, 2)]
+    assert sorted(p.legal_moves()) == [
+        ("c", (0, 2)), ("c", (2, 1)),
+        ("w", (0, 2)), ("w", (1, 0)), ("w", (2, 0))]
+    assert not p.in_attack_range([1, 1])
+
+    p.move("c", [2, 1])
+    assert ("c", (0, 1)) in p.legal_moves()
+    assert (2, 2) in p.legal_attacks()
+
+    p.update(json.dumps({
+        "observation": {"me": {"w": {"hp": 3, "position": [2, 0]}}}
+    }), 'waiting')
+    assert sorted(p.legal_attacks()) == [(1, 0), (2, 0), (2, 1)]
+    assert sorted(p.legal_moves()) == [
+        ("w", (0, 0)), ("w", (1, 0)), ("w", (2, 1)), ("w", (2, 2))]
@@ -0,0 +1,47 @@
+from submarine_py import Field, run_game
+from submarine_py.replay import ReplayWriter, ReplayReader, verify
+from test_engine import ScriptedPlayer, RandomPlayer
+
+
+def test_record_and_verify(tmp_path):
+    path = tmp_path / 'games.replay'
+    field = Field(5, 5, [[2, 2]])
+    results = []
+    with ReplayWriter(path) as writer:
+        for seed in range(20):
+            players = [RandomPlayer(seed), RandomPlayer(seed + 100)]
+            results.append(run_game(field, players, replay=writer))
+        results.append(run_game(field, [ScriptedPlayer(), ScriptedPlayer()],
+                                replay=writer))
+    with ReplayReader(path) as reader:
+        assert len(reader) == len(results)
+        for replay, (winner, turns, reason) in zip(reader, results):
+            assert (replay.winner, replay.turns, replay.reason) \
+                == (winner, turns, reason)
+            assert replay.field().to_json() == field.to_json()
+            assert verify(replay) is None
+        last = reader[-1]
+        assert last.placements()[0] == ScriptedPlayer.placement
+        assert next(last.actions()) == {"attack": {"to": [0, 0]}}
+        assert last.turn_array()['hit'][:3].tolist() == [0, 0, 0]
+        del last, replay
+
+
+def test_broken_record(tmp_path):
+    path = tmp_path / 'games.replay'
+    with ReplayWriter(path) as writer:
+        for _ in range(2):
+            run_game(Field(), [ScriptedPlayer(), ScriptedPlayer()],
+                     replay=writer)
+    data = path.read_bytes()
+    path.write_bytes(data[:-5])
+    with ReplayReader(path) as reader:
+        assert len(reader) == 1
+        replay = reader[0]
+        # a tampered action is detected
+        tampered = bytearray(replay.data)
+        start = replay.result_offset + 6
+        tampered[start + 2:start + 6] = b'\x00\x04\x00\x04'
+        replay.data = memoryview(bytes(tampered))
+        assert verify(replay).startswith('turn 0')
+        del replay
@@ -0,0 +1,169 @@
+from submarine_py import Field, Protocol, TimeControl, play_game, server_main
+from submarine_py.replay import ReplayReader, verify
+from test_engine import ScriptedPlayer
+import json
+import socket
+import threading
+import time
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def connect(port, player, **kwargs):
+    """play_game, retrying until the server thread starts listening"""
+    for _ in range(100):
+        try:
+            return play_game('localhost', port, player, **kwargs)
+        except ConnectionRefusedError:
+            time.sleep(0.01)
+    raise RuntimeError('server not started')
+
+
+def connect_raw(port, name=None):
+    """return a file of a socket which sends name (if any) and no more"""
+    for _ in range(100):
+        try:
+            sock = socket.create_connection(('localhost', port), timeout=5)
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.01)
+    file = sock.makefile('rwb')
+    sock.close()
+    assert file.readline().decode().rstrip() == Protocol.greeting
+    if name:
+        file.write(name.encode() + b'\n')
+        file.flush()
+    return file
+
+
+def test_handshake_and_placement_timeouts():
+    port = free_port()
+    server = threading.Thread(target=server_main, args=(
+        'localhost', port, 2, Field()), kwargs={
+            'quiet': True, 'time_control': TimeControl(move=0.2),
+            'handshake_timeout': 0.2})
+    server.start()
+    # closed without a name
+    silent = connect_raw(port)
+    assert silent.readline() == b''
+    # the first game is aborted by an invalid placement and a missing one
+    idle = [connect_raw(port, f'idle{i}') for i in range(2)]
+    for file in idle:
+        assert file.readline().startswith(b'{')       # field
+    idle[0].write(b'{"w": [9, 9]}\n')
+    idle[0].flush()
+    for file in idle:
+        assert file.readline() == b''
+    # and the server goes on to the next game
+    players = [ScriptedPlayer(f'p{i}') for i in range(2)]
+    first = threading.Thread(target=connect, args=(port, players[0]))
+    first.start()
+    connect(port, players[1])
+    first.join()
+    server.join()
+    assert sorted(p.messages[-1][0]['outcome'] for p in players) \
+        == [False, True]
+
+
+def test_persistent_connections():
+    port = free_port()
+    server = threading.Thread(target=server_main, args=(
+        'localhost', port, 5, Field()), kwargs={'quiet': True})
+    server.start()
+    # the first player keeps the connection, the others play one game each
+    persistent = ScriptedPlayer('persistent')
+    others = [ScriptedPlayer(f'single{i}') for i in range(5)]
+    first = threading.Thread(target=connect, args=(port, persistent),
+                             kwargs={'games': 5})
+    first.start()
+    for p in others:
+        connect(port, p)
+    first.join()
+    server.join()
+    assert persistent.games == 5
+    assert [p.games for p in others] == [1] * 5
+
+
+def test_move_time_limit(tmp_path):
+    port = free_port()
+    replay = tmp_path / 'games.replay'
+    server = threading.Thread(target=server_main, args=(
+        'localhost', port, 1, Field()), kwargs={
+            'quiet': True, 'time_control': TimeControl(move=0.1),
+            'replay': replay})
+    server.start()
+    slow = ScriptedPlayer('slow', 0.5)
+    fast = ScriptedPlayer('fast')
+    first = threading.Thread(target=connect, args=(port, slow))
+    first.start()
+    connect(port, fast)
+    first.join()
+    server.join()
+    # the first mover is too slow and forfeits
+    assert slow.messages[-1][0]['outcome'] is False
+    assert fast.messages[-1][0]['outcome'] is True
+    clock = fast.messages[-1][0]['clock']
+    assert clock['elapsed'] >= 0.1
+    assert clock['me'] is None
+    with ReplayReader(replay) as reader:
+        assert [r.reason for r in reader] == ['forfeit']
+        assert verify(reader[0]) is None
+
+
+def test_binary_protocol():
+    port = free_port()
+    server = threading.Thread(target=server_main, args=(
+        'localhost', port, 3, Field()), kwargs={'quiet': True})
+    server.start()
+    # a binary client playing three games against text clients
+    compact = ScriptedPlayer('binary')
+    first = threading.Thread(target=connect, args=(port, compact),
+                             kwargs={'games': 3, 'binary': True})
+    first.start()
+    others = [ScriptedPlayer(f'text{i}') for i in range(3)]
+    for p in others:
+        connect(port, p)
+    first.join()
+    server.join()
+    assert compact.games == 3
+    # the first mover wins at the 11th turn
+    assert len(compact.messages) == 33
+    for p in others:
+        assert len(p.messages) == 11
+        assert p.messages[-1][0]['outcome'] != compact.messages[-1][0]['outcome']
+
+
+def test_timings(tmp_path, capsys):
+    path = tmp_path / 'timings.jsonl'
+    port = free_port()
+    server = threading.Thread(target=server_main, args=(
+        'localhost', port, 2, Field()), kwargs={
+            'quiet': True, 'timings': True, 'timings_file': str(path)})
+    server.start()
+    compact = ScriptedPlayer('binary')
+    first = threading.Thread(target=connect, args=(port, compact),
+                             kwargs={'games': 2, 'binary': True})
+    first.start()
+    for i in range(2):
+        connect(port, ScriptedPlayer(f'text{i}'))
+    first.join()
+    server.join()
+    games = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [g['game'] for g in games] == [0, 1]
+    for g in games:
+        # either client may connect first
+        assert 'binary' in g['players'] and g['winner'] == 0
+        phases = g['phases']
+        # the first mover wins at the 11th turn
+        assert phases['think1']['count'] == 6
+        assert phases['think2']['count'] == 5
+        assert phases['engine']['count'] == 11
+        assert sum(phases['engine']['buckets'].values()) == 11
+        assert phases['serialize']['count'] >= 11
+        assert phases['send']['count'] >= 22
+    out = capsys.readouterr().out
+    assert 'think1' in out and 'engine' in out
@@ -8,13 +8,13 @@ def test_init():
     w = Ship('w', [1, 1])
     assert "w" == w.type
     assert 3 == w.hp
-    assert [1, 1] == w.position
+    assert (1, 1) == w.position
 
 
 def test_moved():
     w = Ship("w", [1, 1])
     w.move_to([1, 2])
-    assert w.position == [1, 2]
+    assert w.position == (1, 2)
 
 
 def test_damaged():
@@ -36,3 +36,13 @@ def test_can_attack():
     assert w.in_attack_range([3, 1])
     assert w.in_attack_range([3, 3])
     assert not w.in_attack_range([2, 0])
+
+
+def test_copy():
+    w = Ship("w", [1, 1])
+    v = w.copy()
+    v.move_to([1, 2])
+    v.deal_damage(1)
+    assert w.position == (1, 1) and w.hp == 3
+    assert Ship.from_dict(v.to_dict()).to_dict() == v.to_dict()
+    assert not hasattr(w, '__dict__')
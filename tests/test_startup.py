@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+
+def imported_modules(code):
+    out = subprocess.run(
+        [sys.executable, '-c', code + '\nimport sys\nprint(*sys.modules)'],
+        check=True, capture_output=True, text=True).stdout
+    return set(out.split())
+
+
+def test_client_import_is_light():
+    modules = imported_modules('from submarine_py import Player, play_game')
+    heavy = {'tabulate', 'socket', 'asyncio', 'numpy',
+             'submarine_py.server', 'submarine_py.async_server'}
+    assert not modules & heavy
+
+
+def test_lazy_names():
+    import submarine_py
+    for name in submarine_py.__all__:
+        assert getattr(submarine_py, name).__name__ == name
+    assert set(submarine_py.__all__) <= set(dir(submarine_py))
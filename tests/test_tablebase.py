@@ -0,0 +1,76 @@
+from submarine_py import Field
+from submarine_py.mcts import apply, legal_actions
+from submarine_py.server import Client
+from submarine_py.tablebase import build, Tablebase
+import functools
+import itertools
+import random
+
+
+def fleet(field, ships):
+    """return Client of ships given as list of (position, hp)"""
+    client = Client(field, {t: p for t, (p, hp) in zip('wcs', ships)})
+    for t, (p, hp) in zip('wcs', ships):
+        client.ships[t].hp = hp
+    return client
+
+
+def search(field, mover, opponent, depth):
+    """value of the tablebase by exhaustive search, 0 if beyond depth"""
+    @functools.lru_cache(maxsize=None)
+    def value(mover, opponent, depth):
+        clients = [fleet(field, mover), fleet(field, opponent)]
+        children = []
+        for action in legal_actions(clients[0]):
+            copies = [clients[0].copy(), clients[1].copy()]
+            if apply(copies, 0, action):
+                return 1
+            children.append((state(copies[1]), state(copies[0])))
+        if depth == 1:
+            return 0
+        values = [value(*child, depth - 1) for child in children]
+        losses = [v for v in values if v < 0]
+        if losses:
+            return 1 - max(losses)
+        if all(v > 0 for v in values):
+            return -1 - max(values)
+        return 0
+
+    def state(client):
+        return tuple(sorted(((s.position, s.hp)
+                             for s in client.ships.values()),
+                            key=lambda s: -s[1]))
+    return value(tuple(mover), tuple(opponent), depth)
+
+
+def test_against_search(tmp_path):
+    field = Field(3, 4, [[0, 0]])
+    build(field, tmp_path, max_ships=2, max_total=3)
+    tablebase = Tablebase(tmp_path)
+    rng = random.Random(1)
+    found = set()
+    for mover, opponent in [((1,), (1, 1)), ((1, 1), (1,)), ((2,), (1,)),
+                            ((3,), (2, 1)), ((2, 1), (2,))]:
+        placements = [p for p in itertools.permutations(
+            [tuple(p) for p in field.squares], len(mover) + len(opponent))]
+        for squares in rng.sample(placements, 15):
+            own = list(zip(squares, mover))
+            other = list(zip(squares[len(mover):], opponent))
+            value = tablebase.probe(own, other)
+            expected = search(field, own, other, 4)
+            assert value == expected or (abs(value) > 4 and expected == 0)
+            found.add(value)
+    assert {1, -2, 0} <= found
+
+
+def test_probe(tmp_path):
+    field = Field(5, 5, [[0, 0], [4, 0], [0, 4], [4, 4]])
+    build(field, tmp_path, max_ships=1, max_total=2)
+    tablebase = Tablebase(tmp_path)
+    assert tablebase.field.to_json() == field.to_json()
+    assert tablebase.table((1,), (1,)).shape == (21 * 21,)
+    assert tablebase.probe([((1, 1), 1)], [((2, 2), 1)]) == 1
+    assert tablebase.probe([((1, 1), 3)], [((3, 3), 1)]) == 0
+    clients = [fleet(field, [((1, 0), 1)]), fleet(field, [((0, 1), 1)])]
+    assert tablebase.probe_clients(clients, 1) == 1
+    assert tablebase.probe([((1, 1), 1)] * 2, [((3, 3), 1)]) is None
@@ -0,0 +1,87 @@
+from submarine_py import Field
+from submarine_py.tournament import run_tournament, summary, load_player
+from submarine_py.replay import ReplayReader, verify
+import csv
+import pytest
+import time
+
+
+def test_load_player():
+    assert load_player('test_engine:RandomPlayer').__name__ == 'RandomPlayer'
+    assert load_player('test_engine.ScriptedPlayer').__name__ \
+        == 'ScriptedPlayer'
+    with pytest.raises(ValueError):
+        load_player('RandomPlayer')
+
+
+def test_run_tournament(tmp_path):
+    output = tmp_path / 'results.csv'
+    specs = ['test_engine:ScriptedPlayer', 'test_tournament:Cheater']
+    replay = tmp_path / 'games.replay'
+    results = run_tournament(specs, 6, Field(), workers=2, output=output,
+                             replay=replay)
+    assert [r['game'] for r in results] == list(range(6))
+    # the scripted player always wins, moving first or second
+    assert [r['winner'] for r in results] == [0, 1] * 3
+    assert {r['reason'] for r in results} == {'illegal'}
+    assert summary(results) == {'scripted': 6}
+    with open(output) as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(int(r['game']) for r in rows) == list(range(6))
+    # all processes append to the same replay file
+    with ReplayReader(replay) as reader:
+        assert len(reader) == 6
+        assert all(verify(r) is None for r in reader)
+
+
+def test_long_game_logs(tmp_path):
+    specs = ['test_engine:ScriptedPlayer', 'test_engine:ScriptedPlayer']
+    results = run_tournament(specs, 2, Field(), workers=2,
+                             log_dir=tmp_path, log_turns=10)
+    # the first mover wins at the 11th turn
+    assert [r['turns'] for r in results] == [11, 11]
+    assert all('output' not in r for r in results)
+    assert sorted(p.name for p in tmp_path.iterdir()) \
+        == ['0_log.txt', '1_log.txt']
+    assert 'turns: 11' in (tmp_path / '0_log.txt').read_text()
+    run_tournament(specs, 1, Field(), workers=1, log_dir=tmp_path / 'none',
+                   log_turns=11)
+    assert not list((tmp_path / 'none').iterdir())
+
+
+def test_errors_and_timeouts(tmp_path):
+    output = tmp_path / 'results.csv'
+    specs = ['test_tournament:Crasher', 'test_tournament:Sleeper']
+    results = run_tournament(specs, 2, Field(), workers=2, output=output,
+                             timeout=0.5)
+    assert [r['reason'] for r in results] == ['error', 'timeout']
+    assert [r['winner'] for r in results] == [-1, -1]
+    assert summary(results) == {}
+    with open(output) as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: int(r['game']))
+    assert [r['reason'] for r in rows] == ['error', 'timeout']
+
+
+def cheater():
+    from test_engine import ScriptedPlayer
+
+    class Cheater(ScriptedPlayer):
+        targets = [[4, 4]]  # out of the attack range
+
+        def name(self):
+            return 'cheater'
+    return Cheater
+
+
+Cheater = cheater()
+
+
+class Crasher(Cheater):
+    def action(self):
+        raise RuntimeError('crashed')
+
+
+class Sleeper(Cheater):
+    def action(self):
+        time.sleep(10)
+        return super().action()
@@ -0,0 +1,52 @@
+from submarine_py import Field
+from submarine_py.server import GameControl
+from submarine_py.transposition import fleet_hash, TranspositionTable
+import random
+
+
+def test_incremental_hash():
+    rng = random.Random(1)
+    field = Field(5, 6, [[2, 2]])
+    for _ in range(20):
+        game = GameControl(field)
+        placements = []
+        for _ in range(2):
+            squares = rng.sample(field.squares, 3)
+            placements.append(dict(zip('wcs', squares)))
+        game.initialize(*placements)
+        seen = {}
+        c = 0
+        for t in range(200):
+            client = game.clients[c]
+            act = rng.choice(client.legal_actions())
+            info = game.action_info(c, act)
+            for p in game.clients:
+                assert p.hash == fleet_hash(field, p.ships.values())
+            key = game.hash(1 - c)
+            state = tuple(sorted((p, s.type, s.position, s.hp)
+                                 for p, client in enumerate(game.clients)
+                                 for s in client.ships.values())) + (1 - c,)
+            assert seen.setdefault(key, state) == state
+            if "outcome" in info[0]:
+                break
+            c = 1 - c
+
+
+def test_transposition():
+    placement = {"w": [0, 0], "c": [0, 1], "s": [1, 0]}
+    a, b = GameControl(Field()), GameControl(Field())
+    a.initialize(placement, placement)
+    b.initialize(placement, placement)
+    moves = [{"move": {"ship": "w", "to": [0, 3]}},
+             {"move": {"ship": "s", "to": [4, 0]}}]
+    for act in moves:
+        a.action_info(0, act)
+    for act in reversed(moves):
+        b.action_info(0, act)
+    assert a.hash(1) == b.hash(1)
+    assert a.hash(0) != a.hash(1)
+    table = TranspositionTable(8)
+    table.store(a.hash(1), 'visited', depth=2)
+    assert table.probe(b.hash(1)) == 'visited'
+    assert table.probe(b.hash(0)) is None
+    assert len(table) == 1 and table.hits == table.misses == 1